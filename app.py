@@ -4,16 +4,25 @@ import numpy as np
 import pandas as pd
 import webbrowser
 import tempfile
-import io
-import qrcode
+from collections import OrderedDict
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QLabel, QPushButton, QComboBox, QCheckBox, QGroupBox, 
                             QGridLayout, QDoubleSpinBox, QSpinBox, QTabWidget, QSplitter,
-							QMessageBox, QDialog, QFrame, QToolBar, QSizePolicy)
-from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QPen, QBrush, QPainterPath, QFont
-from PyQt5.QtCore import QLocale, Qt, QRect, QSize
+							QMessageBox, QDialog, QFrame, QToolBar, QSizePolicy,
+                            QTableWidget, QTableWidgetItem, QHeaderView, QInputDialog, QSlider, QLineEdit)
+from PyQt5.QtGui import QPixmap, QPixmapCache, QImage, QPainter, QColor, QPen, QBrush, QPainterPath, QFont
+from PyQt5.QtCore import QLocale, Qt, QRect, QSize, QTimer
 import plotly.graph_objects as go
-import plotly.io as pio
+from profiling import PROFILER
+from engine import (ProjectionParams, PAYMENT_FREQUENCY_NAMES, WITHDRAWAL_MODES, WITHDRAWAL_FIXED, WITHDRAWAL_PERCENT, ACCOUNT_TYPES, simulate,
+                    CONTRIBUTION_TYPES, CURRENCIES, results_frame, has_real_terms, has_withdrawals, depletion_month,
+                    max_sustainable_withdrawal, currency_symbol)
+from exporter import ChartExportQueue, ExportError
+from chart_payload import compact_figure_html, comparison_html, ensure_plotlyjs
+from reports import results_table_html
+from session import SESSION_FILENAME, SessionError, dump_session, load_session
+from history import ResultsHistory
+from dashboard import dashboard_available
 
 # Definir paleta de cores para um tema elegante
 COLORS = {
@@ -28,12 +37,181 @@ COLORS = {
     'graph4': '#9b59b6',
 }
 
+# Espera sem mudanças antes de gravar a sessão (cliques seguidos em Calculate geram uma só gravação)
+SESSION_SAVE_DELAY_MS = 2000
+
+# Folha de estilo única da aplicação: montada uma vez e aplicada ao QApplication
+# (install_stylesheet), em vez de uma folha por widget, que o Qt analisaria e
+# reaplicaria a cada setStyleSheet. Widgets específicos são escolhidos pelo
+# objectName e grupos de botões pela propriedade dinâmica "role".
+APP_STYLESHEET = f"""
+    QWidget {{
+        background-color: {COLORS['background']};
+        color: {COLORS['text']};
+    }}
+    QToolBar {{
+        background-color: {COLORS['accent']};
+        border: none;
+        spacing: 0px;
+        padding: 0px;
+        margin: 0px;
+    }}
+    QWidget#titleWidget {{
+        background-color: {COLORS['accent']};
+        margin: 0px;
+        padding: 0px;
+        border: none;
+    }}
+    QLabel#titleLabel {{
+        font-size: 18px;
+        font-weight: bold;
+        color: white;
+        background-color: transparent;
+        margin: 0px;
+        padding: 8px;
+    }}
+    QPushButton[role="windowControl"] {{
+        background-color: transparent;
+        color: white;
+        border: none;
+        font-size: 16px;
+        font-weight: bold;
+        padding: 4px 8px;
+        margin: 0px;
+    }}
+    QPushButton[role="windowControl"]:hover {{
+        background-color: rgba(255, 255, 255, 0.2);
+    }}
+    QPushButton#closeButton:hover {{
+        background-color: rgba(255, 0, 0, 0.6);
+    }}
+    QGroupBox {{
+        font-size: 14px;
+        font-weight: bold;
+        border: 1px solid {COLORS['accent']};
+        border-radius: 5px;
+        margin-top: 10px;
+        padding-top: 10px;
+    }}
+    QGroupBox::title {{
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 5px 0 5px;
+        color: {COLORS['primary']};
+    }}
+    QDoubleSpinBox, QSpinBox, QComboBox, QLineEdit {{
+        background-color: white;
+        border: 1px solid #d0d0d0;
+        border-radius: 3px;
+        padding: 3px;  /* Padding menor */
+        min-height: 24px;  /* Altura mínima um pouco maior */
+    }}
+    QDoubleSpinBox:focus, QSpinBox:focus, QComboBox:focus, QLineEdit:focus {{
+        border: 1px solid {COLORS['accent']};
+    }}
+    QGroupBox#inputGroup QCheckBox::indicator {{
+        width: 15px;
+        height: 15px;
+    }}
+    QCheckBox#isTaxed {{
+        padding-right: 0px;
+    }}
+    QGroupBox#inputGroup QCheckBox#isTaxed::indicator {{
+        width: 13px;
+        height: 13px;
+    }}
+    QPushButton#calculateButton, QPushButton[role="action"] {{
+        background-color: {COLORS['accent']};
+        color: white;
+        border: none;
+        border-radius: 5px;
+        padding: 10px;
+        font-weight: bold;
+    }}
+    QPushButton[role="action"] {{
+        margin: 5px;
+    }}
+    QPushButton#calculateButton:hover, QPushButton[role="action"]:hover {{
+        background-color: #2980b9;
+    }}
+    QPushButton#calculateButton:pressed, QPushButton[role="action"]:pressed {{
+        background-color: #1f6aa5;
+    }}
+    QFrame#divider {{
+        background-color: {COLORS['accent']};
+        max-height: 1px;
+    }}
+    QPushButton#donateButton {{
+        background-color: #F7931A;  /* Bitcoin orange */
+        color: white;
+        border: none;
+        border-radius: 5px;
+        padding: 10px;
+        font-weight: bold;
+        margin: 5px;
+    }}
+    QPushButton#donateButton:hover {{
+        background-color: #E87B18;
+    }}
+    QPushButton#donateButton:pressed {{
+        background-color: #D67016;
+    }}
+    QPushButton[role="dialog"] {{
+        background-color: {COLORS['accent']};
+        color: white;
+        border: none;
+        border-radius: 4px;
+        padding: 8px 16px;
+    }}
+    QPushButton[role="dialog"]:hover {{
+        background-color: #2980b9;
+    }}
+    QLabel#donateTitle {{
+        font-size: 18px;
+        font-weight: bold;
+        color: {COLORS['primary']};
+    }}
+    QLabel#address {{
+        font-family: monospace;
+        background-color: #f5f5f5;
+        padding: 10px;
+        border-radius: 4px;
+        selection-background-color: {COLORS['secondary']};
+    }}
+    QFrame#addressFrame, QFrame#addressFrame QLabel {{
+        background-color: white;
+        border-radius: 8px;
+        padding: 10px;
+    }}
+    QLabel#addressTitle {{
+        font-weight: bold;
+    }}
+    QLabel#copyInfo {{
+        font-size: 11px;
+    }}
+    QLabel#thanks {{
+        font-weight: bold;
+        margin-top: 10px;
+    }}
+"""
+
+DONATE_ADDRESS = "bc1qxqdxgf7ncc4ekz8ldq5cc5gukpykm6hfhjad0l"
+
+
+def install_stylesheet(app=None):
+    """Aplica APP_STYLESHEET ao QApplication uma única vez (janelas e diálogos herdam dela)"""
+    app = app or QApplication.instance()
+    if app is not None and app.styleSheet() != APP_STYLESHEET:
+        app.setStyleSheet(APP_STYLESHEET)
+
+
 class DividendPortfolioCalculator(QMainWindow):
     def __init__(self):
         super().__init__()
+        # Antes de criar os widgets, para que cada um seja estilizado uma só vez
+        install_stylesheet()
         self.setWindowTitle("Dividend Portfolio Calculator")
         self.setGeometry(100, 100, 800, 400)
-        self.setStyleSheet(f"background-color: {COLORS['background']}; color: {COLORS['text']};")
         
         # Remover barra de título padrão
         self.setWindowFlags(Qt.FramelessWindowHint)
@@ -45,60 +223,27 @@ class DividendPortfolioCalculator(QMainWindow):
         
         # Remover margens e bordas da toolbar
         toolbar.setContentsMargins(0, 0, 0, 0)
-        toolbar.setStyleSheet(f"""
-            QToolBar {{
-                background-color: {COLORS['accent']};
-                border: none;
-                spacing: 0px;
-                padding: 0px;
-                margin: 0px;
-            }}
-        """)
         
         self.addToolBar(toolbar)
         
         # Criar título e botões de controle em um widget
         title_widget = QWidget()
+        title_widget.setObjectName("titleWidget")
         title_layout = QHBoxLayout(title_widget)
         title_layout.setContentsMargins(10, 0, 10, 0)
         title_layout.setSpacing(0)
-        title_widget.setStyleSheet(f"background-color: {COLORS['accent']}; margin: 0px; padding: 0px; border: none;")
         
         # Título da aplicação
         title_label = QLabel("Dividend Portfolio Calculator")
-        title_label.setStyleSheet(f"""
-            font-size: 18px;
-            font-weight: bold;
-            color: white;
-            background-color: transparent;
-            margin: 0px;
-            padding: 8px;
-        """)
+        title_label.setObjectName("titleLabel")
         
         # Adicionar botões de controle
         btn_minimize = QPushButton("−")
         btn_maximize = QPushButton("⧠")
         btn_close = QPushButton("×")
-        
-        # Estilizar botões
-        control_btn_style = """
-            QPushButton {
-                background-color: transparent;
-                color: white;
-                border: none;
-                font-size: 16px;
-                font-weight: bold;
-                padding: 4px 8px;
-                margin: 0px;
-            }
-            QPushButton:hover {
-                background-color: rgba(255, 255, 255, 0.2);
-            }
-        """
-        
-        btn_minimize.setStyleSheet(control_btn_style)
-        btn_maximize.setStyleSheet(control_btn_style)
-        btn_close.setStyleSheet(control_btn_style + "QPushButton:hover { background-color: rgba(255, 0, 0, 0.6); }")
+        btn_close.setObjectName("closeButton")
+        for button in (btn_minimize, btn_maximize, btn_close):
+            button.setProperty("role", "windowControl")
         
         # Conectar botões às ações da janela
         btn_minimize.clicked.connect(self.showMinimized)
@@ -139,8 +284,36 @@ class DividendPortfolioCalculator(QMainWindow):
         self.html_files = {
             'portfolio': os.path.join(self.graphs_folder, 'portfolio_balance.html'),
             'dividend': os.path.join(self.graphs_folder, 'dividend_income.html'),
-            'yield': os.path.join(self.graphs_folder, 'yield_on_cost.html')
+            'yield': os.path.join(self.graphs_folder, 'yield_on_cost.html'),
+            'table': os.path.join(self.graphs_folder, 'results_table.html'),
+            'comparison': os.path.join(self.graphs_folder, 'scenario_comparison.html')
         }
+        self.session_file = os.path.join(self.graphs_folder, SESSION_FILENAME)
+        
+        # Gravação dos arquivos em segundo plano (a pasta pode estar em rede/sincronizada)
+        self.chart_exporter = ChartExportQueue()
+        # Gravação da sessão adiada: serializar a cada cálculo travaria a interface
+        self.session_timer = QTimer(self)
+        self.session_timer.setSingleShot(True)
+        self.session_timer.setInterval(SESSION_SAVE_DELAY_MS)
+        self.session_timer.timeout.connect(self.save_session)
+        # Tamanho dos dados de cada gráfico exportado (JSON tradicional x arrays tipados)
+        self.export_stats = {}
+        # Publicação da última projeção em memória compartilhada (DIVIDEND_PUBLISH=<nome do segmento>)
+        self.results_publisher = None
+        if os.environ.get('DIVIDEND_PUBLISH'):
+            from arrow_export import ResultsPublisher
+            self.results_publisher = ResultsPublisher(os.environ['DIVIDEND_PUBLISH'])
+        
+        # Cenários salvos para comparação (nome -> (parâmetros, resultados))
+        self.scenarios = OrderedDict()
+        # Execuções anteriores (parâmetros sempre, arrays em cache limitado)
+        self.history = ResultsHistory()
+        self.last_params = None
+        self.last_results = None
+        self.df_results = None
+        # Gráficos ainda não gerados para a projeção atual (após restaurar a sessão)
+        self.stale_charts = set()
         
         # Widget central
         central_widget = QWidget()
@@ -151,22 +324,7 @@ class DividendPortfolioCalculator(QMainWindow):
         
         # Área de entrada
         input_group = QGroupBox("Input Parameters")
-        input_group.setStyleSheet(f"""
-            QGroupBox {{
-                font-size: 14px;
-                font-weight: bold;
-                border: 1px solid {COLORS['accent']};
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 10px;
-            }}
-            QGroupBox::title {{
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px 0 5px;
-                color: {COLORS['primary']};
-            }}
-        """)
+        input_group.setObjectName("inputGroup")
         
         input_layout = QGridLayout()
         input_layout.setVerticalSpacing(6)  # Reduzir espaçamento vertical
@@ -175,15 +333,24 @@ class DividendPortfolioCalculator(QMainWindow):
         # Definir área de entrada
         row = 0
         
+        # Moeda de todos os valores (entradas, gráficos e tabela)
+        input_layout.addWidget(QLabel("Currency:"), row, 0)
+        self.currency = QComboBox()
+        self.currency.addItems(CURRENCIES)
+        self.currency.setCurrentIndex(0)
+        self.currency.currentIndexChanged.connect(self.update_currency_labels)
+        input_layout.addWidget(self.currency, row, 1)
+        row += 1
+        
         # Capital inicial
-        input_layout.addWidget(QLabel("Starting Principal ($):"), row, 0)
+        self.starting_principal_label = QLabel("Starting Principal ($):")
+        input_layout.addWidget(self.starting_principal_label, row, 0)
         self.starting_principal = QDoubleSpinBox()
         self.starting_principal.setRange(0, 10000000)
         self.starting_principal.setDecimals(2)
         self.starting_principal.setSingleStep(1000)
         self.starting_principal.setValue(10000)
         self.starting_principal.setLocale(QLocale('en_US'))
-        self.starting_principal.setStyleSheet(self.get_input_style())
         input_layout.addWidget(self.starting_principal, row, 1)
         row += 1
         
@@ -195,7 +362,6 @@ class DividendPortfolioCalculator(QMainWindow):
         self.annual_dividend_yield.setSingleStep(0.1)
         self.annual_dividend_yield.setValue(4.0)
         self.annual_dividend_yield.setLocale(QLocale('en_US'))
-        self.annual_dividend_yield.setStyleSheet(self.get_input_style())
         input_layout.addWidget(self.annual_dividend_yield, row, 1)
         row += 1
         
@@ -210,16 +376,8 @@ class DividendPortfolioCalculator(QMainWindow):
         
         # Altere a checkbox para usar menos espaço
         self.is_taxed = QCheckBox("Is Taxed?")
+        self.is_taxed.setObjectName("isTaxed")
         self.is_taxed.setChecked(True)
-        self.is_taxed.setStyleSheet("""
-            QCheckBox {
-                padding-right: 0px;
-            }
-            QCheckBox::indicator {
-                width: 13px;
-                height: 13px;
-            }
-        """)
         self.is_taxed.stateChanged.connect(self.toggle_tax_rate)
         tax_layout.addWidget(self.is_taxed)
         
@@ -230,7 +388,6 @@ class DividendPortfolioCalculator(QMainWindow):
         self.dividend_tax_rate.setSingleStep(0.5)
         self.dividend_tax_rate.setValue(30)
         self.dividend_tax_rate.setLocale(QLocale('en_US'))
-        self.dividend_tax_rate.setStyleSheet(self.get_input_style())
         self.dividend_tax_rate.setFixedWidth(80)  # Definir largura fixa menor
         self.dividend_tax_rate.setEnabled(False)
         tax_layout.addWidget(self.dividend_tax_rate)
@@ -240,6 +397,43 @@ class DividendPortfolioCalculator(QMainWindow):
         input_layout.addWidget(tax_container, row, 1)
         row += 1
         
+        # Tipo de conta (define quais impostos se aplicam)
+        input_layout.addWidget(QLabel("Account Type:"), row, 0)
+        self.account_type = QComboBox()
+        self.account_type.addItems(ACCOUNT_TYPES)
+        self.account_type.setCurrentIndex(0)
+        self.account_type.setToolTip(
+            "Taxable: dividends and capital gains on sales are taxed.\n"
+            "Tax-Deferred: withdrawals are taxed at the dividend tax rate.\n"
+            "Tax-Free: no domestic taxes."
+        )
+        input_layout.addWidget(self.account_type, row, 1)
+        row += 1
+        
+        # Imposto retido na fonte sobre dividendos estrangeiros
+        input_layout.addWidget(QLabel("Foreign Withholding Tax (%):"), row, 0)
+        self.foreign_withholding_rate = QDoubleSpinBox()
+        self.foreign_withholding_rate.setRange(0, 100)
+        self.foreign_withholding_rate.setDecimals(2)
+        self.foreign_withholding_rate.setSingleStep(0.5)
+        self.foreign_withholding_rate.setValue(0)
+        self.foreign_withholding_rate.setLocale(QLocale('en_US'))
+        self.foreign_withholding_rate.setToolTip("Withheld on every dividend; credited against the dividend tax in taxable accounts.")
+        input_layout.addWidget(self.foreign_withholding_rate, row, 1)
+        row += 1
+        
+        # Imposto sobre ganho de capital nas vendas (lotes FIFO)
+        input_layout.addWidget(QLabel("Capital Gains Tax Rate (%):"), row, 0)
+        self.capital_gains_tax_rate = QDoubleSpinBox()
+        self.capital_gains_tax_rate.setRange(0, 100)
+        self.capital_gains_tax_rate.setDecimals(2)
+        self.capital_gains_tax_rate.setSingleStep(0.5)
+        self.capital_gains_tax_rate.setValue(15)
+        self.capital_gains_tax_rate.setLocale(QLocale('en_US'))
+        self.capital_gains_tax_rate.setToolTip("Applied to gains realized by withdrawals from taxable accounts (FIFO cost basis).")
+        input_layout.addWidget(self.capital_gains_tax_rate, row, 1)
+        row += 1
+        
         # Aumento anual esperado de dividendos
         input_layout.addWidget(QLabel("Expected Annual Dividend Increase (%):"), row, 0)
         self.expected_annual_dividend_increase = QDoubleSpinBox()
@@ -248,25 +442,49 @@ class DividendPortfolioCalculator(QMainWindow):
         self.expected_annual_dividend_increase.setSingleStep(0.5)
         self.expected_annual_dividend_increase.setValue(3)
         self.expected_annual_dividend_increase.setLocale(QLocale('en_US'))
-        self.expected_annual_dividend_increase.setStyleSheet(self.get_input_style())
         input_layout.addWidget(self.expected_annual_dividend_increase, row, 1)
         row += 1
         
         # Frequência de pagamento de dividendos
         input_layout.addWidget(QLabel("Dividend Payment Frequency:"), row, 0)
         self.dividend_payment_frequency = QComboBox()
-        self.dividend_payment_frequency.addItems(["Monthly", "Quarterly", "Yearly"])
+        self.dividend_payment_frequency.addItems(PAYMENT_FREQUENCY_NAMES)
         self.dividend_payment_frequency.setCurrentIndex(1)  # Trimestral como padrão
-        self.dividend_payment_frequency.setStyleSheet(self.get_input_style())
         input_layout.addWidget(self.dividend_payment_frequency, row, 1)
         row += 1
         
+        # Calendário diário: datas ex-dividendo e de pagamento reais
+        input_layout.addWidget(QLabel("Daily Event Calendar:"), row, 0)
+        self.event_calendar = QCheckBox()
+        self.event_calendar.setChecked(False)
+        self.event_calendar.setToolTip(
+            "Simulate day by day: contributions on the 1st of each month, shares held on the\n"
+            "ex-dividend date receive the dividend and it is reinvested on the payment date."
+        )
+        input_layout.addWidget(self.event_calendar, row, 1)
+        row += 1
+        
+        input_layout.addWidget(QLabel("Ex-Dividend Day of Month:"), row, 0)
+        self.ex_dividend_day = QSpinBox()
+        self.ex_dividend_day.setRange(1, 31)
+        self.ex_dividend_day.setValue(15)
+        input_layout.addWidget(self.ex_dividend_day, row, 1)
+        row += 1
+        
+        input_layout.addWidget(QLabel("Payment Delay (days):"), row, 0)
+        self.payment_lag_days = QSpinBox()
+        self.payment_lag_days.setRange(0, 90)
+        self.payment_lag_days.setValue(14)
+        input_layout.addWidget(self.payment_lag_days, row, 1)
+        row += 1
+        self.event_calendar.stateChanged.connect(self.update_calendar_inputs)
+        self.update_calendar_inputs()
+        
         # Tipo de contribuição
         input_layout.addWidget(QLabel("Contribution Type:"), row, 0)
         self.contribution_type = QComboBox()
-        self.contribution_type.addItems(["Monthly Contribution", "Annual Contribution"])
+        self.contribution_type.addItems(CONTRIBUTION_TYPES)
         self.contribution_type.setCurrentIndex(0)  # Mensal como padrão
-        self.contribution_type.setStyleSheet(self.get_input_style())
         self.contribution_type.currentIndexChanged.connect(self.update_contribution_label)
         input_layout.addWidget(self.contribution_type, row, 1)
         row += 1
@@ -280,16 +498,37 @@ class DividendPortfolioCalculator(QMainWindow):
         self.periodic_contribution.setSingleStep(100)
         self.periodic_contribution.setValue(0)
         self.periodic_contribution.setLocale(QLocale('en_US'))
-        self.periodic_contribution.setStyleSheet(self.get_input_style())
         input_layout.addWidget(self.periodic_contribution, row, 1)
         row += 1
         
+        # Cronograma de contribuições: aumento anual, anos pausados e aportes únicos
+        input_layout.addWidget(QLabel("Annual Contribution Raise (%):"), row, 0)
+        self.contribution_raise = QDoubleSpinBox()
+        self.contribution_raise.setRange(0, 100)
+        self.contribution_raise.setDecimals(2)
+        self.contribution_raise.setSingleStep(1)
+        self.contribution_raise.setValue(0)
+        self.contribution_raise.setLocale(QLocale('en_US'))
+        input_layout.addWidget(self.contribution_raise, row, 1)
+        row += 1
+        
+        input_layout.addWidget(QLabel("Paused Years:"), row, 0)
+        self.paused_years = QLineEdit()
+        self.paused_years.setPlaceholderText("e.g. 3, 7-9")
+        input_layout.addWidget(self.paused_years, row, 1)
+        row += 1
+        
+        input_layout.addWidget(QLabel("Lump Sums (year: amount):"), row, 0)
+        self.lump_sums = QLineEdit()
+        self.lump_sums.setPlaceholderText("e.g. 5: 20000; 10: 50000")
+        input_layout.addWidget(self.lump_sums, row, 1)
+        row += 1
+        
         # Anos investidos
         input_layout.addWidget(QLabel("Years Invested:"), row, 0)
         self.years_invested = QSpinBox()
         self.years_invested.setRange(1, 50)
         self.years_invested.setValue(10)
-        self.years_invested.setStyleSheet(self.get_input_style())
         input_layout.addWidget(self.years_invested, row, 1)
         row += 1
         
@@ -297,15 +536,31 @@ class DividendPortfolioCalculator(QMainWindow):
         input_layout.addWidget(QLabel("Reinvest Dividends:"), row, 0)
         self.dividend_reinvestment = QCheckBox()
         self.dividend_reinvestment.setChecked(True)
-        self.dividend_reinvestment.setStyleSheet("""
-            QCheckBox::indicator {
-                width: 15px;
-                height: 15px;
-            }
-        """)
         input_layout.addWidget(self.dividend_reinvestment, row, 1)
         row += 1
         
+        # Compras somente em cotas inteiras (sobra fica em caixa)
+        input_layout.addWidget(QLabel("Buy Whole Shares Only:"), row, 0)
+        self.whole_shares = QCheckBox()
+        self.whole_shares.setChecked(False)
+        self.whole_shares.setToolTip("Contributions and reinvested dividends buy whole shares; the remainder waits as uninvested cash.")
+        input_layout.addWidget(self.whole_shares, row, 1)
+        row += 1
+        
+        # Preço inicial da cota (usado nas compras de cotas inteiras)
+        self.share_price_label = QLabel("Share Price ($):")
+        input_layout.addWidget(self.share_price_label, row, 0)
+        self.share_price = QDoubleSpinBox()
+        self.share_price.setRange(0.01, 1000000)
+        self.share_price.setDecimals(2)
+        self.share_price.setSingleStep(1)
+        self.share_price.setValue(50)
+        self.share_price.setLocale(QLocale('en_US'))
+        self.share_price.setEnabled(False)
+        self.whole_shares.stateChanged.connect(lambda state: self.share_price.setEnabled(state == Qt.Checked))
+        input_layout.addWidget(self.share_price, row, 1)
+        row += 1
+        
         # Valorização anual esperada das ações
         input_layout.addWidget(QLabel("Expected Annual Share Price Appreciation (%):"), row, 0)
         self.expected_annual_share_price_appreciation = QDoubleSpinBox()
@@ -314,28 +569,69 @@ class DividendPortfolioCalculator(QMainWindow):
         self.expected_annual_share_price_appreciation.setSingleStep(0.5)
         self.expected_annual_share_price_appreciation.setValue(3)
         self.expected_annual_share_price_appreciation.setLocale(QLocale('en_US'))
-        self.expected_annual_share_price_appreciation.setStyleSheet(self.get_input_style())
         input_layout.addWidget(self.expected_annual_share_price_appreciation, row, 1)
         row += 1
         
+        # Inflação anual (séries em valores reais)
+        input_layout.addWidget(QLabel("Annual Inflation Rate (%):"), row, 0)
+        self.annual_inflation_rate = QDoubleSpinBox()
+        self.annual_inflation_rate.setRange(0, 50)
+        self.annual_inflation_rate.setDecimals(2)
+        self.annual_inflation_rate.setSingleStep(0.5)
+        self.annual_inflation_rate.setValue(0)
+        self.annual_inflation_rate.setLocale(QLocale('en_US'))
+        input_layout.addWidget(self.annual_inflation_rate, row, 1)
+        row += 1
+        
+        # Contribuições reajustadas pela inflação
+        input_layout.addWidget(QLabel("Index Contributions/Withdrawals to Inflation:"), row, 0)
+        self.index_contributions = QCheckBox()
+        self.index_contributions.setChecked(False)
+        input_layout.addWidget(self.index_contributions, row, 1)
+        row += 1
+        
+        # Fase de retiradas após os anos investidos
+        input_layout.addWidget(QLabel("Withdrawal Years:"), row, 0)
+        self.withdrawal_years = QSpinBox()
+        self.withdrawal_years.setRange(0, 50)
+        self.withdrawal_years.setValue(0)
+        self.withdrawal_years.valueChanged.connect(self.update_withdrawal_inputs)
+        input_layout.addWidget(self.withdrawal_years, row, 1)
+        row += 1
+        
+        input_layout.addWidget(QLabel("Withdrawal Strategy:"), row, 0)
+        self.withdrawal_mode = QComboBox()
+        self.withdrawal_mode.addItems(WITHDRAWAL_MODES)
+        self.withdrawal_mode.setCurrentIndex(0)
+        self.withdrawal_mode.currentIndexChanged.connect(self.update_withdrawal_inputs)
+        input_layout.addWidget(self.withdrawal_mode, row, 1)
+        row += 1
+        
+        self.withdrawal_amount_label = QLabel("Annual Withdrawal ($):")
+        input_layout.addWidget(self.withdrawal_amount_label, row, 0)
+        self.withdrawal_amount = QDoubleSpinBox()
+        self.withdrawal_amount.setRange(0, 10000000)
+        self.withdrawal_amount.setDecimals(2)
+        self.withdrawal_amount.setSingleStep(1000)
+        self.withdrawal_amount.setValue(0)
+        self.withdrawal_amount.setLocale(QLocale('en_US'))
+        input_layout.addWidget(self.withdrawal_amount, row, 1)
+        row += 1
+        
+        input_layout.addWidget(QLabel("Annual Withdrawal Rate (%):"), row, 0)
+        self.withdrawal_rate = QDoubleSpinBox()
+        self.withdrawal_rate.setRange(0, 100)
+        self.withdrawal_rate.setDecimals(2)
+        self.withdrawal_rate.setSingleStep(0.25)
+        self.withdrawal_rate.setValue(4.0)
+        self.withdrawal_rate.setLocale(QLocale('en_US'))
+        input_layout.addWidget(self.withdrawal_rate, row, 1)
+        row += 1
+        self.update_withdrawal_inputs()
+        
         # Botão de cálculo
         self.calculate_button = QPushButton("Calculate")
-        self.calculate_button.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {COLORS['accent']};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background-color: #2980b9;
-            }}
-            QPushButton:pressed {{
-                background-color: #1f6aa5;
-            }}
-        """)
+        self.calculate_button.setObjectName("calculateButton")
         self.calculate_button.clicked.connect(self.calculate_and_plot)
         input_layout.addWidget(self.calculate_button, row, 0, 1, 2)
         row += 1
@@ -344,56 +640,19 @@ class DividendPortfolioCalculator(QMainWindow):
         
         # Configure a área de resultados com botões para os diferentes gráficos
         results_group = QGroupBox("Results")
-        results_group.setStyleSheet(f"""
-            QGroupBox {{
-                font-size: 14px;
-                font-weight: bold;
-                border: 1px solid {COLORS['accent']};
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 10px;
-            }}
-            QGroupBox::title {{
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px 0 5px;
-                color: {COLORS['primary']};
-            }}
-        """)
         
         results_layout = QVBoxLayout()
         
         # Criar botões para os gráficos
-        button_style = f"""
-            QPushButton {{
-                background-color: {COLORS['accent']};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px;  /* Reduzir padding */
-                font-weight: bold;
-                margin: 5px;  /* Reduzir margem */
-            }}
-            QPushButton:hover {{
-                background-color: #2980b9;
-            }}
-            QPushButton:pressed {{
-                background-color: #1f6aa5;
-            }}
-        """
-        
         self.portfolio_balance_button = QPushButton("View Portfolio Balance Chart")
-        self.portfolio_balance_button.setStyleSheet(button_style)
         self.portfolio_balance_button.clicked.connect(lambda: self.view_chart('portfolio'))
         results_layout.addWidget(self.portfolio_balance_button)
         
         self.dividend_income_button = QPushButton("View Dividend Income Chart")
-        self.dividend_income_button.setStyleSheet(button_style)
         self.dividend_income_button.clicked.connect(lambda: self.view_chart('dividend'))
         results_layout.addWidget(self.dividend_income_button)
         
         self.yield_on_cost_button = QPushButton("View Yield on Cost Chart")
-        self.yield_on_cost_button.setStyleSheet(button_style)
         self.yield_on_cost_button.clicked.connect(lambda: self.view_chart('yield'))
         results_layout.addWidget(self.yield_on_cost_button)
         
@@ -401,38 +660,76 @@ class DividendPortfolioCalculator(QMainWindow):
         results_group.setLayout(results_layout)
         
         self.results_table_button = QPushButton("View Results Table")
-        self.results_table_button.setStyleSheet(button_style)
         self.results_table_button.clicked.connect(self.view_results_table)
         results_layout.addWidget(self.results_table_button)
         
+        self.pdf_report_button = QPushButton("Export PDF Report")
+        self.pdf_report_button.clicked.connect(self.export_pdf_report)
+        results_layout.addWidget(self.pdf_report_button)
+        
+        self.arrow_export_button = QPushButton("Export Results (Arrow)")
+        self.arrow_export_button.clicked.connect(self.export_arrow_results)
+        results_layout.addWidget(self.arrow_export_button)
+        
+        # Comparação de cenários
+        scenarios_layout = QHBoxLayout()
+        self.add_scenario_button = QPushButton("Add Scenario")
+        self.add_scenario_button.clicked.connect(self.add_scenario)
+        scenarios_layout.addWidget(self.add_scenario_button)
+        
+        self.clear_scenarios_button = QPushButton("Clear Scenarios")
+        self.clear_scenarios_button.clicked.connect(self.clear_scenarios)
+        scenarios_layout.addWidget(self.clear_scenarios_button)
+        results_layout.addLayout(scenarios_layout)
+        
+        self.compare_scenarios_button = QPushButton("Compare Scenarios (0)")
+        self.compare_scenarios_button.clicked.connect(self.view_scenario_comparison)
+        results_layout.addWidget(self.compare_scenarios_button)
+        
+        self.stress_test_button = QPushButton("Run Stress Test")
+        self.stress_test_button.clicked.connect(self.run_stress_test)
+        results_layout.addWidget(self.stress_test_button)
+        
+        self.safe_withdrawal_button = QPushButton("Find Max Sustainable Withdrawal")
+        self.safe_withdrawal_button.clicked.connect(self.find_safe_withdrawal)
+        results_layout.addWidget(self.safe_withdrawal_button)
+        
+        self.diagnostics_button = QPushButton("View Diagnostics")
+        self.diagnostics_button.clicked.connect(self.show_diagnostics_dialog)
+        results_layout.addWidget(self.diagnostics_button)
+        
+        # Estilo dos botões de resultado (APP_STYLESHEET)
+        for button in (self.portfolio_balance_button, self.dividend_income_button, self.yield_on_cost_button,
+                       self.results_table_button, self.pdf_report_button, self.arrow_export_button,
+                       self.add_scenario_button, self.clear_scenarios_button, self.compare_scenarios_button,
+                       self.stress_test_button, self.safe_withdrawal_button, self.diagnostics_button):
+            button.setProperty("role", "action")
+        
+        # Histórico das execuções: arrastar volta às entradas e resultados de uma execução anterior
+        history_layout = QHBoxLayout()
+        history_layout.addWidget(QLabel("History:"))
+        self.history_slider = QSlider(Qt.Horizontal)
+        self.history_slider.setRange(0, 0)
+        self.history_slider.setEnabled(False)
+        self.history_slider.valueChanged.connect(self.show_history_entry)
+        history_layout.addWidget(self.history_slider)
+        results_layout.addLayout(history_layout)
+        self.history_label = QLabel("No runs yet")
+        self.history_label.setWordWrap(True)
+        results_layout.addWidget(self.history_label)
+        
         # Adicionar linha divisória
         results_layout.addSpacing(15)
         divider = QFrame()
         divider.setFrameShape(QFrame.HLine)
         divider.setFrameShadow(QFrame.Sunken)
-        divider.setStyleSheet(f"background-color: {COLORS['accent']}; max-height: 1px;")
+        divider.setObjectName("divider")
         results_layout.addWidget(divider)
         results_layout.addSpacing(15)
         
         # Botão de doação
         self.donate_button = QPushButton("Support This Project")
-        self.donate_button.setStyleSheet(f"""
-            QPushButton {{
-                background-color: #F7931A;  /* Bitcoin orange */
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px;
-                font-weight: bold;
-                margin: 5px;
-            }}
-            QPushButton:hover {{
-                background-color: #E87B18;
-            }}
-            QPushButton:pressed {{
-                background-color: #D67016;
-            }}
-        """)
+        self.donate_button.setObjectName("donateButton")
         self.donate_button.clicked.connect(self.show_donate_dialog)
         results_layout.addWidget(self.donate_button)
         
@@ -450,13 +747,36 @@ class DividendPortfolioCalculator(QMainWindow):
         splitter.addWidget(right_widget)
         splitter.setSizes([450, 350])
         
+        # Painel embutido (QtWebEngine opcional): os gráficos são atualizados no lugar a cada cálculo
+        self.dashboard = None
+        if dashboard_available():
+            from dashboard import Dashboard
+            self.dashboard = Dashboard(self.graphs_folder)
+            splitter.addWidget(self.dashboard)
+            splitter.setSizes([450, 350, 800])
+            self.resize(1600, 800)
+        
         main_layout.addWidget(splitter)
         
         # Variáveis para arrastar a janela
         self.drag_position = None
         
-        # Calcular e plotar com valores padrão
-        self.calculate_and_plot()
+        # Diálogos secundários: construídos no primeiro uso e reaproveitados
+        self.donate_dialog = None
+        self.diagnostics_dialog = None
+        
+        # Restaurar a sessão anterior; sem sessão, calcular e plotar com valores padrão
+        if not self.restore_session():
+            self.calculate_and_plot()
+    
+    def closeEvent(self, event):
+        # Guardar a sessão e garantir que os últimos arquivos sejam gravados antes de sair
+        self.session_timer.stop()
+        self.save_session()
+        self.chart_exporter.close(timeout=30)
+        if self.results_publisher is not None:
+            self.results_publisher.close()
+        super().closeEvent(event)
     
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -474,34 +794,58 @@ class DividendPortfolioCalculator(QMainWindow):
         else:
             self.showMaximized()
 	
-    def get_input_style(self):
-        return f"""
-            QDoubleSpinBox, QSpinBox, QComboBox {{
-                background-color: white;
-                border: 1px solid #d0d0d0;
-                border-radius: 3px;
-                padding: 3px;  /* Padding menor */
-                min-height: 24px;  /* Altura mínima um pouco maior */
-            }}
-            QDoubleSpinBox:focus, QSpinBox:focus, QComboBox:focus {{
-                border: 1px solid {COLORS['accent']};
-            }}
-        """
-    
     def toggle_tax_rate(self, state):
         self.dividend_tax_rate.setEnabled(state == Qt.Checked)
     
+    def update_calendar_inputs(self):
+        """Datas ex e de pagamento só valem no calendário diário"""
+        active = self.event_calendar.isChecked()
+        self.ex_dividend_day.setEnabled(active)
+        self.payment_lag_days.setEnabled(active)
+    
+    def update_withdrawal_inputs(self):
+        """Habilita somente os campos usados pela estratégia de retirada escolhida"""
+        active = self.withdrawal_years.value() > 0
+        mode = self.withdrawal_mode.currentIndex()
+        self.withdrawal_mode.setEnabled(active)
+        self.withdrawal_amount.setEnabled(active and mode == WITHDRAWAL_FIXED)
+        self.withdrawal_rate.setEnabled(active and mode == WITHDRAWAL_PERCENT)
+    
     def update_contribution_label(self):
+        unit = currency_symbol(self.currency.currentText()).strip()
         if self.contribution_type.currentIndex() == 0:
-            self.contribution_label.setText("Monthly Contribution ($):")
+            self.contribution_label.setText(f"Monthly Contribution ({unit}):")
         else:
-            self.contribution_label.setText("Annual Contribution ($):")
+            self.contribution_label.setText(f"Annual Contribution ({unit}):")
+    
+    def update_currency_labels(self):
+        """Mostra a moeda escolhida nos rótulos dos campos de valor"""
+        unit = currency_symbol(self.currency.currentText()).strip()
+        self.starting_principal_label.setText(f"Starting Principal ({unit}):")
+        self.share_price_label.setText(f"Share Price ({unit}):")
+        self.withdrawal_amount_label.setText(f"Annual Withdrawal ({unit}):")
+        self.update_contribution_label()
+    
+    def display_currency(self):
+        """Moeda dos valores exibidos: a da projeção calculada (ou a escolhida, antes do primeiro cálculo)"""
+        return self.last_params.currency if self.last_params is not None else self.currency.currentText()
     
     # Método view_chart modificado
     def view_chart(self, chart_type):
         """Abrir o arquivo HTML do gráfico no navegador"""
         if chart_type in self.html_files:
             file_path = self.html_files[chart_type]
+            
+            if chart_type in self.stale_charts:
+                self.render_stale_chart(chart_type)
+            
+            # Esperar somente pela gravação deste gráfico
+            try:
+                self.chart_exporter.wait(chart_type, timeout=30)
+            except ExportError as e:
+                QMessageBox.warning(self, "Export Failed", str(e))
+                return
+            
             if os.path.exists(file_path):
                 try:
                     # Tentar abrir no navegador
@@ -528,117 +872,221 @@ class DividendPortfolioCalculator(QMainWindow):
                 )
 
     
+    def apply_params(self, params):
+        """Preenche os widgets de entrada com params"""
+        self.starting_principal.setValue(params.starting_principal)
+        self.annual_dividend_yield.setValue(params.annual_dividend_yield)
+        self.is_taxed.setChecked(params.is_taxed)
+        self.dividend_tax_rate.setValue(params.dividend_tax_rate)
+        self.expected_annual_dividend_increase.setValue(params.expected_annual_dividend_increase)
+        self.dividend_payment_frequency.setCurrentIndex(params.payment_frequency_idx)
+        self.event_calendar.setChecked(params.event_calendar)
+        self.ex_dividend_day.setValue(params.ex_dividend_day)
+        self.payment_lag_days.setValue(params.payment_lag_days)
+        self.contribution_type.setCurrentIndex(params.contribution_type_idx)
+        self.periodic_contribution.setValue(params.periodic_contribution)
+        self.contribution_raise.setValue(params.contribution_raise)
+        self.paused_years.setText(params.paused_years)
+        self.lump_sums.setText(params.lump_sums)
+        self.years_invested.setValue(params.years_invested)
+        self.dividend_reinvestment.setChecked(params.dividend_reinvestment)
+        self.whole_shares.setChecked(params.whole_shares)
+        self.share_price.setValue(params.share_price)
+        self.expected_annual_share_price_appreciation.setValue(params.expected_annual_share_price_appreciation)
+        self.annual_inflation_rate.setValue(params.annual_inflation_rate)
+        self.index_contributions.setChecked(params.index_contributions)
+        self.withdrawal_years.setValue(params.withdrawal_years)
+        self.withdrawal_mode.setCurrentIndex(params.withdrawal_mode_idx)
+        self.withdrawal_amount.setValue(params.withdrawal_amount)
+        self.withdrawal_rate.setValue(params.withdrawal_rate)
+        self.account_type.setCurrentIndex(params.account_type_idx)
+        self.foreign_withholding_rate.setValue(params.foreign_withholding_rate)
+        self.capital_gains_tax_rate.setValue(params.capital_gains_tax_rate)
+        if self.currency.findText(params.currency) < 0:
+            self.currency.addItem(params.currency)
+        self.currency.setCurrentText(params.currency)
+    
+    @PROFILER.traced('restore_session')
+    def restore_session(self):
+        """
+        Restaura entradas, cenários e a última projeção sem recalcular.
+        Os gráficos são gerados só quando abertos. Devolve False se não havia
+        projeção salva.
+        """
+        try:
+            session = load_session(self.session_file)
+        except SessionError as e:
+            # Avisar depois que a janela abrir; a calculadora segue com os valores padrão
+            message = f"The saved session could not be loaded and was ignored.\n{e}"
+            QTimer.singleShot(0, lambda: QMessageBox.warning(self, "Session Not Restored", message))
+            return False
+        if session is None:
+            return False
+        
+        self.apply_params(session.params)
+        for name, params, results in session.scenarios:
+            self.scenarios[name] = (params, results)
+        self.update_scenario_buttons()
+        
+        if session.results is None:
+            return False
+        self.last_params = session.last_params
+        self.last_results = session.results
+        self.df_results = None
+        self.stale_charts = {'portfolio', 'dividend', 'yield'}
+        self.refresh_dashboard()
+        return True
+    
+    def schedule_session_save(self):
+        """Agenda a gravação da sessão; novas mudanças dentro do intervalo reiniciam a espera"""
+        self.session_timer.start()
+    
+    def save_session(self):
+        """Grava a sessão em segundo plano (mesma fila dos gráficos, com gravação atômica)"""
+        # Na thread da interface só se tira um retrato barato do estado: os parâmetros são
+        # imutáveis e os arrays de resultados são substituídos, nunca alterados no lugar.
+        # A serialização (dump_session) roda na thread de gravação.
+        params = self.read_params()
+        last_params = self.last_params
+        last_results = dict(self.last_results) if self.last_results is not None else None
+        scenarios = [
+            (name, scenario_params, dict(scenario_results))
+            for name, (scenario_params, scenario_results) in self.scenarios.items()
+        ]
+
+        def serialize():
+            with PROFILER.span('session.serialize', scenarios=len(scenarios)):
+                return dump_session(params, last_params, last_results, scenarios)
+
+        try:
+            self.chart_exporter.submit('session', self.session_file, serialize)
+        except ExportError as e:
+            QMessageBox.warning(self, "Session Not Saved", f"Could not save the session: {e}")
+    
+    def current_results_frame(self):
+        """DataFrame da projeção atual (montado sob demanda após restaurar a sessão)"""
+        if self.df_results is None and self.last_results is not None:
+            self.df_results = results_frame(self.last_results)
+        return self.df_results
+    
+    def render_stale_chart(self, chart_type):
+        """Gera o arquivo de um gráfico que ainda não foi gerado para a projeção atual"""
+        df = self.current_results_frame()
+        if chart_type == 'portfolio':
+            self.plot_portfolio_balance(df)
+        elif chart_type == 'dividend':
+            self.plot_dividend_income(df, self.last_params.payment_frequency_name)
+        elif chart_type == 'yield':
+            self.plot_yield_on_cost(df)
+        self.stale_charts.discard(chart_type)
+    
+    def read_params(self):
+        """Lê os valores dos widgets de entrada"""
+        return ProjectionParams(
+            starting_principal=self.starting_principal.value(),
+            annual_dividend_yield=self.annual_dividend_yield.value(),
+            is_taxed=self.is_taxed.isChecked(),
+            dividend_tax_rate=self.dividend_tax_rate.value(),
+            expected_annual_dividend_increase=self.expected_annual_dividend_increase.value(),
+            payment_frequency_idx=self.dividend_payment_frequency.currentIndex(),
+            event_calendar=self.event_calendar.isChecked(),
+            ex_dividend_day=self.ex_dividend_day.value(),
+            payment_lag_days=self.payment_lag_days.value(),
+            contribution_type_idx=self.contribution_type.currentIndex(),
+            periodic_contribution=self.periodic_contribution.value(),
+            contribution_raise=self.contribution_raise.value(),
+            paused_years=self.paused_years.text().strip(),
+            lump_sums=self.lump_sums.text().strip(),
+            years_invested=self.years_invested.value(),
+            dividend_reinvestment=self.dividend_reinvestment.isChecked(),
+            whole_shares=self.whole_shares.isChecked(),
+            share_price=self.share_price.value(),
+            expected_annual_share_price_appreciation=self.expected_annual_share_price_appreciation.value(),
+            annual_inflation_rate=self.annual_inflation_rate.value(),
+            index_contributions=self.index_contributions.isChecked(),
+            withdrawal_years=self.withdrawal_years.value(),
+            withdrawal_mode_idx=self.withdrawal_mode.currentIndex(),
+            withdrawal_amount=self.withdrawal_amount.value(),
+            withdrawal_rate=self.withdrawal_rate.value(),
+            account_type_idx=self.account_type.currentIndex(),
+            foreign_withholding_rate=self.foreign_withholding_rate.value(),
+            capital_gains_tax_rate=self.capital_gains_tax_rate.value(),
+            currency=self.currency.currentText(),
+        )
+    
+    @PROFILER.traced('calculate_and_plot')
     def calculate_and_plot(self):
         # Obter valores de entrada
-        starting_principal = self.starting_principal.value()
-        annual_dividend_yield = self.annual_dividend_yield.value() / 100
-        is_taxed = self.is_taxed.isChecked()
-        dividend_tax_rate = self.dividend_tax_rate.value() / 100 if is_taxed else 0
-        expected_annual_dividend_increase = self.expected_annual_dividend_increase.value() / 100
-        payment_frequency_idx = self.dividend_payment_frequency.currentIndex()
-        payment_frequency = [12, 4, 1][payment_frequency_idx]  # Mensal, Trimestral, Anual
-        payment_frequency_names = ["Monthly", "Quarterly", "Yearly"]
-        
-        contribution_type_idx = self.contribution_type.currentIndex()
-        periodic_contribution = self.periodic_contribution.value()
-        # Ajustar contribuição anual para contribuição mensal para cálculos internos
-        if contribution_type_idx == 1:  # Contribuição Anual
-            monthly_contribution = periodic_contribution / 12
-        else:  # Contribuição Mensal
-            monthly_contribution = periodic_contribution
-        
-        years_invested = self.years_invested.value()
-        dividend_reinvestment = self.dividend_reinvestment.isChecked()
-        expected_annual_share_price_appreciation = self.expected_annual_share_price_appreciation.value() / 100
+        with PROFILER.span('calculate.read_inputs'):
+            params = self.read_params()
         
         # Calcular resultados
-        months = years_invested * 12
-        
-        # Arrays para armazenar resultados
-        portfolio_values = np.zeros(months + 1)
-        dividend_income = np.zeros(months + 1)
-        yield_on_cost = np.zeros(months + 1)
-        cumulative_contributions = np.zeros(months + 1)
-        cumulative_dividends = np.zeros(months + 1)
-        
-        # Valores iniciais
-        portfolio_values[0] = starting_principal
-        yield_on_cost[0] = annual_dividend_yield * 100
-        cumulative_contributions[0] = starting_principal
-        
-        current_principal = starting_principal
-        current_yield = annual_dividend_yield
-        
-        # Loop mensal para cálculos
-        for month in range(1, months + 1):
-            # Adicionar contribuição mensal
-            current_principal += monthly_contribution
-            cumulative_contributions[month] = cumulative_contributions[month-1] + monthly_contribution
-            
-            # Calcular pagamento de dividendos neste mês
-            if month % (12 // payment_frequency) == 0:  # Verificar se é um mês de pagamento de dividendos
-                # Ajustar taxa anual para o período de pagamento
-                period_yield = current_yield / payment_frequency
-                dividend_payment = current_principal * period_yield
-                
-                # Aplicar impostos se necessário
-                if is_taxed:
-                    dividend_payment *= (1 - dividend_tax_rate)
-                
-                # Armazenar renda de dividendos
-                dividend_income[month] = dividend_payment
-                cumulative_dividends[month] = cumulative_dividends[month-1] + dividend_payment
-                
-                # Reinvestir dividendos se habilitado
-                if dividend_reinvestment:
-                    current_principal += dividend_payment
-            else:
-                dividend_income[month] = 0
-                cumulative_dividends[month] = cumulative_dividends[month-1]
-            
-            # Aplicar valorização mensal das ações (composta mensalmente)
-            monthly_appreciation = (1 + expected_annual_share_price_appreciation) ** (1/12) - 1
-            current_principal *= (1 + monthly_appreciation)
-            
-            # Atualizar taxa de dividendos anualmente
-            if month % 12 == 0:
-                current_yield *= (1 + expected_annual_dividend_increase)
-            
-            # Armazenar valor do portfólio e yield on cost
-            portfolio_values[month] = current_principal
-            if cumulative_contributions[month] > 0:
-                annual_dividend = current_principal * current_yield
-                if is_taxed:
-                    annual_dividend *= (1 - dividend_tax_rate)
-                yield_on_cost[month] = (annual_dividend / cumulative_contributions[month]) * 100
-            else:
-                yield_on_cost[month] = 0
+        with PROFILER.span('calculate.simulate', years=params.years_invested):
+            try:
+                results = simulate(params)
+            except ValueError as e:
+                QMessageBox.warning(self, "Calculation Failed", str(e))
+                return
         
-        # Converter para meses e anos para plotagem
-        months_array = np.arange(months + 1)
-        years_array = months_array / 12
+        # Guardar no histórico (séries repetidas de execuções anteriores são compartilhadas)
+        with PROFILER.span('calculate.record_history'):
+            index, results = self.history.record(params, results)
         
         # Criar dataframe para plotagem
-        df = pd.DataFrame({
-            'Years': years_array,
-            'Portfolio Value': portfolio_values,
-            'Cumulative Contributions': cumulative_contributions,
-            'Cumulative Dividends': cumulative_dividends,
-            'Appreciation': portfolio_values - cumulative_contributions - cumulative_dividends,
-            'Dividend Income': dividend_income,
-            'Yield on Cost': yield_on_cost
-        })
+        with PROFILER.span('calculate.build_dataframe'):
+            df = results_frame(results)
+        
+        with PROFILER.span('calculate.copy_results'):
+            self.df_results = df.copy()
+        self.last_params = params
+        self.last_results = results
+        self.update_history_slider(index)
+        if self.results_publisher is not None:
+            with PROFILER.span('calculate.publish'):
+                self.results_publisher.publish(results, params)
+        
+        # Plotar resultados: no painel embutido, os arquivos HTML só são gravados quando abertos
+        if self.dashboard is not None:
+            self.refresh_dashboard(df)
+            self.stale_charts = {'portfolio', 'dividend', 'yield'}
+        else:
+            self.plot_portfolio_balance(df)
+            self.plot_dividend_income(df, params.payment_frequency_name)
+            self.plot_yield_on_cost(df)
+            self.stale_charts.clear()
         
-        self.df_results = df.copy()
-		
-        # Plotar resultados
-        self.plot_portfolio_balance(df)
-        self.plot_dividend_income(df, payment_frequency_names[payment_frequency_idx])
-        self.plot_yield_on_cost(df)
+        self.schedule_session_save()
     
+    @PROFILER.traced('refresh_dashboard')
+    def refresh_dashboard(self, df=None):
+        """Envia as três figuras da projeção atual ao painel embutido, sem gravar arquivos"""
+        if self.dashboard is None or self.last_results is None:
+            return
+        df = self.current_results_frame() if df is None else df
+        params = self.last_params
+        withdrawal_start = params.years_invested if params.withdrawal_years else None
+        self.dashboard.push({
+            'portfolio': self.build_portfolio_balance_figure(df, withdrawal_start),
+            'dividend': self.build_dividend_income_figure(df, params.payment_frequency_name),
+            'yield': self.build_yield_on_cost_figure(df),
+        })
+    
+    @PROFILER.traced('plot_portfolio_balance')
     def plot_portfolio_balance(self, df):
+        params = self.last_params
+        withdrawal_start = params.years_invested if params is not None and params.withdrawal_years else None
+        fig = self.build_portfolio_balance_figure(df, withdrawal_start)
+        
+        # Serializar em memória e deixar a gravação para a fila em segundo plano
+        with PROFILER.span('plot_portfolio_balance.serialize'):
+            html, self.export_stats['portfolio'] = compact_figure_html(fig)
+        self.chart_exporter.submit('portfolio', self.html_files['portfolio'], html)
+    
+    def build_portfolio_balance_figure(self, df, withdrawal_start=None):
         # Criar o gráfico
         fig = go.Figure()
+        currency = self.display_currency()
+        money = currency_symbol(currency)
         
         # Adicionar traços para cada linha
         fig.add_trace(go.Scatter(
@@ -647,7 +1095,7 @@ class DividendPortfolioCalculator(QMainWindow):
             mode='lines',
             name='Total Portfolio Value',
             line=dict(color=COLORS['graph1'], width=3),
-            hovertemplate='Year: %{x:.1f}<br>Portfolio Value: $%{y:,.2f}<extra></extra>'
+            hovertemplate=f'Year: %{{x:.1f}}<br>Portfolio Value: {money}%{{y:,.2f}}<extra></extra>'
         ))
         
         fig.add_trace(go.Scatter(
@@ -656,7 +1104,7 @@ class DividendPortfolioCalculator(QMainWindow):
             mode='lines',
             name='Cumulative Contributions',
             line=dict(color=COLORS['graph2'], width=2, dash='dash'),
-            hovertemplate='Year: %{x:.1f}<br>Contributions: $%{y:,.2f}<extra></extra>'
+            hovertemplate=f'Year: %{{x:.1f}}<br>Contributions: {money}%{{y:,.2f}}<extra></extra>'
         ))
         
         fig.add_trace(go.Scatter(
@@ -665,7 +1113,7 @@ class DividendPortfolioCalculator(QMainWindow):
             mode='lines',
             name='Cumulative Dividends',
             line=dict(color=COLORS['graph3'], width=2, dash='dot'),
-            hovertemplate='Year: %{x:.1f}<br>Dividends: $%{y:,.2f}<extra></extra>'
+            hovertemplate=f'Year: %{{x:.1f}}<br>Dividends: {money}%{{y:,.2f}}<extra></extra>'
         ))
         
         # Adicionar área para valorização
@@ -679,7 +1127,7 @@ class DividendPortfolioCalculator(QMainWindow):
             fill='tonexty',
             fillcolor=f'rgba({int(COLORS["graph4"][1:3], 16)}, {int(COLORS["graph4"][3:5], 16)}, {int(COLORS["graph4"][5:7], 16)}, 0.2)',
             line=dict(width=0),
-            hovertemplate='Year: %{x:.1f}<br>Appreciation: $%{y:,.2f}<extra></extra>'
+            hovertemplate=f'Year: %{{x:.1f}}<br>Appreciation: {money}%{{y:,.2f}}<extra></extra>'
         ))
         
         fig.add_trace(go.Scatter(
@@ -691,11 +1139,38 @@ class DividendPortfolioCalculator(QMainWindow):
             hoverinfo='skip'
         ))
         
+        # Total retirado na fase de retiradas
+        show_withdrawals = has_withdrawals(df)
+        if show_withdrawals:
+            fig.add_trace(go.Scatter(
+                x=df['Years'], 
+                y=df['Cumulative Withdrawals'],
+                mode='lines',
+                name='Cumulative Withdrawals',
+                line=dict(color='#F7931A', width=2, dash='dash'),
+                hovertemplate=f'Year: %{{x:.1f}}<br>Withdrawals: {money}%{{y:,.2f}}<extra></extra>'
+            ))
+        if withdrawal_start is not None:
+            fig.add_vline(x=withdrawal_start, line=dict(color=COLORS['secondary'], width=1, dash='dot'),
+                          annotation_text='Withdrawals start', annotation_position='top right')
+        
+        # Valor em dinheiro de hoje (descontada a inflação)
+        show_real = has_real_terms(df)
+        if show_real:
+            fig.add_trace(go.Scatter(
+                x=df['Years'], 
+                y=df['Real Portfolio Value'],
+                mode='lines',
+                name=f"Portfolio Value (today's {currency})",
+                line=dict(color=COLORS['primary'], width=2, dash='dashdot'),
+                hovertemplate=f'Year: %{{x:.1f}}<br>Real Value: {money}%{{y:,.2f}}<extra></extra>'
+            ))
+        
         # Atualizar layout
         fig.update_layout(
             title='Portfolio Balance Over Time',
             xaxis_title='Years',
-            yaxis_title='Value ($)',
+            yaxis_title=f'Value ({money.strip()})',
             hovermode='x unified',
             hoverlabel=dict(
                 bgcolor="white",
@@ -719,14 +1194,26 @@ class DividendPortfolioCalculator(QMainWindow):
         final_value = final_row['Portfolio Value']
         total_contributions = final_row['Cumulative Contributions']
         total_dividends = final_row['Cumulative Dividends']
-        total_appreciation = final_value - total_contributions - total_dividends
+        total_appreciation = final_row['Appreciation']
+        
+        # Participação no valor final (sem sentido se o portfólio foi esgotado)
+        def share(value):
+            return f" ({value/final_value*100:.1f}%)" if final_value > 0 else ""
         
         annotation_text = (
-            f"Final Value: ${final_value:,.2f}<br>"
-            f"Contributions: ${total_contributions:,.2f} ({total_contributions/final_value*100:.1f}%)<br>"
-            f"Dividends: ${total_dividends:,.2f} ({total_dividends/final_value*100:.1f}%)<br>"
-            f"Appreciation: ${total_appreciation:,.2f} ({total_appreciation/final_value*100:.1f}%)"
+            f"Final Value: {money}{final_value:,.2f}<br>"
+            f"Contributions: {money}{total_contributions:,.2f}{share(total_contributions)}<br>"
+            f"Dividends: {money}{total_dividends:,.2f}{share(total_dividends)}<br>"
+            f"Appreciation: {money}{total_appreciation:,.2f}{share(total_appreciation)}"
         )
+        if show_real:
+            annotation_text += f"<br>Final Value in Today's {'Dollars' if currency == 'USD' else currency}: {money}{final_row['Real Portfolio Value']:,.2f}"
+        if show_withdrawals:
+            annotation_text += f"<br>Total Withdrawn: {money}{final_row['Cumulative Withdrawals']:,.2f}"
+        depleted = depletion_month(self.last_params, {'portfolio_values': df['Portfolio Value'].to_numpy()}) \
+            if self.last_params is not None and withdrawal_start is not None else None
+        if depleted is not None:
+            annotation_text += f"<br>Portfolio depleted in year {depleted / 12:.1f}"
         
         fig.add_annotation(
             x=0.15,
@@ -743,12 +1230,22 @@ class DividendPortfolioCalculator(QMainWindow):
             borderpad=4
         )
         
-        # Salvar o gráfico como HTML
-        pio.write_html(fig, file=self.html_files['portfolio'], auto_open=False)
+        return fig
     
+    @PROFILER.traced('plot_dividend_income')
     def plot_dividend_income(self, df, frequency):
+        fig = self.build_dividend_income_figure(df, frequency)
+        
+        # Serializar em memória e deixar a gravação para a fila em segundo plano
+        with PROFILER.span('plot_dividend_income.serialize'):
+            html, self.export_stats['dividend'] = compact_figure_html(fig)
+        self.chart_exporter.submit('dividend', self.html_files['dividend'], html)
+    
+    def build_dividend_income_figure(self, df, frequency):
         # Criar o gráfico
         fig = go.Figure()
+        currency = self.display_currency()
+        money = currency_symbol(currency)
         
         # Calcular média móvel de dividendos para visão anualizada
         window_size = 12  # Média anual
@@ -760,7 +1257,7 @@ class DividendPortfolioCalculator(QMainWindow):
             y=df['Dividend Income'],
             name=f'{frequency} Dividends',
             marker_color=f'rgba({int(COLORS["graph3"][1:3], 16)}, {int(COLORS["graph3"][3:5], 16)}, {int(COLORS["graph3"][5:7], 16)}, 0.4)',
-            hovertemplate='Year: %{x:.1f}<br>Dividend Payment: $%{y:,.2f}<extra></extra>'
+            hovertemplate=f'Year: %{{x:.1f}}<br>Dividend Payment: {money}%{{y:,.2f}}<extra></extra>'
         ))
         
         # Adicionar linha para dividendos anualizados
@@ -771,14 +1268,27 @@ class DividendPortfolioCalculator(QMainWindow):
             name='Annualized Dividends',
             line=dict(color=COLORS['graph3'], width=3),
             customdata=dividend_income_smoothed/12,
-            hovertemplate='Year: %{x:.1f}<br>Annual Income: $%{y:,.2f}<br>Monthly Average: $%{customdata:,.2f}<extra></extra>'
+            hovertemplate=f'Year: %{{x:.1f}}<br>Annual Income: {money}%{{y:,.2f}}<br>Monthly Average: {money}%{{customdata:,.2f}}<extra></extra>'
         ))
         
+        # Dividendos anualizados em dinheiro de hoje
+        show_real = has_real_terms(df)
+        if show_real:
+            real_income_smoothed = df['Real Dividend Income'].rolling(window=window_size, min_periods=1).sum()
+            fig.add_trace(go.Scatter(
+                x=df['Years'], 
+                y=real_income_smoothed,
+                mode='lines',
+                name=f"Annualized Dividends (today's {currency})",
+                line=dict(color=COLORS['primary'], width=2, dash='dashdot'),
+                hovertemplate=f'Year: %{{x:.1f}}<br>Real Annual Income: {money}%{{y:,.2f}}<extra></extra>'
+            ))
+        
         # Atualizar layout
         fig.update_layout(
             title='Dividend Income Over Time',
             xaxis_title='Years',
-            yaxis_title='Value ($)',
+            yaxis_title=f'Value ({money.strip()})',
             hovermode='x unified',
             hoverlabel=dict(
                 bgcolor="white",
@@ -802,10 +1312,12 @@ class DividendPortfolioCalculator(QMainWindow):
         last_annualized = dividend_income_smoothed.iloc[-1]
         
         annotation_text = (
-            f"Last Payment: ${last_payment:,.2f}<br>"
-            f"Annual Income: ${last_annualized:,.2f}<br>"
-            f"Monthly Average: ${last_annualized/12:,.2f}"
+            f"Last Payment: {money}{last_payment:,.2f}<br>"
+            f"Annual Income: {money}{last_annualized:,.2f}<br>"
+            f"Monthly Average: {money}{last_annualized/12:,.2f}"
         )
+        if show_real:
+            annotation_text += f"<br>Annual Income in Today's {'Dollars' if currency == 'USD' else currency}: {money}{real_income_smoothed.iloc[-1]:,.2f}"
         
         fig.add_annotation(
             x=0.12,
@@ -822,12 +1334,21 @@ class DividendPortfolioCalculator(QMainWindow):
             borderpad=4
         )
         
-        # Salvar o gráfico como HTML
-        pio.write_html(fig, file=self.html_files['dividend'], auto_open=False)
+        return fig
     
+    @PROFILER.traced('plot_yield_on_cost')
     def plot_yield_on_cost(self, df):
+        fig = self.build_yield_on_cost_figure(df)
+        
+        # Serializar em memória e deixar a gravação para a fila em segundo plano
+        with PROFILER.span('plot_yield_on_cost.serialize'):
+            html, self.export_stats['yield'] = compact_figure_html(fig)
+        self.chart_exporter.submit('yield', self.html_files['yield'], html)
+    
+    def build_yield_on_cost_figure(self, df):
         # Criar o gráfico
         fig = go.Figure()
+        money = currency_symbol(self.display_currency())
         
         # Adicionar linha para yield on cost
         fig.add_trace(go.Scatter(
@@ -839,6 +1360,17 @@ class DividendPortfolioCalculator(QMainWindow):
             hovertemplate='Year: %{x:.1f}<br>Yield on Cost: %{y:.2f}%<extra></extra>'
         ))
         
+        # Yield on cost real: renda e contribuições em dinheiro de hoje
+        if has_real_terms(df):
+            fig.add_trace(go.Scatter(
+                x=df['Years'], 
+                y=df['Real Yield on Cost'],
+                mode='lines',
+                name='Real Yield on Cost',
+                line=dict(color=COLORS['primary'], width=2, dash='dashdot'),
+                hovertemplate='Year: %{x:.1f}<br>Real Yield on Cost: %{y:.2f}%<extra></extra>'
+            ))
+        
         # Adicionar linha para rendimento inicial
         initial_yield = df['Yield on Cost'].iloc[0]
         
@@ -886,7 +1418,7 @@ class DividendPortfolioCalculator(QMainWindow):
             f"Initial Yield: {initial_yield:.2f}%<br>"
             f"Final Yield: {final_yield:.2f}%<br>"
             f"Increase: {increase:.1f}%<br>"
-            f"Est. Annual Income: ${estimated_annual_income:,.2f}"
+            f"Est. Annual Income: {money}{estimated_annual_income:,.2f}"
         )
         
         fig.add_annotation(
@@ -904,15 +1436,15 @@ class DividendPortfolioCalculator(QMainWindow):
             borderpad=4
         )
         
-        # Salvar o gráfico como HTML
-        pio.write_html(fig, file=self.html_files['yield'], auto_open=False)
+        return fig
 		
+    @PROFILER.traced('view_results_table')
     def view_results_table(self):
         """
         Cria e exibe uma tabela HTML com todos os resultados calculados por período.
         A tabela é salva como HTML e aberta no navegador.
         """
-        if not hasattr(self, 'df_results') or self.df_results is None:
+        if self.current_results_frame() is None:
             QMessageBox.warning(
                 self, 
                 "No Data", 
@@ -920,143 +1452,16 @@ class DividendPortfolioCalculator(QMainWindow):
             )
             return
         
-        # Criar um dataframe formatado para exibição
-        df_display = self.df_results.copy()
-        
-        # Arredondar os anos para 1 casa decimal
-        df_display['Years'] = df_display['Years'].round(1)
-        
-        # Selecionar apenas os anos completos e o final para reduzir o tamanho da tabela
-        years_to_show = list(range(0, len(df_display), 12))  # Mostrar anos completos
-        if len(df_display) - 1 not in years_to_show:  # Adicionar o último período se não estiver incluído
-            years_to_show.append(len(df_display) - 1)
-        
-        df_display = df_display.iloc[years_to_show].copy()
-        
-        # Formatar os valores para exibição
-        df_display['Portfolio Value'] = df_display['Portfolio Value'].map('${:,.2f}'.format)
-        df_display['Cumulative Contributions'] = df_display['Cumulative Contributions'].map('${:,.2f}'.format)
-        df_display['Cumulative Dividends'] = df_display['Cumulative Dividends'].map('${:,.2f}'.format)
-        df_display['Appreciation'] = df_display['Appreciation'].map('${:,.2f}'.format)
-        
-        # Calcular valores anuais e mensais de dividendos para cada período selecionado
-        annual_income = []
-        monthly_income = []
-        
-        for idx in years_to_show:
-            if idx < 12:
-                # Para o primeiro ano, pegar a soma dos primeiros 12 meses ou menos
-                annual_sum = self.df_results['Dividend Income'].iloc[:idx+1].sum()
-            else:
-                # Para os anos seguintes, pegar a soma dos 12 meses anteriores
-                annual_sum = self.df_results['Dividend Income'].iloc[idx-11:idx+1].sum()
-            
-            annual_income.append(annual_sum)
-            monthly_income.append(annual_sum / 12)
-        
-        df_display['Annual Dividend Income'] = annual_income
-        df_display['Annual Dividend Income'] = df_display['Annual Dividend Income'].map('${:,.2f}'.format)
-        
-        df_display['Monthly Dividend Income'] = monthly_income
-        df_display['Monthly Dividend Income'] = df_display['Monthly Dividend Income'].map('${:,.2f}'.format)
-        
-        df_display['Yield on Cost'] = df_display['Yield on Cost'].map('{:.2f}%'.format)
-        
-        # Renomear colunas para exibição
-        df_display = df_display.rename(columns={
-            'Years': 'Year',
-            'Portfolio Value': 'Portfolio Value',
-            'Cumulative Contributions': 'Total Contributions',
-            'Cumulative Dividends': 'Total Dividends',
-            'Appreciation': 'Total Appreciation',
-            'Yield on Cost': 'Yield on Cost'
-        })
-        
-        # Criar tabela HTML com estilo
-        html_table = df_display.to_html(index=False)
-        
-        # Adicionar estilos CSS para a tabela
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Dividend Calculator Results</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    margin: 20px;
-                    background-color: #f9f9f9;
-                }}
-                h1 {{
-                    color: #2c3e50;
-                    text-align: center;
-                }}
-                table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin: 20px 0;
-                    box-shadow: 0 0 20px rgba(0, 0, 0, 0.1);
-                    background-color: white;
-                }}
-                th, td {{
-                    padding: 12px 15px;
-                    text-align: right;
-                    border-bottom: 1px solid #ddd;
-                }}
-                th {{
-                    background-color: #3498db;
-                    color: white;
-                    font-weight: bold;
-                    text-align: center;
-                }}
-                tr:nth-child(even) {{
-                    background-color: #f2f2f2;
-                }}
-                tr:hover {{
-                    background-color: #e0f7fa;
-                }}
-                .header-row {{
-                    position: sticky;
-                    top: 0;
-                }}
-                .summary {{
-                    margin-top: 20px;
-                    padding: 15px;
-                    background-color: #e8f4f8;
-                    border-radius: 5px;
-                    border-left: 5px solid #3498db;
-                }}
-            </style>
-        </head>
-        <body>
-            <h1>Dividend Portfolio Calculator Results</h1>
-            
-            <div class="summary">
-                <h2>Summary</h2>
-                <p><strong>Initial Investment:</strong> ${self.starting_principal.value():,.2f}</p>
-                <p><strong>Monthly Contribution:</strong> ${self.periodic_contribution.value() if self.contribution_type.currentIndex() == 0 else self.periodic_contribution.value()/12:,.2f}</p>
-                <p><strong>Years Invested:</strong> {self.years_invested.value()}</p>
-                <p><strong>Initial Dividend Yield:</strong> {self.annual_dividend_yield.value()}%</p>
-                <p><strong>Expected Annual Dividend Increase:</strong> {self.expected_annual_dividend_increase.value()}%</p>
-                <p><strong>Expected Annual Share Price Appreciation:</strong> {self.expected_annual_share_price_appreciation.value()}%</p>
-                <p><strong>Dividend Reinvestment:</strong> {'Yes' if self.dividend_reinvestment.isChecked() else 'No'}</p>
-                <p><strong>Dividend Payment Frequency:</strong> {['Monthly', 'Quarterly', 'Yearly'][self.dividend_payment_frequency.currentIndex()]}</p>
-            </div>
-            
-            {html_table}
-            
-            <div class="summary">
-                <p>This table shows results at yearly intervals. For more detailed data and interactive visualizations, 
-                please use the chart views.</p>
-            </div>
-        </body>
-        </html>
-        """
+        html_content = self.build_results_table_html()
         
         # Salvar a tabela HTML
-        table_file = os.path.join(self.graphs_folder, 'results_table.html')
-        with open(table_file, 'w') as f:
-            f.write(html_content)
+        table_file = self.html_files['table']
+        self.chart_exporter.submit('table', table_file, html_content)
+        try:
+            self.chart_exporter.wait('table', timeout=30)
+        except ExportError as e:
+            QMessageBox.warning(self, "Export Failed", str(e))
+            return
         
         # Abrir no navegador
         try:
@@ -1072,11 +1477,312 @@ class DividendPortfolioCalculator(QMainWindow):
                 "Table Generated", 
                 f"Results table generated but couldn't open automatically.\nPlease open manually from: {table_file}\nError: {str(e)}"
             )
+    
+    @PROFILER.traced('export_pdf_report')
+    def export_pdf_report(self):
+        """Grava os três gráficos e a tabela num PDF estático (sem navegador) e o abre"""
+        df = self.current_results_frame()
+        if df is None:
+            QMessageBox.warning(self, "No Data", "Please calculate the results first.")
+            return
+
+        from static_export import render_report
+        try:
+            report_file, = render_report(df, self.graphs_folder, 'report', ('pdf',), self.last_params)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Export Failed", str(e))
+            return
+
+        try:
+            webbrowser.open('file://' + report_file)
+            QMessageBox.information(self, "Report Generated", f"PDF report generated and opened.\nLocation: {report_file}")
+        except Exception as e:
+            QMessageBox.information(
+                self,
+                "Report Generated",
+                f"PDF report generated but couldn't open automatically.\nPlease open manually from: {report_file}\nError: {str(e)}"
+            )
+
+    def export_arrow_results(self):
+        """Grava a última projeção em Arrow IPC (results.arrow) para notebooks e outros processos"""
+        if self.last_results is None:
+            QMessageBox.warning(self, "No Data", "Please calculate the results first.")
+            return
+        try:
+            from arrow_export import write_results
+        except ImportError:
+            QMessageBox.warning(self, "Export Failed", "Arrow export requires pyarrow (pip install pyarrow).")
+            return
+
+        arrow_file = os.path.join(self.graphs_folder, 'results.arrow')
+        try:
+            write_results(arrow_file, self.last_results, self.last_params)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Failed", str(e))
+            return
+        QMessageBox.information(self, "Results Exported", f"Results exported in Arrow format.\nLocation: {arrow_file}")
+
+    @PROFILER.traced('build_results_table_html')
+    def build_results_table_html(self):
+        """Gera o HTML da tabela de resultados anuais a partir da última projeção"""
+        return results_table_html(self.last_params, self.last_results, self.df_results)
+    
+    @PROFILER.traced('find_safe_withdrawal')
+    def find_safe_withdrawal(self):
+        """Busca a maior retirada anual fixa que dura toda a fase de retiradas"""
+        params = self.read_params()
+        if params.withdrawal_years == 0:
+            QMessageBox.warning(
+                self, 
+                "No Withdrawal Phase", 
+                "Set 'Withdrawal Years' to the length of the withdrawal phase first."
+            )
+            return
+        
+        try:
+            amount, rate = max_sustainable_withdrawal(params)
+        except ValueError as e:
+            QMessageBox.warning(self, "Search Failed", str(e))
+            return
+        
+        indexed = " (raised with inflation every year)" if params.index_contributions and params.annual_inflation_rate else ""
+        answer = QMessageBox.question(
+            self, 
+            "Max Sustainable Withdrawal", 
+            f"Maximum annual withdrawal lasting {params.withdrawal_years} years: {currency_symbol(params.currency)}{amount:,.2f}{indexed}\n"
+            f"Initial withdrawal rate: {rate:.2f}% of the portfolio after {params.years_invested} years.\n\n"
+            f"Use this amount as a fixed withdrawal and recalculate?"
+        )
+        if answer == QMessageBox.Yes:
+            self.withdrawal_mode.setCurrentIndex(WITHDRAWAL_FIXED)
+            self.withdrawal_amount.setValue(amount)
+            self.calculate_and_plot()
+    
+    @PROFILER.traced('run_stress_test')
+    def run_stress_test(self):
+        """Aplica os choques da biblioteca em cada ano de início da projeção atual e abre o resumo"""
+        if self.last_params is None:
+            QMessageBox.warning(self, "No Data", "Please calculate the results first.")
+            return
+        from stress import model_notes, run_stress, stress_html
+        try:
+            # O relatório avisa quando simula cotas inteiras ou o calendário diário de outro jeito
+            html_content = stress_html(run_stress([self.last_params]), model_notes([self.last_params]),
+                                       currency_symbol(self.last_params.currency))
+        except ValueError as e:
+            QMessageBox.warning(self, "Stress Test Failed", str(e))
+            return
 
+        stress_file = os.path.join(self.graphs_folder, 'stress_test.html')
+        try:
+            self.chart_exporter.submit('stress', stress_file, html_content)
+            self.chart_exporter.wait('stress', timeout=30)
+        except ExportError as e:
+            QMessageBox.warning(self, "Export Failed", str(e))
+            return
+        webbrowser.open('file://' + stress_file)
+        QMessageBox.information(self, "Stress Test", f"Stress test report generated and opened.\nLocation: {stress_file}")
+    
+    def add_scenario(self):
+        """Guarda a última projeção calculada como um cenário nomeado"""
+        if self.last_results is None:
+            QMessageBox.warning(self, "No Data", "Please calculate the results first.")
+            return
+        
+        name, ok = QInputDialog.getText(
+            self, "Add Scenario", "Scenario name:", text=f"Scenario {len(self.scenarios) + 1}"
+        )
+        name = name.strip()
+        if not ok or not name:
+            return
+        # Um nome repetido substitui o cenário anterior
+        self.scenarios.pop(name, None)
+        self.scenarios[name] = (self.last_params, self.last_results)
+        self.update_scenario_buttons()
+        self.schedule_session_save()
+    
+    def clear_scenarios(self):
+        self.scenarios.clear()
+        self.update_scenario_buttons()
+        self.schedule_session_save()
+    
+    def update_history_slider(self, index):
+        """Ajusta o slider ao tamanho do histórico sem disparar a navegação"""
+        self.history_slider.blockSignals(True)
+        self.history_slider.setRange(0, len(self.history) - 1)
+        self.history_slider.setValue(index)
+        self.history_slider.blockSignals(False)
+        self.history_slider.setEnabled(len(self.history) > 1)
+        self.update_history_label(index)
+    
+    def update_history_label(self, index):
+        params = self.history[index]
+        annual_income = float(np.sum(self.last_results['dividend_income'][-12:])) if self.last_results is not None else 0.0
+        portfolio_value = float(self.last_results['portfolio_values'][-1]) if self.last_results is not None else 0.0
+        money = currency_symbol(params.currency)
+        self.history_label.setText(
+            f"Run {index + 1} of {len(self.history)}: {params.years_invested} years, "
+            f"final value {money}{portfolio_value:,.2f}, last 12 months income {money}{annual_income:,.2f}"
+        )
+    
+    @PROFILER.traced('show_history_entry')
+    def show_history_entry(self, index):
+        """
+        Volta à execução index: entradas e resultados do histórico (recalculados
+        só se os arrays saíram do cache). Os gráficos são gerados quando abertos.
+        """
+        if not 0 <= index < len(self.history):
+            return
+        results = self.history.results(index)
+        params = self.history[index]
+        self.apply_params(params)
+        self.last_params = params
+        self.last_results = results
+        self.df_results = None
+        self.stale_charts = {'portfolio', 'dividend', 'yield'}
+        self.refresh_dashboard()
+        self.update_history_label(index)
+    
+    def update_scenario_buttons(self):
+        self.compare_scenarios_button.setText(f"Compare Scenarios ({len(self.scenarios)})")
+    
+    @PROFILER.traced('view_scenario_comparison')
+    def view_scenario_comparison(self):
+        """Gera uma página sobrepondo todos os cenários salvos e abre no navegador"""
+        if not self.scenarios:
+            QMessageBox.warning(
+                self, 
+                "No Scenarios", 
+                "Calculate a projection and click 'Add Scenario' to save it for comparison."
+            )
+            return
+        
+        with PROFILER.span('comparison.serialize', scenarios=len(self.scenarios)):
+            scenarios = [(name, results) for name, (_, results) in self.scenarios.items()]
+            html, self.export_stats['comparison'] = comparison_html(
+                scenarios, include_plotlyjs='directory', prefix=currency_symbol(self.display_currency()))
+        
+        try:
+            ensure_plotlyjs(self.graphs_folder)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Failed", f"Could not write plotly.min.js: {e}")
+            return
+        self.chart_exporter.submit('comparison', self.html_files['comparison'], html)
+        self.view_chart('comparison')
+    
     def show_donate_dialog(self):
         """Exibe a janela de doação"""
-        donate_dialog = DonateDialog(self)
-        donate_dialog.exec_()
+        if self.donate_dialog is None:
+            self.donate_dialog = DonateDialog(self)
+        self.donate_dialog.exec_()
+    
+    def show_diagnostics_dialog(self):
+        """Exibe o painel de diagnóstico com os tempos de cada etapa"""
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self)
+        else:
+            self.diagnostics_dialog.refresh()
+        self.diagnostics_dialog.exec_()
+
+class DiagnosticsDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.setMinimumWidth(700)
+        self.setMinimumHeight(400)
+        
+        # Pasta de exportação dos traces (a mesma dos gráficos)
+        self.export_folder = parent.graphs_folder if parent is not None else os.getcwd()
+        self.export_stats = parent.export_stats if parent is not None else {}
+        
+        # Idempotente: o diálogo também pode ser aberto sem a janela principal
+        install_stylesheet()
+        self.init_ui()
+        self.refresh()
+    
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        
+        self.enabled_checkbox = QCheckBox("Enable profiling (timings and memory deltas)")
+        self.enabled_checkbox.setChecked(PROFILER.enabled)
+        self.enabled_checkbox.stateChanged.connect(self.toggle_profiling)
+        layout.addWidget(self.enabled_checkbox)
+        
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(
+            ["Stage", "Calls", "Total (ms)", "Mean (ms)", "Max (ms)", "Memory Δ (KB)"]
+        )
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+        
+        # Tamanho dos dados exportados em cada gráfico
+        self.payload_label = QLabel()
+        self.payload_label.setWordWrap(True)
+        layout.addWidget(self.payload_label)
+        
+        button_layout = QHBoxLayout()
+        for text, slot in [("Refresh", self.refresh),
+                           ("Clear", self.clear),
+                           ("Export JSON", self.export_json),
+                           ("Export Chrome Trace", self.export_chrome_trace),
+                           ("Close", self.accept)]:
+            button = QPushButton(text)
+            button.setProperty("role", "dialog")
+            button.clicked.connect(slot)
+            button_layout.addWidget(button)
+        layout.addLayout(button_layout)
+    
+    def toggle_profiling(self, state):
+        if state == Qt.Checked:
+            PROFILER.enable()
+        else:
+            PROFILER.disable()
+    
+    def refresh(self):
+        summary = PROFILER.summary()
+        self.table.setRowCount(len(summary))
+        for row, entry in enumerate(summary):
+            # Indentar o nome conforme a profundidade do span
+            values = [
+                "    " * entry['depth'] + entry['name'],
+                str(entry['calls']),
+                f"{entry['total_ms']:.2f}",
+                f"{entry['mean_ms']:.2f}",
+                f"{entry['max_ms']:.2f}",
+                f"{entry['mem_delta_kb']:,.1f}",
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, col, item)
+        
+        lines = []
+        for key, stats in self.export_stats.items():
+            lines.append(
+                f"{key}: {stats['plain_bytes'] / 1024:,.1f} KB as JSON → "
+                f"{stats['compact_bytes'] / 1024:,.1f} KB as typed arrays "
+                f"(-{stats['reduction'] * 100:.0f}%, {stats['unique_arrays']}/{stats['arrays']} unique series)"
+            )
+        self.payload_label.setText("Chart data payloads:\n" + "\n".join(lines) if lines else "")
+    
+    def clear(self):
+        PROFILER.clear()
+        self.refresh()
+    
+    def export_json(self):
+        file_path = PROFILER.export_json(os.path.join(self.export_folder, 'diagnostics.json'))
+        QMessageBox.information(self, "Diagnostics Exported", f"Diagnostics saved.\nLocation: {file_path}")
+    
+    def export_chrome_trace(self):
+        file_path = PROFILER.export_chrome_trace(os.path.join(self.export_folder, 'diagnostics_trace.json'))
+        QMessageBox.information(
+            self, 
+            "Trace Exported", 
+            f"Chrome trace saved (open in chrome://tracing or Perfetto).\nLocation: {file_path}"
+        )
 			
 class DonateDialog(QDialog):
     def __init__(self, parent=None):
@@ -1084,28 +1790,8 @@ class DonateDialog(QDialog):
         self.setWindowTitle("Support This Project")
         self.setMinimumWidth(450)
         
-        # Utilizando a mesma paleta de cores do app principal
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {COLORS['background']};
-            }}
-            QLabel {{
-                color: {COLORS['text']};
-            }}
-            QLabel#title {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {COLORS['primary']};
-            }}
-            QLabel#address {{
-                font-family: monospace;
-                background-color: #f5f5f5;
-                padding: 10px;
-                border-radius: 4px;
-                selection-background-color: {COLORS['secondary']};
-            }}
-        """)
-        
+        # Idempotente: o diálogo também pode ser aberto sem a janela principal
+        install_stylesheet()
         self.init_ui()
     
     def init_ui(self):
@@ -1114,7 +1800,7 @@ class DonateDialog(QDialog):
         
         # Title
         title_label = QLabel("Support Dividend Portfolio Calculator")
-        title_label.setObjectName("title")
+        title_label.setObjectName("donateTitle")
         title_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(title_label)
         
@@ -1135,28 +1821,28 @@ class DonateDialog(QDialog):
         donation_layout.addWidget(bitcoin_logo)
         
         # Create QR code
-        qr_label = self.create_qr_code("bc1qxqdxgf7ncc4ekz8ldq5cc5gukpykm6hfhjad0l")
+        qr_label = self.create_qr_code(DONATE_ADDRESS)
         donation_layout.addWidget(qr_label)
         
         layout.addLayout(donation_layout)
         
         # Bitcoin address
         address_frame = QFrame()
-        address_frame.setStyleSheet(f"background-color: white; border-radius: 8px; padding: 10px;")
+        address_frame.setObjectName("addressFrame")
         address_layout = QVBoxLayout(address_frame)
         
         address_title = QLabel("Bitcoin Address:")
-        address_title.setStyleSheet("font-weight: bold;")
+        address_title.setObjectName("addressTitle")
         address_layout.addWidget(address_title)
         
-        address_label = QLabel("bc1qxqdxgf7ncc4ekz8ldq5cc5gukpykm6hfhjad0l")
+        address_label = QLabel(DONATE_ADDRESS)
         address_label.setObjectName("address")
         address_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
         address_label.setCursor(Qt.IBeamCursor)
         address_layout.addWidget(address_label)
         
         copy_info = QLabel("Click the address to select it, then copy with Ctrl+C")
-        copy_info.setStyleSheet(f"color: {COLORS['text']}; font-size: 11px;")
+        copy_info.setObjectName("copyInfo")
         address_layout.addWidget(copy_info)
         
         layout.addWidget(address_frame)
@@ -1164,7 +1850,7 @@ class DonateDialog(QDialog):
         # Thank you message
         thanks = QLabel("Thank you for your support!")
         thanks.setAlignment(Qt.AlignCenter)
-        thanks.setStyleSheet("font-weight: bold; margin-top: 10px;")
+        thanks.setObjectName("thanks")
         layout.addWidget(thanks)
         
         # Close button
@@ -1175,49 +1861,16 @@ class DonateDialog(QDialog):
         close_button.setMinimumWidth(100)
         close_button.setMinimumHeight(36)
         close_button.clicked.connect(self.accept)
-        close_button.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {COLORS['accent']};
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 8px 16px;
-            }}
-            QPushButton:hover {{
-                background-color: #2980b9;
-            }}
-        """)
+        close_button.setProperty("role", "dialog")
         button_layout.addWidget(close_button)
         
         layout.addLayout(button_layout)
     
     def create_qr_code(self, data):
         """Create a QR code for the given data"""
-        # Criar QR code com tamanho maior e borda menor
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=2,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        # Criar a imagem usando PIL
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Converter a imagem PIL para um formato que o PyQt5 possa usar
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-        
-        # Carregar a imagem como QPixmap
-        qr_pixmap = QPixmap()
-        qr_pixmap.loadFromData(buffer.getvalue())
-        
         # Criar QLabel com o QR code
         qr_label = QLabel()
-        qr_label.setPixmap(qr_pixmap.scaled(200, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        qr_label.setPixmap(qr_code_pixmap(data))
         qr_label.setAlignment(Qt.AlignCenter)
         
         return qr_label
@@ -1228,42 +1881,83 @@ class DonateDialog(QDialog):
         bitcoin_label = QLabel()
         bitcoin_label.setFixedSize(120, 120)
         
-        # Criar um QPixmap para desenhar o logo
-        pixmap = QPixmap(120, 120)
-        pixmap.fill(Qt.transparent)  # Fundo transparente
-        
-        # Iniciar o painter
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.Antialiasing)  # Para melhorar a qualidade
-        
-        # Definir cores
-        bitcoin_orange = QColor("#F7931A")
-        
-        # Desenhar círculo de fundo
-        painter.setPen(Qt.NoPen)
-        painter.setBrush(QBrush(bitcoin_orange))
-        painter.drawEllipse(10, 10, 100, 100)
-        
-        # Configurar a fonte para o símbolo ₿
-        font = QFont("Arial", 48, QFont.Bold)
-        painter.setFont(font)
-        
-        # Desenhar símbolo ₿ em branco
-        painter.setPen(QColor("white"))
-        
-        # Criar um retângulo para centralizar o texto
-        text_rect = QRect(10, 10, 100, 100)
-        painter.drawText(text_rect, Qt.AlignCenter, "₿")
-        
-        # Finalizar o painter
-        painter.end()
-        
         # Definir o pixmap como imagem do QLabel
-        bitcoin_label.setPixmap(pixmap)
+        bitcoin_label.setPixmap(bitcoin_logo_pixmap())
         bitcoin_label.setAlignment(Qt.AlignCenter)
         
         return bitcoin_label
 
+def qr_code_pixmap(data, size=200):
+    """QR code de data (size x size), guardado no QPixmapCache para as próximas aberturas"""
+    key = f"donate-qr:{size}:{data}"
+    pixmap = QPixmapCache.find(key)
+    if pixmap is not None:
+        return pixmap
+    
+    # Importado só aqui: a janela principal não precisa do qrcode para abrir
+    import qrcode
+    
+    # Criar QR code com tamanho maior e borda menor
+    box_size = 10
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=box_size,
+        border=2,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    # Módulos (com a borda) direto numa QImage em tons de cinza, sem passar por PIL e PNG
+    modules = np.array(qr.get_matrix(), dtype=bool)
+    pixels = np.ascontiguousarray(np.where(modules, 0, 255).astype(np.uint8))
+    height, width = pixels.shape
+    image = QImage(pixels.data, width, height, width, QImage.Format_Grayscale8)
+    image = image.scaled(width * box_size, height * box_size, Qt.IgnoreAspectRatio, Qt.FastTransformation)
+    pixmap = QPixmap.fromImage(image).scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    QPixmapCache.insert(key, pixmap)
+    return pixmap
+
+def bitcoin_logo_pixmap():
+    """Logo do Bitcoin (120 x 120), desenhado uma vez e guardado no QPixmapCache"""
+    key = "donate-bitcoin-logo"
+    pixmap = QPixmapCache.find(key)
+    if pixmap is not None:
+        return pixmap
+    
+    # Criar um QPixmap para desenhar o logo
+    pixmap = QPixmap(120, 120)
+    pixmap.fill(Qt.transparent)  # Fundo transparente
+    
+    # Iniciar o painter
+    painter = QPainter(pixmap)
+    painter.setRenderHint(QPainter.Antialiasing)  # Para melhorar a qualidade
+    
+    # Definir cores
+    bitcoin_orange = QColor("#F7931A")
+    
+    # Desenhar círculo de fundo
+    painter.setPen(Qt.NoPen)
+    painter.setBrush(QBrush(bitcoin_orange))
+    painter.drawEllipse(10, 10, 100, 100)
+    
+    # Configurar a fonte para o símbolo ₿
+    font = QFont("Arial", 48, QFont.Bold)
+    painter.setFont(font)
+    
+    # Desenhar símbolo ₿ em branco
+    painter.setPen(QColor("white"))
+    
+    # Criar um retângulo para centralizar o texto
+    text_rect = QRect(10, 10, 100, 100)
+    painter.drawText(text_rect, Qt.AlignCenter, "₿")
+    
+    # Finalizar o painter
+    painter.end()
+    
+    QPixmapCache.insert(key, pixmap)
+    return pixmap
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setStyle('Fusion')  # Estilo moderno
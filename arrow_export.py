@@ -0,0 +1,215 @@
+"""
+Exportação dos resultados em Apache Arrow para outros processos (notebooks,
+serviços de risco), sem passar por HTML nem por pandas.
+
+- write_results: uma projeção em arquivo Arrow IPC / Feather v2 sem
+  compressão (uma linha por mês), que o leitor pode mapear em memória
+  (read_results) sem copiar nem converter.
+- export_sweep: varredura de muitos cenários, simulada em blocos com
+  simulate_batch e gravada como um record batch por bloco. Cada série é uma
+  coluna FixedSizeList (uma linha por cenário) montada sobre o próprio array
+  2D do numpy, sem conversão em Python; o custo fica na simulação e no disco.
+- ResultsPublisher / read_published: a última projeção num segmento de
+  memória compartilhada, lido por outro processo direto da memória.
+
+Requer pyarrow (pip install pyarrow).
+"""
+import argparse
+import json
+import struct
+import sys
+import time
+from dataclasses import fields
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pyarrow as pa
+
+from engine import ProjectionParams, simulate_batch
+
+PARAMS_METADATA_KEY = b'dividend.params'
+# Cabeçalho do segmento compartilhado: sequência (ímpar durante a escrita) e tamanho do stream IPC
+SEGMENT_HEADER = struct.Struct('<QQ')
+SWEEP_CHUNK = 4096
+_PARAM_TYPES = {bool: pa.bool_(), int: pa.int32(), float: pa.float64(), str: pa.string()}
+
+
+def results_batch(results, params=None):
+    """
+    Record batch com uma linha por mês: 'month' mais uma coluna float64 por
+    série dos resultados (os buffers do numpy são usados sem cópia).
+    Os parâmetros vão como JSON nos metadados do schema.
+    """
+    names = list(results)
+    columns = [np.ascontiguousarray(results[name], dtype=np.float64) for name in names]
+    months = np.arange(len(columns[0]), dtype=np.int32) if columns else np.zeros(0, dtype=np.int32)
+    metadata = {PARAMS_METADATA_KEY: json.dumps(params.to_dict()).encode('utf-8')} if params is not None else None
+    return pa.RecordBatch.from_arrays([pa.array(months)] + [pa.array(column) for column in columns],
+                                      names=['month'] + names, metadata=metadata)
+
+
+def params_from_schema(schema):
+    """Parâmetros gravados nos metadados do schema (None se ausentes)"""
+    raw = (schema.metadata or {}).get(PARAMS_METADATA_KEY)
+    return ProjectionParams.from_dict(json.loads(raw)) if raw else None
+
+
+def write_results(path, results, params=None):
+    """Grava uma projeção em Arrow IPC (Feather v2) sem compressão, para leitura mapeada em memória"""
+    batch = results_batch(results, params)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return path
+
+
+def read_results(path):
+    """Lê um arquivo gravado por write_results ou export_sweep mapeando-o em memória (sem cópia)"""
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def sweep_schema(months, columns):
+    """Schema da varredura: índice e parâmetros do cenário, horizonte e uma lista de months + 1 valores por série"""
+    param_fields = [pa.field(field.name, _PARAM_TYPES[type(field.default)]) for field in fields(ProjectionParams)]
+    series = [pa.field(name, pa.list_(pa.float64(), months + 1)) for name in columns]
+    return pa.schema([pa.field('scenario', pa.int64()), *param_fields, pa.field('months', pa.int32()), *series])
+
+
+def sweep_batch(schema, first, params_list, batch, months, columns):
+    """Record batch de um bloco: cada série 2D (cenários x meses) vira uma coluna FixedSizeList sem cópia"""
+    rows = len(params_list)
+    horizons = np.array([params.months for params in params_list], dtype=np.int32)
+    arrays = [pa.array(np.arange(first, first + rows, dtype=np.int64))]
+    for field in fields(ProjectionParams):
+        arrays.append(pa.array([getattr(params, field.name) for params in params_list],
+                               type=schema.field(field.name).type))
+    arrays.append(pa.array(horizons))
+
+    # Meses além do horizonte de cada cenário (e além do horizonte do bloco) ficam NaN
+    beyond = np.arange(months + 1)[None, :] > horizons[:, None]
+    pad = beyond.any()
+    for name in columns:
+        values = np.ascontiguousarray(batch[name], dtype=np.float64)
+        if values.shape[1] < months + 1:
+            values = np.concatenate([values, np.full((rows, months + 1 - values.shape[1]), np.nan)], axis=1)
+        if pad:
+            values[beyond] = np.nan  # os arrays do bloco são descartados depois da gravação
+        arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1)), months + 1))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_sweep(params_list, path, columns=None, chunk_size=SWEEP_CHUNK):
+    """
+    Simula params_list em blocos de chunk_size cenários e grava um arquivo Arrow
+    IPC com uma linha por cenário (columns: séries a exportar, padrão todas).
+    Devolve o número de cenários gravados.
+    """
+    if not params_list:
+        raise ValueError("the sweep needs at least one scenario")
+    months = max(params.months for params in params_list)
+    with pa.OSFile(path, 'wb') as sink:
+        writer = None
+        try:
+            for first in range(0, len(params_list), chunk_size):
+                chunk = params_list[first:first + chunk_size]
+                with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+                    batch = simulate_batch(chunk)
+                if writer is None:
+                    columns = list(batch) if columns is None else list(columns)
+                    schema = sweep_schema(months, columns)
+                    writer = pa.ipc.new_file(sink, schema)
+                writer.write_batch(sweep_batch(schema, first, chunk, batch, months, columns))
+        finally:
+            if writer is not None:
+                writer.close()
+    return len(params_list)
+
+
+class ResultsPublisher:
+    """
+    Publica a última projeção num segmento de memória compartilhada com nome.
+    O segmento guarda um cabeçalho (sequência, tamanho) seguido do stream IPC;
+    a sequência fica ímpar durante a escrita para o leitor detectar leituras
+    concorrentes. O segmento é recriado maior quando a projeção não cabe.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.segment = None
+        self.sequence = 0
+
+    def publish(self, results, params=None):
+        batch = results_batch(results, params)
+        size = SEGMENT_HEADER.size + pa.ipc.get_record_batch_size(batch) + 4096  # schema e fim do stream
+        if self.segment is None or self.segment.size < size:
+            self.close()
+            try:
+                self.segment = shared_memory.SharedMemory(self.name, create=True, size=size * 2)
+            except FileExistsError:
+                # Segmento deixado por uma execução anterior
+                stale = shared_memory.SharedMemory(self.name)
+                stale.close()
+                stale.unlink()
+                self.segment = shared_memory.SharedMemory(self.name, create=True, size=size * 2)
+
+        buffer = self.segment.buf
+        self.sequence += 1
+        SEGMENT_HEADER.pack_into(buffer, 0, self.sequence * 2 - 1, 0)
+        sink = pa.FixedSizeBufferWriter(pa.py_buffer(buffer[SEGMENT_HEADER.size:]))
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        SEGMENT_HEADER.pack_into(buffer, 0, self.sequence * 2, sink.tell())
+        return self.sequence
+
+    def close(self):
+        """Remove o segmento (os leitores que já o abriram continuam com a cópia mapeada)"""
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
+
+
+def attach_segment(name):
+    """Abre um segmento existente sem registrá-lo no resource_tracker (que o apagaria ao sair)"""
+    segment = shared_memory.SharedMemory(name)
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+def read_published(name, retries=100):
+    """
+    Última projeção publicada em name: (tabela Arrow, sequência, segmento).
+    A tabela aponta direto para a memória do segmento, que deve continuar
+    aberto enquanto ela for usada, e vale até a próxima publicação.
+    """
+    segment = attach_segment(name)
+    for _ in range(retries):
+        sequence, length = SEGMENT_HEADER.unpack_from(segment.buf, 0)
+        if sequence % 2 == 0 and length:
+            data = pa.py_buffer(segment.buf[SEGMENT_HEADER.size:SEGMENT_HEADER.size + length])
+            table = pa.ipc.open_stream(data).read_all()
+            if SEGMENT_HEADER.unpack_from(segment.buf, 0)[0] == sequence:
+                return table, sequence // 2, segment
+        time.sleep(0.001)
+    segment.close()
+    raise TimeoutError(f"no complete projection published in {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arrow IPC export of a scenario sweep")
+    parser.add_argument('scenarios', help="JSON file with a list of parameter objects")
+    parser.add_argument('--out', default='sweep.arrow', help="output Arrow IPC file")
+    parser.add_argument('--columns', nargs='+', help="result series to export (default: all)")
+    parser.add_argument('--chunk-size', type=int, default=SWEEP_CHUNK)
+    args = parser.parse_args(argv)
+
+    with open(args.scenarios) as f:
+        params_list = [ProjectionParams.from_dict(data).validate() for data in json.load(f)]
+    start = time.perf_counter()
+    count = export_sweep(params_list, args.out, args.columns, args.chunk_size)
+    print(f"Exported {count} scenario(s) to {args.out} in {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
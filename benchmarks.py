@@ -0,0 +1,348 @@
+"""
+Suíte de benchmarks da calculadora (projeção, gráficos, tabela e inicialização).
+
+Uso:
+    QT_QPA_PLATFORM=offscreen python benchmarks.py --save-baseline
+    QT_QPA_PLATFORM=offscreen python benchmarks.py            # compara com a baseline
+
+O processo termina com código 1 quando algum caso fica mais lento ou usa mais
+memória de pico do que a baseline além do limite configurado, e também quando
+não há baseline gravada (as baselines dependem da máquina e não vão no repositório).
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from engine import (ProjectionParams, PAYMENT_FREQUENCY_NAMES, ENGINES, simulate, simulate_batch,
+                    results_frame, max_sustainable_withdrawal)
+from chart_payload import compact_figure_html
+from events import Holding, simulate_events
+from fx import FxRates, simulate_fx_batch
+from reports import results_table_html, generate_reports
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+HORIZONS = [1, 10, 50]
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """
+    Mede o melhor tempo por chamada (s) e o pico de memória (bytes) de func.
+    O número de chamadas por repetição é escolhido automaticamente, como no timeit.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 16:
+            break
+        number *= 2
+
+    gc.collect()
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    # Pico de memória medido numa execução separada, para não distorcer o tempo
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def measure_startup(repeat=3):
+    """Tempo de inicialização a frio (import + construção da janela) em um subprocesso"""
+    code = (
+        "import sys, time; start = time.perf_counter();"
+        "from PyQt5.QtWidgets import QApplication;"
+        "import app; qt_app = QApplication(sys.argv);"
+        "window = app.DividendPortfolioCalculator();"
+        "print(time.perf_counter() - start)"
+    )
+    env = dict(os.environ)
+    times = []
+    with tempfile.TemporaryDirectory() as home:
+        env['HOME'] = env['USERPROFILE'] = home
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, '-c', code], env=env, capture_output=True, text=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+            ).stdout
+            times.append(float(output.strip().splitlines()[-1]))
+    return min(times), 0
+
+
+def build_cases():
+    """Lista de (nome, função) dos casos medidos"""
+    cases = []
+
+    # Simulação para cada motor, horizonte e frequência de pagamento
+    for engine_name, simulate_fn in ENGINES.items():
+        for years in HORIZONS:
+            for idx, name in enumerate(PAYMENT_FREQUENCY_NAMES):
+                params = ProjectionParams(years_invested=years, payment_frequency_idx=idx,
+                                          periodic_contribution=500.0)
+                cases.append((f'simulate.{engine_name}[{years}y-{name.lower()}]',
+                              lambda p=params, f=simulate_fn: f(p)))
+
+    # Varredura em lote (1000 cenários de 50 anos)
+    sweep = [ProjectionParams(years_invested=50, periodic_contribution=float(i)) for i in range(1000)]
+    cases.append(('simulate_batch[1000x50y]', lambda: simulate_batch(sweep)))
+
+    # Cotas inteiras com caixa (passo mensal) contra o modelo contínuo (forma fechada)
+    for engine_name, simulate_fn in ENGINES.items():
+        for whole_shares in (False, True):
+            params = ProjectionParams(years_invested=50, periodic_contribution=500.0, payment_frequency_idx=0,
+                                      whole_shares=whole_shares)
+            label = 'whole' if whole_shares else 'fractional'
+            cases.append((f'simulate.{engine_name}[50y-monthly-{label}]', lambda p=params, f=simulate_fn: f(p)))
+    # Mesma varredura com cronograma de contribuições (aumento anual, pausa e aporte único)
+    scheduled = [replace(params, contribution_raise=3.0, paused_years='10-12', lump_sums='20: 10000') for params in sweep]
+    cases.append(('simulate_batch[1000x50y-schedule]', lambda: simulate_batch(scheduled)))
+    # Mesma varredura com ativos em 5 moedas (cotações sintéticas, matriz alinhada em cache)
+    fx_months = np.datetime64('2000-01', 'M') + np.arange(600)
+    fx_rates = FxRates({currency: (fx_months, np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.02, 600))))
+                        for seed, currency in enumerate(('EUR', 'GBP', 'CAD', 'JPY'))})
+    fx_currencies = [('', 'EUR', 'GBP', 'CAD', 'JPY')[i % 5] for i in range(len(sweep))]
+    cases.append(('simulate_fx_batch[1000x50y-5ccy]',
+                  lambda: simulate_fx_batch(sweep, fx_currencies, fx_rates, '2026-01')))
+    whole_sweep = [replace(params, whole_shares=True) for params in sweep]
+    cases.append(('simulate_batch[1000x50y-whole]', lambda: simulate_batch(whole_sweep)))
+
+    # Calendário diário: 500 ativos com datas ex e de pagamento próprias
+    calendar = ProjectionParams(years_invested=50, periodic_contribution=500.0)
+    holdings = [Holding(weight=1 + i % 7, share_price=20.0 + i % 50, payments_per_year=(1, 2, 4, 12)[i % 4],
+                        first_ex_month=i % (12 // (1, 2, 4, 12)[i % 4]), ex_dividend_day=1 + i % 28,
+                        payment_lag_days=7 + i % 30) for i in range(500)]
+    cases.append(('simulate_events[500x50y]',
+                  lambda: simulate_events(calendar, holdings, start='2025-01-01')))
+
+    # Conta tributável com ~500 lotes (contribuições e dividendos mensais) vendidos na fase de retiradas
+    taxable = ProjectionParams(years_invested=40, periodic_contribution=500.0, payment_frequency_idx=0,
+                               withdrawal_years=30, withdrawal_mode_idx=1, capital_gains_tax_rate=15.0)
+    for engine_name, simulate_fn in ENGINES.items():
+        cases.append((f'simulate.{engine_name}[taxable-40y+30y]', lambda f=simulate_fn: f(taxable)))
+
+    # Consultas pontuais em forma fechada (estado anual já em cache e a frio)
+    from queries import query, _year_states
+    queried = ProjectionParams(years_invested=50, periodic_contribution=500.0, withdrawal_years=50,
+                               withdrawal_mode_idx=1)
+    cases.append(('query[50y+50y-month-1000]', lambda: query(queried, 1000)))
+    cases.append(('query.cold[50y+50y-month-1000]',
+                  lambda: (_year_states.cache_clear(), query(queried, 1000))))
+
+    # Histórico: guardar uma execução de 50 anos (séries repetidas deduplicadas) e voltar a
+    # uma execução em cache e a uma já descartada (recalculada)
+    from history import ResultsHistory
+    history_runs = [(p, simulate(p)) for p in (replace(queried, annual_dividend_yield=y) for y in (3.0, 4.0))]
+    cases.append(('history.record[50y+50y]', lambda: ResultsHistory().record(*history_runs[0])))
+    history = ResultsHistory()
+    history.record(*history_runs[0])
+    cases.append(('history.scrub[50y+50y-cached]', lambda: history.results(0)))
+    # Sem espaço no cache: cada volta descarta a outra execução e a recalcula
+    uncached = ResultsHistory(max_bytes=0)
+    for p, r in history_runs:
+        uncached.record(p, r)
+    cases.append(('history.scrub[50y+50y-evicted]', lambda: (uncached.results(0), uncached.results(1))))
+
+    # Alocação ótima entre 200 ativos com peso máximo e yield mínimo (restrição ativa)
+    from optimizer import optimize_allocation
+    candidates = [Holding(annual_dividend_yield=1 + (i * 37 % 90) / 10, expected_annual_dividend_increase=(i * 53 % 120) / 10,
+                          expected_annual_share_price_appreciation=(i * 29 % 100) / 10 - 2,
+                          payments_per_year=(1, 2, 4, 12)[i % 4]) for i in range(200)]
+    allocation_params = ProjectionParams(years_invested=30, periodic_contribution=500.0)
+    cases.append(('optimize_allocation[200x30y]',
+                  lambda: optimize_allocation(allocation_params, candidates, max_weight=5, min_yield=8.0)))
+
+    # Rebalanceamento de 500 ativos em 50 anos: bandas 5/25, trimestral e só com aportes e dividendos
+    from rebalancing import RebalancePolicy, simulate_rebalanced
+    rebalanced = [Holding(weight=1 + i % 3, annual_dividend_yield=(i * 37 % 90) / 10,
+                          expected_annual_dividend_increase=(i * 53 % 120) / 10,
+                          expected_annual_share_price_appreciation=(i * 29 % 140) / 10 - 2,
+                          payments_per_year=(1, 2, 4, 12)[i % 4]) for i in range(500)]
+    rebalance_params = ProjectionParams(years_invested=50, periodic_contribution=1000.0)
+    for label, policy in (('threshold', RebalancePolicy('threshold')), ('quarterly', RebalancePolicy('calendar', every=3)),
+                          ('cashflow', RebalancePolicy('cashflow'))):
+        cases.append((f'simulate_rebalanced.{label}[500x50y]',
+                      lambda p=policy: simulate_rebalanced(rebalance_params, rebalanced, p)))
+
+    # Estresse: 4 choques em cada ano de início de 20 cenários de 60 anos (4800 projeções)
+    from stress import run_stress
+    stressed = [ProjectionParams(years_invested=30, withdrawal_years=30, withdrawal_amount=30000.0,
+                                 periodic_contribution=500.0 + 10 * i) for i in range(20)]
+    cases.append(('run_stress[20x4x60y]', lambda: run_stress(stressed)))
+
+    # Busca da retirada sustentável (bisseção em lote)
+    retirement = ProjectionParams(years_invested=20, periodic_contribution=500.0, withdrawal_years=30)
+    cases.append(('max_sustainable_withdrawal[20y+30y]', lambda: max_sustainable_withdrawal(retirement)))
+
+    # Gráficos e tabela precisam da janela (sem exibi-la)
+    from PyQt5.QtWidgets import QApplication
+    import app
+
+    qt_app = QApplication.instance() or QApplication(sys.argv)
+    window = app.DividendPortfolioCalculator()
+
+    for years in HORIZONS:
+        params = ProjectionParams(years_invested=years, periodic_contribution=500.0)
+        results = simulate(params)
+        df = results_frame(results)
+        builders = [
+            ('plot_portfolio_balance', lambda d=df: window.build_portfolio_balance_figure(d)),
+            ('plot_dividend_income', lambda d=df: window.build_dividend_income_figure(d, 'Quarterly')),
+            ('plot_yield_on_cost', lambda d=df: window.build_yield_on_cost_figure(d)),
+        ]
+        for name, build in builders:
+            fig = build()
+            cases.append((f'{name}.build[{years}y]', build))
+            cases.append((f'{name}.serialize[{years}y]',
+                          lambda f=fig: compact_figure_html(f, include_plotlyjs=False)))
+
+        cases.append((f'view_results_table[{years}y]',
+                      lambda p=params, r=results, d=df: results_table_html(p, r, d)))
+
+    # Atualização do painel embutido: figuras novas + delta (só o yield mudou desde o envio anterior)
+    from dashboard import DashboardEncoder
+
+    def dashboard_figures(p):
+        d = results_frame(simulate(p))
+        return {'portfolio': window.build_portfolio_balance_figure(d),
+                'dividend': window.build_dividend_income_figure(d, p.payment_frequency_name),
+                'yield': window.build_yield_on_cost_figure(d)}
+
+    dashboard_params = [ProjectionParams(years_invested=50, periodic_contribution=500.0, annual_dividend_yield=y)
+                        for y in (4.0, 5.0)]
+    encoder = DashboardEncoder()
+    encoder.encode(dashboard_figures(dashboard_params[1]))
+    cases.append(('dashboard.update[50y]',
+                  lambda: [encoder.encode(dashboard_figures(p)) for p in dashboard_params]))
+
+    # Relatórios HTML em lote (simulação em blocos + escrita dos arquivos)
+    clients = [{'name': f'client{i}', 'years_invested': 20 + i % 30, 'periodic_contribution': 100.0 + i}
+               for i in range(1000)]
+    html_folder = tempfile.mkdtemp(prefix='dividend-html-')
+    cases.append(('generate_reports[1000]', lambda: generate_reports(clients, html_folder, workers=1)))
+
+    # Varredura exportada em Arrow IPC (opcional: requer pyarrow)
+    try:
+        from arrow_export import export_sweep
+    except ImportError:
+        pass
+    else:
+        arrow_sweep = [ProjectionParams(years_invested=10, periodic_contribution=float(i % 500)) for i in range(10000)]
+        sweep_file = os.path.join(tempfile.mkdtemp(prefix='dividend-arrow-'), 'sweep.arrow')
+        cases.append(('export_sweep[10000x10y]', lambda: export_sweep(arrow_sweep, sweep_file)))
+
+    # Relatório estático completo (3 gráficos + tabela) por formato
+    from static_export import FORMATS, render_report
+    report_folder = tempfile.mkdtemp(prefix='dividend-report-')
+    for fmt in FORMATS:
+        cases.append((f'static_export.report[50y-{fmt}]',
+                      lambda d=df, f=fmt: render_report(d, report_folder, 'bench', (f,))))
+
+    cases.append(('startup', None))
+    return cases, (qt_app, window)
+
+
+def run(filter_text=None, repeat=5):
+    results = {}
+    cases, _keepalive = build_cases()
+    for name, func in cases:
+        if filter_text and filter_text not in name:
+            continue
+        if func is None:
+            seconds, peak = measure_startup()
+        else:
+            seconds, peak = measure(func, repeat=repeat)
+        results[name] = {'seconds': seconds, 'ops_per_sec': 1 / seconds, 'peak_kb': peak / 1024}
+        print(f"{name:<45} {seconds * 1000:10.3f} ms {1 / seconds:12.1f} ops/s {peak / 1024:12.1f} KB")
+    return results
+
+
+def compare(results, baseline, threshold, mem_threshold):
+    """Devolve a lista de regressões em relação à baseline
+
+    Casos sem entrada na baseline também contam: um caso novo ou renomeado
+    nunca seria medido até alguém gravar a baseline de novo.
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            regressions.append(f"{name}: not in baseline (run with --save-baseline to record it)")
+            continue
+        if current['seconds'] > reference['seconds'] * (1 + threshold):
+            regressions.append(
+                f"{name}: time {current['seconds'] * 1000:.3f} ms vs baseline "
+                f"{reference['seconds'] * 1000:.3f} ms (+{(current['seconds'] / reference['seconds'] - 1) * 100:.0f}%)"
+            )
+        if reference['peak_kb'] > 0 and current['peak_kb'] > reference['peak_kb'] * (1 + mem_threshold):
+            regressions.append(
+                f"{name}: peak memory {current['peak_kb']:.1f} KB vs baseline "
+                f"{reference['peak_kb']:.1f} KB (+{(current['peak_kb'] / reference['peak_kb'] - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dividend Portfolio Calculator benchmarks")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed time regression (0.25 = 25%%)")
+    parser.add_argument('--mem-threshold', type=float, default=0.25, help="allowed peak memory regression")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', help="only run cases whose name contains this text")
+    args = parser.parse_args(argv)
+
+    # Gráficos gerados na inicialização da janela vão para uma pasta temporária
+    home = tempfile.mkdtemp(prefix='dividend-bench-')
+    os.environ['HOME'] = os.environ['USERPROFILE'] = home
+
+    results = run(args.filter, args.repeat)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    # Sem baseline não há com o que comparar: falhar para o gate não passar em silêncio
+    if not os.path.exists(args.baseline):
+        print(f"No baseline found at {args.baseline}; run with --save-baseline first.", file=sys.stderr)
+        return 1
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold, args.mem_threshold)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
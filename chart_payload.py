@@ -0,0 +1,341 @@
+"""
+Exportação compacta dos gráficos Plotly.
+
+As séries numéricas dos traços são codificadas como arrays tipados em base64
+(float32 quando isso não altera os valores exibidos com 2 casas decimais,
+float64 caso contrário) e decodificadas no navegador para Float32Array /
+Float64Array antes do Plotly.newPlot. Arrays idênticos (por exemplo o eixo
+'Years', presente em todos os traços) são enviados uma única vez.
+"""
+import base64
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+from plotly.offline import get_plotlyjs
+from plotly.utils import PlotlyJSONEncoder
+
+# Atributos dos traços que carregam séries numéricas
+ARRAY_ATTRIBUTES = ('x', 'y', 'customdata')
+PLOTLYJS_FILENAME = 'plotly.min.js'
+
+# Decodificador executado no navegador
+DECODER_JS = """
+function decodeBlob(blob) {
+    var raw = atob(blob.data), bytes = new Uint8Array(raw.length);
+    for (var i = 0; i < raw.length; i++) { bytes[i] = raw.charCodeAt(i); }
+    return blob.dtype === 'f4' ? new Float32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+}
+function resolveBlobs(node, arrays) {
+    if (Array.isArray(node)) { return node.map(function(item) { return resolveBlobs(item, arrays); }); }
+    if (node && typeof node === 'object') {
+        if (node.hasOwnProperty('__blob__')) { return arrays[node.__blob__]; }
+        var out = {};
+        for (var key in node) { out[key] = resolveBlobs(node[key], arrays); }
+        return out;
+    }
+    return node;
+}
+"""
+
+
+def numeric_array(values):
+    """Converte values em array float64, ou devolve None se não for numérico"""
+    if values is None or isinstance(values, (str, dict)):
+        return None
+    try:
+        array = np.asarray(values)
+    except Exception:
+        return None
+    if array.ndim != 1 or array.size == 0 or array.dtype.kind not in 'biuf':
+        return None
+    return array.astype(np.float64)
+
+
+def choose_dtype(array, decimals=2):
+    """float32 quando os valores arredondados para exibição não mudam"""
+    with np.errstate(over='ignore', invalid='ignore'):
+        single = array.astype(np.float32).astype(np.float64)
+        if np.array_equal(np.round(single, decimals), np.round(array, decimals), equal_nan=True):
+            return 'f4'
+    return 'f8'
+
+
+class BlobTable:
+    """Tabela de arrays codificados, sem duplicatas"""
+
+    def __init__(self):
+        self.blobs = []
+        self._index = {}
+
+    def add(self, array, dtype=None):
+        dtype = dtype or choose_dtype(array)
+        raw = array.astype('<' + dtype).tobytes()
+        digest = (dtype, hashlib.sha1(raw).digest())
+        index = self._index.get(digest)
+        if index is None:
+            index = self._index[digest] = len(self.blobs)
+            self.blobs.append({'dtype': dtype, 'data': base64.b64encode(raw).decode('ascii')})
+        return {'__blob__': index}
+
+    @property
+    def nbytes(self):
+        return sum(len(blob['data']) for blob in self.blobs)
+
+
+def compact_figure_spec(fig, blobs):
+    """Dicionário da figura com as séries substituídas por referências à tabela de blobs"""
+    spec = fig.to_plotly_json()
+    for trace, trace_spec in zip(fig.data, spec['data']):
+        for attribute in ARRAY_ATTRIBUTES:
+            array = numeric_array(trace[attribute]) if attribute in trace else None
+            if array is not None:
+                trace_spec[attribute] = blobs.add(array)
+    return spec
+
+
+def plain_json_size(fig):
+    """Tamanho dos dados do gráfico codificados como listas JSON de números"""
+    spec = fig.to_plotly_json()
+    for trace, trace_spec in zip(fig.data, spec['data']):
+        for attribute in ARRAY_ATTRIBUTES:
+            array = numeric_array(trace[attribute]) if attribute in trace else None
+            if array is not None:
+                trace_spec[attribute] = array.tolist()
+    return len(json.dumps(spec, cls=PlotlyJSONEncoder))
+
+
+def plotlyjs_tag(include_plotlyjs):
+    if include_plotlyjs == 'directory':
+        return f'<script src="{PLOTLYJS_FILENAME}"></script>'
+    if include_plotlyjs == 'cdn':
+        return '<script src="https://cdn.plot.ly/plotly-latest.min.js"></script>'
+    if include_plotlyjs:
+        return f'<script type="text/javascript">{get_plotlyjs()}</script>'
+    return ''
+
+
+def ensure_plotlyjs(folder):
+    """Grava plotly.min.js na pasta (usado com include_plotlyjs='directory')"""
+    path = os.path.join(folder, PLOTLYJS_FILENAME)
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+    return path
+
+
+# Escapes para JSON embutido em <script>: um nome com "</script>" (ou "<!--") não pode
+# encerrar o bloco nem abrir marcação. Fora de strings o JSON não tem esses caracteres.
+SCRIPT_JSON_ESCAPES = {ord('<'): '\\u003c', ord('>'): '\\u003e', ord('&'): '\\u0026'}
+
+
+def script_json(value, **kwargs):
+    """json.dumps seguro para embutir num bloco <script>"""
+    return json.dumps(value, **kwargs).translate(SCRIPT_JSON_ESCAPES)
+
+
+def compact_figure_html(fig, include_plotlyjs=True, config=None):
+    """
+    Gera o HTML completo de um gráfico com os dados em arrays tipados.
+    Devolve (html, stats), onde stats compara o tamanho dos dados com a
+    codificação JSON tradicional.
+    """
+    blobs = BlobTable()
+    spec = compact_figure_spec(fig, blobs)
+    div_id = str(uuid.uuid4())
+    config = dict(config or {})
+    config.setdefault('responsive', True)
+
+    spec_json = script_json(spec, cls=PlotlyJSONEncoder)
+    blobs_json = json.dumps(blobs.blobs)  # só base64 e nomes de dtype
+
+    html = f"""<html>
+<head><meta charset="utf-8" /></head>
+<body>
+    <div>
+        <script type="text/javascript">window.PlotlyConfig = {{MathJaxConfig: 'local'}};</script>
+        {plotlyjs_tag(include_plotlyjs)}
+        <div id="{div_id}" class="plotly-graph-div" style="height:100%; width:100%;"></div>
+        <script type="text/javascript">
+{DECODER_JS}
+            (function() {{
+                var arrays = {blobs_json}.map(decodeBlob);
+                var figure = resolveBlobs({spec_json}, arrays);
+                Plotly.newPlot("{div_id}", figure.data, figure.layout, {script_json(config)});
+            }})();
+        </script>
+    </div>
+</body>
+</html>"""
+
+    plain_bytes = plain_json_size(fig)
+    compact_bytes = len(spec_json) + len(blobs_json)
+    stats = {
+        'plain_bytes': plain_bytes,
+        'compact_bytes': compact_bytes,
+        'reduction': 1 - compact_bytes / plain_bytes if plain_bytes else 0.0,
+        'arrays': sum(1 for t in spec['data'] for a in ARRAY_ATTRIBUTES if isinstance(t.get(a), dict)),
+        'unique_arrays': len(blobs.blobs),
+    }
+    return html, stats
+
+
+# Métricas da comparação de cenários: (coluna, título, eixo y, formato do hover)
+COMPARISON_METRICS = [
+    ('Portfolio Value', 'Portfolio Value', 'Value ($)', '$%{y:,.2f}'),
+    ('Annualized Dividends', 'Annualized Dividend Income', 'Value ($)', '$%{y:,.2f}'),
+    ('Yield on Cost', 'Yield on Cost', 'Yield (%)', '%{y:.2f}%'),
+]
+
+COMPARISON_JS = """
+(function() {
+    var arrays = %(blobs)s.map(decodeBlob);
+    var payload = resolveBlobs(%(payload)s, arrays);
+    var charts = %(charts)s;
+    var template = %(template)s;
+    var config = {responsive: true};
+    var visible = payload.scenarios.map(function() { return true; });
+
+    charts.forEach(function(chart) {
+        var traces = payload.scenarios.map(function(scenario) {
+            return {
+                type: 'scatter', mode: 'lines', name: scenario.name, legendgroup: scenario.name,
+                x: payload.years.subarray(0, scenario.length),
+                y: scenario.columns[chart.column],
+                hovertemplate: '%%{fullData.name}<br>Year: %%{x:.1f}<br>' + chart.hover + '<extra></extra>'
+            };
+        });
+        chart.layout.template = template;
+        Plotly.newPlot(chart.id, traces, chart.layout, config);
+        document.getElementById(chart.id).on('plotly_legendclick', function(event) {
+            setVisible(event.curveNumber, !visible[event.curveNumber]);
+            return false;
+        });
+    });
+
+    function apply() {
+        var state = visible.map(function(v) { return v ? true : 'legendonly'; });
+        charts.forEach(function(chart) { Plotly.restyle(chart.id, {visible: state}); });
+        visible.forEach(function(v, i) { document.getElementById('scenario-' + i).checked = v; });
+    }
+    function setVisible(index, value) { visible[index] = value; apply(); }
+
+    var panel = document.getElementById('scenario-panel');
+    payload.scenarios.forEach(function(scenario, i) {
+        var label = document.createElement('label');
+        var box = document.createElement('input');
+        box.type = 'checkbox'; box.checked = true; box.id = 'scenario-' + i;
+        box.onchange = function() { setVisible(i, box.checked); };
+        label.appendChild(box);
+        label.appendChild(document.createTextNode(' ' + scenario.name));
+        panel.appendChild(label);
+    });
+    document.getElementById('show-all').onclick = function() { visible = visible.map(function() { return true; }); apply(); };
+    document.getElementById('hide-all').onclick = function() { visible = visible.map(function() { return false; }); apply(); };
+})();
+"""
+
+
+def annualized_dividends(dividend_income):
+    """Soma móvel de 12 meses da renda de dividendos"""
+    cumulative = np.concatenate([[0.0], np.cumsum(dividend_income)])
+    index = np.arange(1, len(dividend_income) + 1)
+    return cumulative[index] - cumulative[np.maximum(index - 12, 0)]
+
+
+def comparison_html(scenarios, include_plotlyjs='directory', prefix='$'):
+    """
+    Gera uma página com um gráfico por métrica, sobrepondo todos os cenários.
+
+    scenarios: lista de (nome, resultados), onde resultados é o dicionário de
+    arrays devolvido por engine.simulate. Os dados vão num único bloco
+    colunar (eixo de tempo compartilhado + uma coluna por cenário e métrica)
+    e a visibilidade de cada cenário é alternada no navegador. prefix é o
+    símbolo da moeda dos valores.
+    """
+    from plotly import graph_objects as go
+    import plotly.io as pio
+
+    blobs = BlobTable()
+    longest = max(len(results['portfolio_values']) for _, results in scenarios)
+    payload = {'years': blobs.add(np.arange(longest) / 12), 'scenarios': []}
+    plain_bytes = len(json.dumps((np.arange(longest) / 12).tolist()))
+
+    for name, results in scenarios:
+        columns = {
+            'Portfolio Value': np.asarray(results['portfolio_values'], dtype=np.float64),
+            'Annualized Dividends': annualized_dividends(np.asarray(results['dividend_income'], dtype=np.float64)),
+            'Yield on Cost': np.asarray(results['yield_on_cost'], dtype=np.float64),
+        }
+        plain_bytes += sum(len(json.dumps(values.tolist())) for values in columns.values())
+        payload['scenarios'].append({
+            'name': name,
+            'length': len(columns['Portfolio Value']),
+            'columns': {column: blobs.add(values) for column, values in columns.items()},
+        })
+
+    charts = []
+    for index, (column, title, yaxis_title, hover) in enumerate(COMPARISON_METRICS):
+        layout = go.Layout(
+            title=f'{title} by Scenario',
+            xaxis_title='Years',
+            yaxis_title=yaxis_title.replace('$', prefix.strip()),
+            hovermode='closest',
+            margin=dict(l=20, r=20, t=40, b=20),
+            autosize=True,
+            height=600,
+        ).to_plotly_json()
+        charts.append({'id': f'chart-{index}', 'column': column, 'hover': hover.replace('$', prefix), 'layout': layout})
+
+    template = pio.templates['plotly_white'].to_plotly_json()
+    # Os nomes dos cenários (digitados pelo usuário) vão só como dados: escapados no JSON
+    # e lidos pelo hover via fullData.name, nunca concatenados ao template
+    payload_json = script_json(payload)
+    blobs_json = json.dumps(blobs.blobs)
+    script = COMPARISON_JS % {
+        'blobs': blobs_json,
+        'payload': payload_json,
+        'charts': script_json(charts, cls=PlotlyJSONEncoder),
+        'template': script_json(template, cls=PlotlyJSONEncoder),
+    }
+    chart_divs = '\n'.join(
+        f'        <div id="{chart["id"]}" class="plotly-graph-div" style="width:100%;"></div>' for chart in charts
+    )
+
+    html = f"""<html>
+<head>
+    <meta charset="utf-8" />
+    <title>Scenario Comparison</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f9f9f9; color: #2c3e50; }}
+        #scenario-panel {{ display: flex; flex-wrap: wrap; gap: 4px 16px; margin: 10px 0; }}
+        .toolbar button {{ background-color: #3498db; color: white; border: none; border-radius: 4px;
+                           padding: 6px 12px; margin-right: 6px; cursor: pointer; }}
+    </style>
+</head>
+<body>
+    <h1>Scenario Comparison</h1>
+    <div class="toolbar"><button id="show-all">Show all</button><button id="hide-all">Hide all</button></div>
+    <div id="scenario-panel"></div>
+    <script type="text/javascript">window.PlotlyConfig = {{MathJaxConfig: 'local'}};</script>
+    {plotlyjs_tag(include_plotlyjs)}
+{chart_divs}
+    <script type="text/javascript">
+{DECODER_JS}
+{script}
+    </script>
+</body>
+</html>"""
+
+    compact_bytes = len(payload_json) + len(blobs_json)
+    stats = {
+        'scenarios': len(scenarios),
+        'plain_bytes': plain_bytes,
+        'compact_bytes': compact_bytes,
+        'reduction': 1 - compact_bytes / plain_bytes if plain_bytes else 0.0,
+        'arrays': 1 + len(scenarios) * len(COMPARISON_METRICS),
+        'unique_arrays': len(blobs.blobs),
+    }
+    return html, stats
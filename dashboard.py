@@ -0,0 +1,187 @@
+"""
+Painel embutido com os três gráficos, atualizado no lugar a cada cálculo.
+
+A página (QWebEngineView) carrega o Plotly uma única vez. Cada cálculo envia
+pelo QWebChannel só o que mudou desde o envio anterior: os arrays tipados
+novos (base64, como em chart_payload) e só as chaves do layout que mudaram
+(o template vai uma vez); os traços referenciam os arrays por um id estável, e a página aplica o
+resultado com Plotly.react. Arrays que nenhum gráfico usa mais são
+descartados dos dois lados.
+
+O QtWebEngine é opcional (pacote PyQtWebEngine): sem ele, ou com
+DIVIDEND_DASHBOARD=0, a janela continua abrindo os gráficos no navegador.
+Os arquivos HTML são gravados só quando um gráfico é aberto no navegador.
+"""
+import base64
+import hashlib
+import json
+import os
+
+from plotly.utils import PlotlyJSONEncoder
+from PyQt5.QtCore import QObject, QUrl, pyqtSignal, pyqtSlot
+
+from chart_payload import ARRAY_ATTRIBUTES, DECODER_JS, PLOTLYJS_FILENAME, choose_dtype, ensure_plotlyjs, numeric_array
+
+try:
+    # Precisa ser importado antes da criação do QApplication
+    from PyQt5.QtWebChannel import QWebChannel
+    from PyQt5.QtWebEngineWidgets import QWebEngineView
+except ImportError:
+    QWebEngineView = None
+
+DASHBOARD_CHARTS = ('portfolio', 'dividend', 'yield')
+
+DASHBOARD_HTML = """<html>
+<head>
+    <meta charset="utf-8" />
+    <style>
+        html, body {{ margin: 0; height: 100%; background: white; }}
+        .chart {{ height: 33.3%; width: 100%; }}
+    </style>
+    <script type="text/javascript">window.PlotlyConfig = {{MathJaxConfig: 'local'}};</script>
+    <script src="{plotlyjs}"></script>
+    <script src="qrc:///qtwebchannel/qwebchannel.js"></script>
+</head>
+<body>
+    {divs}
+    <script type="text/javascript">
+{decoder}
+        var arrays = {{}}, layouts = {{}};
+        function applyUpdate(message) {{
+            var update = JSON.parse(message);
+            for (var id in update.blobs) {{ arrays[id] = decodeBlob(update.blobs[id]); }}
+            for (var chart in update.charts) {{
+                var figure = update.charts[chart];
+                var layout = Object.assign({{}}, layouts[chart], figure.layout);
+                (figure.removed || []).forEach(function(key) {{ delete layout[key]; }});
+                layouts[chart] = layout;
+                Plotly.react(chart, resolveBlobs(figure.data, arrays), layouts[chart], {{responsive: true}});
+            }}
+            var live = {{}};
+            update.live.forEach(function(id) {{ live[id] = arrays[id]; }});
+            arrays = live;
+        }}
+        new QWebChannel(qt.webChannelTransport, function(channel) {{
+            channel.objects.bridge.update.connect(applyUpdate);
+            channel.objects.bridge.ready();
+        }});
+    </script>
+</body>
+</html>"""
+
+
+class DashboardEncoder:
+    """
+    Codifica figuras Plotly como atualizações incrementais para a página:
+    {"blobs": {id: array novo}, "charts": {gráfico: {"data", "layout"?, "removed"?}}, "live": [ids em uso]},
+    onde "layout" traz só as chaves que mudaram e "removed" as que saíram.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Esquece o que a página já tem (página recarregada)"""
+        self._ids = {}  # (dtype, digest) -> id
+        self._sent = set()
+        self._layouts = {}
+        self._next_id = 0
+
+    def encode(self, figures):
+        blobs, live, charts = {}, set(), {}
+        for chart, fig in figures.items():
+            spec = fig.to_plotly_json()
+            for trace, trace_spec in zip(fig.data, spec['data']):
+                for attribute in ARRAY_ATTRIBUTES:
+                    array = numeric_array(trace[attribute]) if attribute in trace else None
+                    if array is not None:
+                        trace_spec[attribute] = {'__blob__': self._blob_id(array, blobs, live)}
+            # O painel divide a altura entre os três gráficos
+            spec['layout'].pop('height', None)
+            charts[chart] = {'data': spec['data'], **self._layout_delta(chart, spec['layout'])}
+        self._sent = live
+        self._ids = {key: blob_id for key, blob_id in self._ids.items() if blob_id in live}
+        return json.dumps({'blobs': blobs, 'charts': charts, 'live': sorted(live)}, cls=PlotlyJSONEncoder)
+
+    def _layout_delta(self, chart, layout):
+        """Chaves do layout que mudaram desde o último envio (o template, por exemplo, só vai na primeira vez)"""
+        previous = self._layouts.get(chart, {})
+        current = {key: json.dumps(value, cls=PlotlyJSONEncoder, sort_keys=True) for key, value in layout.items()}
+        self._layouts[chart] = current
+        delta = {}
+        changed = {key: layout[key] for key, value in current.items() if previous.get(key) != value}
+        if changed:
+            delta['layout'] = changed
+        removed = sorted(set(previous) - set(current))
+        if removed:
+            delta['removed'] = removed
+        return delta
+
+    def _blob_id(self, array, blobs, live):
+        dtype = choose_dtype(array)
+        raw = array.astype('<' + dtype).tobytes()
+        key = (dtype, hashlib.sha1(raw).digest())
+        blob_id = self._ids.get(key)
+        if blob_id is None:
+            blob_id = self._ids[key] = str(self._next_id)
+            self._next_id += 1
+        if blob_id not in self._sent and blob_id not in blobs:
+            blobs[blob_id] = {'dtype': dtype, 'data': base64.b64encode(raw).decode('ascii')}
+        live.add(blob_id)
+        return blob_id
+
+
+def dashboard_available():
+    """O painel precisa do QtWebEngine e pode ser desligado com DIVIDEND_DASHBOARD=0"""
+    return QWebEngineView is not None and os.environ.get('DIVIDEND_DASHBOARD', '1') != '0'
+
+
+class DashboardBridge(QObject):
+    """Objeto exposto à página pelo QWebChannel"""
+    update = pyqtSignal(str)
+
+    def __init__(self, on_ready, parent=None):
+        super().__init__(parent)
+        self.on_ready = on_ready
+
+    @pyqtSlot()
+    def ready(self):
+        self.on_ready()
+
+
+if QWebEngineView is not None:
+    class Dashboard(QWebEngineView):
+        """Página persistente com os três gráficos; push() envia as figuras novas"""
+
+        def __init__(self, folder, parent=None):
+            super().__init__(parent)
+            self.encoder = DashboardEncoder()
+            self.page_ready = False
+            self.figures = None
+            self.bridge = DashboardBridge(self._page_ready, self)
+            self.channel = QWebChannel(self.page())
+            self.channel.registerObject('bridge', self.bridge)
+            self.page().setWebChannel(self.channel)
+            self.page().loadStarted.connect(self._page_loading)
+
+            ensure_plotlyjs(folder)
+            divs = '\n    '.join(f'<div id="{chart}" class="chart"></div>' for chart in DASHBOARD_CHARTS)
+            html = DASHBOARD_HTML.format(plotlyjs=PLOTLYJS_FILENAME, divs=divs, decoder=DECODER_JS)
+            # Base na pasta dos gráficos para carregar o plotly.min.js já gravado lá
+            self.setHtml(html, QUrl.fromLocalFile(os.path.join(folder, '')))
+
+        def push(self, figures):
+            """Atualiza os gráficos (dicionário nome -> go.Figure); antes da página pronta só guarda as figuras"""
+            self.figures = figures
+            if self.page_ready:
+                self.bridge.update.emit(self.encoder.encode(figures))
+
+        def _page_loading(self):
+            self.page_ready = False
+
+        def _page_ready(self):
+            # Página nova (ou recarregada): nenhum array enviado antes continua lá
+            self.encoder.reset()
+            self.page_ready = True
+            if self.figures is not None:
+                self.push(self.figures)
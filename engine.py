@@ -0,0 +1,985 @@
+from collections import deque
+from dataclasses import dataclass, asdict, fields, replace
+
+import numpy as np
+import pandas as pd
+
+from schedules import ContributionSchedule, compile_schedule, parse_years, parse_lump_sums
+
+# Opções dos comboboxes da interface
+PAYMENT_FREQUENCIES = [12, 4, 1, 2]  # Mensal, Trimestral, Anual, Semestral
+PAYMENT_FREQUENCY_NAMES = ["Monthly", "Quarterly", "Yearly", "Semi-Annual"]
+CONTRIBUTION_TYPES = ["Monthly Contribution", "Annual Contribution", "Annual Lump Sum"]
+CONTRIBUTION_MONTHLY, CONTRIBUTION_ANNUAL, CONTRIBUTION_ANNUAL_LUMP = range(len(CONTRIBUTION_TYPES))
+WITHDRAWAL_MODES = ["Fixed Amount", "Percentage of Portfolio", "Dividends Only"]
+WITHDRAWAL_FIXED, WITHDRAWAL_PERCENT, WITHDRAWAL_DIVIDENDS = range(len(WITHDRAWAL_MODES))
+ACCOUNT_TYPES = ["Taxable", "Tax-Deferred", "Tax-Free"]
+ACCOUNT_TAXABLE, ACCOUNT_TAX_DEFERRED, ACCOUNT_TAX_FREE = range(len(ACCOUNT_TYPES))
+# Moedas de exibição (qualquer código ISO de 3 letras é aceito; os demais aparecem pelo código)
+CURRENCY_SYMBOLS = {'USD': '$', 'EUR': '€', 'GBP': '£', 'CAD': 'C$', 'JPY': '¥', 'CHF': 'CHF ', 'AUD': 'A$'}
+CURRENCIES = list(CURRENCY_SYMBOLS)
+
+
+# Limites dos widgets de entrada (mínimo, máximo)
+PARAM_RANGES = {
+    'starting_principal': (0, 10000000),
+    'annual_dividend_yield': (0, 100),
+    'dividend_tax_rate': (0, 100),
+    'expected_annual_dividend_increase': (0, 100),
+    'payment_frequency_idx': (0, len(PAYMENT_FREQUENCIES) - 1),
+    'contribution_type_idx': (0, len(CONTRIBUTION_TYPES) - 1),
+    'periodic_contribution': (0, 1000000),
+    'contribution_raise': (0, 100),
+    'years_invested': (1, 50),
+    'expected_annual_share_price_appreciation': (-20, 100),
+    'annual_inflation_rate': (0, 50),
+    'withdrawal_years': (0, 50),
+    'withdrawal_mode_idx': (0, len(WITHDRAWAL_MODES) - 1),
+    'withdrawal_amount': (0, 10000000),
+    'withdrawal_rate': (0, 100),
+    'account_type_idx': (0, len(ACCOUNT_TYPES) - 1),
+    'foreign_withholding_rate': (0, 100),
+    'capital_gains_tax_rate': (0, 100),
+    'share_price': (0.01, 1000000),
+    'ex_dividend_day': (1, 31),
+    'payment_lag_days': (0, 90),
+}
+
+
+@dataclass(frozen=True)
+class ProjectionParams:
+    """
+    Parâmetros de entrada da projeção, nas mesmas unidades dos widgets
+    (percentuais em %, índices dos comboboxes).
+    """
+    starting_principal: float = 10000.0
+    annual_dividend_yield: float = 4.0
+    is_taxed: bool = True
+    dividend_tax_rate: float = 30.0
+    expected_annual_dividend_increase: float = 3.0
+    payment_frequency_idx: int = 1
+    contribution_type_idx: int = 0
+    periodic_contribution: float = 0.0
+    contribution_raise: float = 0.0  # aumento anual das contribuições (%), além da inflação
+    paused_years: str = ''  # anos sem contribuições, ex.: "3, 7-9"
+    lump_sums: str = ''  # aportes únicos, ex.: "5: 20000; 10: 50000"
+    years_invested: int = 10
+    dividend_reinvestment: bool = True
+    expected_annual_share_price_appreciation: float = 3.0
+    annual_inflation_rate: float = 0.0
+    index_contributions: bool = False
+    withdrawal_years: int = 0
+    withdrawal_mode_idx: int = 0
+    withdrawal_amount: float = 0.0
+    withdrawal_rate: float = 4.0
+    account_type_idx: int = 0
+    foreign_withholding_rate: float = 0.0
+    capital_gains_tax_rate: float = 15.0
+    whole_shares: bool = False
+    share_price: float = 50.0
+    event_calendar: bool = False
+    ex_dividend_day: int = 15
+    payment_lag_days: int = 14
+    currency: str = 'USD'  # moeda de todos os valores (entradas e resultados)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Cria os parâmetros a partir de um dicionário, ignorando chaves desconhecidas"""
+        names = {f.name for f in fields(cls)}
+        kwargs = {}
+        for key, value in data.items():
+            if key not in names:
+                continue
+            default = getattr(cls, key)
+            if isinstance(default, bool):
+                value = value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+            else:
+                value = type(default)(value)
+            kwargs[key] = value
+        return cls(**kwargs)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def validate(self):
+        """Verifica se os valores estão dentro dos limites dos widgets"""
+        for name, (low, high) in PARAM_RANGES.items():
+            value = getattr(self, name)
+            if not low <= value <= high:
+                raise ValueError(f"{name} must be between {low} and {high}, got {value}")
+        parse_years(self.paused_years)
+        parse_lump_sums(self.lump_sums)
+        if not (len(self.currency) == 3 and self.currency.isalpha() and self.currency.isupper()):
+            raise ValueError(f"currency must be a 3-letter ISO code, got '{self.currency}'")
+        return self
+
+    @property
+    def payment_frequency(self):
+        return PAYMENT_FREQUENCIES[self.payment_frequency_idx]
+
+    @property
+    def payment_frequency_name(self):
+        return PAYMENT_FREQUENCY_NAMES[self.payment_frequency_idx]
+
+    @property
+    def monthly_contribution(self):
+        # Ajustar contribuição anual para contribuição mensal para cálculos internos
+        if self.contribution_type_idx != CONTRIBUTION_MONTHLY:  # Contribuição Anual
+            return self.periodic_contribution / 12
+        return self.periodic_contribution
+
+    @property
+    def has_contribution_schedule(self):
+        """Contribuições fora do caso constante (depósito anual único, aumento, pausas ou aportes únicos)"""
+        return (self.contribution_type_idx == CONTRIBUTION_ANNUAL_LUMP or self.contribution_raise > 0
+                or bool(self.paused_years.strip()) or bool(self.lump_sums.strip()))
+
+    @property
+    def contribution_schedule(self):
+        """Cronograma de contribuições da fase de acumulação (schedules.ContributionSchedule)"""
+        lump = self.contribution_type_idx == CONTRIBUTION_ANNUAL_LUMP
+        return ContributionSchedule(
+            amount=self.periodic_contribution if lump else self.monthly_contribution,
+            every=12 if lump else 1,
+            growth=self.annual_inflation_rate / 100 if self.index_contributions else 0.0,
+            raise_rate=self.contribution_raise / 100,
+            paused_years=parse_years(self.paused_years),
+            lump_sums=parse_lump_sums(self.lump_sums),
+            months=self.accumulation_months,
+        )
+
+    @property
+    def dividend_tax(self):
+        """
+        Alíquota efetiva sobre dividendos (fração). O imposto retido na fonte vale
+        para qualquer conta; na conta tributável ele é compensado no imposto local.
+        """
+        withholding = self.foreign_withholding_rate / 100
+        if self.account_type_idx == ACCOUNT_TAXABLE and self.is_taxed:
+            return max(self.dividend_tax_rate / 100, withholding)
+        return withholding
+
+    @property
+    def capital_gains_tax(self):
+        """Alíquota sobre ganhos realizados nas vendas (só na conta tributável)"""
+        if self.account_type_idx == ACCOUNT_TAXABLE and self.is_taxed:
+            return self.capital_gains_tax_rate / 100
+        return 0.0
+
+    @property
+    def withdrawal_income_tax(self):
+        """Alíquota sobre o valor retirado (conta com tributação diferida)"""
+        if self.account_type_idx == ACCOUNT_TAX_DEFERRED and self.is_taxed:
+            return self.dividend_tax_rate / 100
+        return 0.0
+
+    @property
+    def accumulation_months(self):
+        return self.years_invested * 12
+
+    @property
+    def months(self):
+        # Fase de acumulação seguida da fase de retiradas
+        return (self.years_invested + self.withdrawal_years) * 12
+
+
+def currency_symbol(currency):
+    """Prefixo dos valores na moeda (o código seguido de espaço para moedas sem símbolo conhecido)"""
+    return CURRENCY_SYMBOLS.get(currency, f'{currency} ')
+
+
+def contribution_vector(params):
+    """Contribuição de cada mês da fase de acumulação quando params tem um cronograma (None no caso constante)"""
+    return compile_schedule(params.contribution_schedule) if params.has_contribution_schedule else None
+
+
+def simulate_reference(params):
+    """
+    Simulação mês a mês original (oráculo de referência).
+
+    Este loop define a semântica do modelo: contribuição, pagamento de dividendos,
+    impostos, reinvestimento, valorização e reajuste anual do yield, nessa ordem.
+    Os motores rápidos são verificados contra ele em equivalence.py.
+
+    Os valores reais (em dinheiro de hoje) são os nominais multiplicados pelo
+    deflator (1 + inflação) ** (-meses / 12). Com contribuições indexadas, a
+    contribuição é reajustada pela inflação a cada 12 meses.
+
+    Após years_invested anos começam as retiradas (por withdrawal_years anos), no
+    início de cada mês e sem novas contribuições: um valor anual fixo (dividido
+    por 12 e, se indexado, reajustado pela inflação a cada 12 meses), um
+    percentual anual do portfólio ou apenas os dividendos, que deixam de ser
+    reinvestidos. Uma retirada fixa maior que o saldo esgota o portfólio.
+
+    Impostos conforme o tipo de conta: dividendos pela alíquota efetiva
+    (ProjectionParams.dividend_tax); vendas na conta tributável pagam imposto
+    sobre o ganho, com custo pelos lotes em ordem FIFO e prejuízos compensados
+    em ganhos futuros; retiradas da conta diferida são tributadas integralmente.
+
+    Com whole_shares, a carteira é contada em cotas inteiras (preço inicial
+    share_price, valorizado mês a mês) mais um caixa não investido: aportes e
+    dividendos reinvestidos entram no caixa e compram o maior número inteiro de
+    cotas; retiradas usam o caixa e vendem o mínimo de cotas inteiras necessário.
+    O caixa não rende dividendos nem valoriza (cash drag).
+    """
+    starting_principal = params.starting_principal
+    annual_dividend_yield = params.annual_dividend_yield / 100
+    dividend_tax_rate = params.dividend_tax
+    is_taxed = dividend_tax_rate > 0
+    capital_gains_tax = params.capital_gains_tax
+    withdrawal_income_tax = params.withdrawal_income_tax
+    expected_annual_dividend_increase = params.expected_annual_dividend_increase / 100
+    payment_frequency = params.payment_frequency
+    monthly_contribution = params.monthly_contribution
+    dividend_reinvestment = params.dividend_reinvestment
+    expected_annual_share_price_appreciation = params.expected_annual_share_price_appreciation / 100
+    inflation = params.annual_inflation_rate / 100
+    contribution_growth = inflation if params.index_contributions else 0
+    accumulation_months = params.accumulation_months
+    withdrawal_mode = params.withdrawal_mode_idx
+    monthly_withdrawal = params.withdrawal_amount / 12
+    withdrawal_rate = params.withdrawal_rate / 100
+    whole_shares = params.whole_shares
+    schedule = contribution_vector(params)
+
+    months = params.months
+
+    # Arrays para armazenar resultados
+    portfolio_values = np.zeros(months + 1)
+    dividend_income = np.zeros(months + 1)
+    yield_on_cost = np.zeros(months + 1)
+    cumulative_contributions = np.zeros(months + 1)
+    cumulative_dividends = np.zeros(months + 1)
+    real_portfolio_values = np.zeros(months + 1)
+    real_dividend_income = np.zeros(months + 1)
+    real_yield_on_cost = np.zeros(months + 1)
+    real_cumulative_contributions = np.zeros(months + 1)
+    withdrawals = np.zeros(months + 1)
+    cumulative_withdrawals = np.zeros(months + 1)
+    dividend_taxes = np.zeros(months + 1)
+    withdrawal_taxes = np.zeros(months + 1)
+    share_prices = np.zeros(months + 1)
+    shares_held = np.zeros(months + 1)
+    uninvested_cash = np.zeros(months + 1)
+
+    # Valores iniciais
+    portfolio_values[0] = starting_principal
+    yield_on_cost[0] = annual_dividend_yield * 100
+    cumulative_contributions[0] = starting_principal
+    real_portfolio_values[0] = starting_principal
+    real_yield_on_cost[0] = annual_dividend_yield * 100
+    real_cumulative_contributions[0] = starting_principal
+
+    current_principal = starting_principal
+    current_yield = annual_dividend_yield
+
+    # Cotas inteiras e caixa não investido (só no modo whole_shares)
+    price = params.share_price
+    shares, cash = 0.0, 0.0
+    purchase = starting_principal
+    if whole_shares:
+        shares, cash = _buy_whole_shares(starting_principal, price)
+        purchase = shares * price
+    share_prices[0] = price
+    shares_held[0] = shares if whole_shares else starting_principal / price
+    uninvested_cash[0] = cash
+
+    # Lotes de compra [cotas, custo] em ordem FIFO
+    lots = deque([[purchase / price, purchase]] if purchase > 0 else [])
+    realized_gains = 0.0
+    taxed_gains = 0.0
+    monthly_appreciation = (1 + expected_annual_share_price_appreciation) ** (1/12) - 1
+
+    # Loop mensal para cálculos
+    for month in range(1, months + 1):
+        withdrawal_phase = month > accumulation_months
+        withdrawal = 0
+        reinvest = dividend_reinvestment
+        sale = 0
+
+        if withdrawal_phase:
+            # Retirada no início do mês, limitada ao saldo
+            contribution = 0
+            if withdrawal_mode == WITHDRAWAL_FIXED:
+                years_withdrawing = (month - accumulation_months - 1) // 12
+                withdrawal = min(monthly_withdrawal * (1 + contribution_growth) ** years_withdrawing,
+                                 current_principal)
+            elif withdrawal_mode == WITHDRAWAL_PERCENT:
+                if withdrawal_rate > 0:
+                    withdrawal = current_principal * (withdrawal_rate / 12)
+            else:
+                reinvest = False
+            current_principal -= withdrawal
+            sale = withdrawal
+            if whole_shares:
+                sold, cash = _sell_whole_shares(withdrawal, cash, shares, price)
+                shares -= sold
+                sale = sold * price
+        else:
+            # Adicionar contribuição mensal (reajustada anualmente se indexada à inflação)
+            contribution = monthly_contribution * (1 + contribution_growth) ** ((month - 1) // 12)
+            if schedule is not None:
+                contribution = schedule[month - 1]
+        current_principal += contribution
+        cumulative_contributions[month] = cumulative_contributions[month-1] + contribution
+        purchase = contribution
+        if whole_shares:
+            bought, cash = _buy_whole_shares(cash + contribution, price)
+            shares += bought
+            purchase = bought * price
+        if purchase > 0:
+            lots.append([purchase / price, purchase])
+
+        # Venda dos lotes mais antigos e imposto sobre o ganho acumulado acima do maior já tributado
+        if sale > 0:
+            shares_to_sell = sale / price
+            cost_basis = 0.0
+            while shares_to_sell > 0 and lots:
+                lot = lots[0]
+                sold = min(lot[0], shares_to_sell)
+                cost = lot[1] * (sold / lot[0])
+                cost_basis += cost
+                lot[0] -= sold
+                lot[1] -= cost
+                shares_to_sell -= sold
+                if lot[0] <= 0:
+                    lots.popleft()
+            realized_gains += sale - cost_basis
+            if realized_gains > taxed_gains:
+                withdrawal_taxes[month] = (realized_gains - taxed_gains) * capital_gains_tax
+                taxed_gains = realized_gains
+        deflator = (1 + inflation) ** (-month / 12)
+        real_cumulative_contributions[month] = real_cumulative_contributions[month-1] + contribution * deflator
+
+        # Calcular pagamento de dividendos neste mês
+        if month % (12 // payment_frequency) == 0:  # Verificar se é um mês de pagamento de dividendos
+            # Ajustar taxa anual para o período de pagamento
+            period_yield = current_yield / payment_frequency
+            invested = shares * price if whole_shares else current_principal
+            dividend_payment = invested * period_yield
+            dividend_taxes[month] = dividend_payment * dividend_tax_rate
+
+            # Aplicar impostos se necessário
+            if is_taxed:
+                dividend_payment *= (1 - dividend_tax_rate)
+
+            # Armazenar renda de dividendos
+            dividend_income[month] = dividend_payment
+            cumulative_dividends[month] = cumulative_dividends[month-1] + dividend_payment
+
+            # Reinvestir dividendos se habilitado
+            if reinvest:
+                current_principal += dividend_payment
+                purchase = dividend_payment
+                if whole_shares:
+                    bought, cash = _buy_whole_shares(cash + dividend_payment, price)
+                    shares += bought
+                    purchase = bought * price
+                if purchase > 0:
+                    lots.append([purchase / price, purchase])
+            elif withdrawal_phase and withdrawal_mode == WITHDRAWAL_DIVIDENDS:
+                withdrawal = dividend_payment
+        else:
+            dividend_income[month] = 0
+            cumulative_dividends[month] = cumulative_dividends[month-1]
+
+        # Aplicar valorização mensal das ações (composta mensalmente); o caixa não valoriza
+        price *= (1 + monthly_appreciation)
+        if whole_shares:
+            current_principal = shares * price + cash
+        else:
+            current_principal *= (1 + monthly_appreciation)
+
+        # Atualizar taxa de dividendos anualmente
+        if month % 12 == 0:
+            current_yield *= (1 + expected_annual_dividend_increase)
+
+        # Armazenar valor do portfólio e yield on cost
+        portfolio_values[month] = current_principal
+        share_prices[month] = price
+        shares_held[month] = shares if whole_shares else current_principal / price
+        uninvested_cash[month] = cash
+        withdrawals[month] = withdrawal
+        cumulative_withdrawals[month] = cumulative_withdrawals[month-1] + withdrawal
+        if withdrawal_income_tax:
+            withdrawal_taxes[month] = withdrawal * withdrawal_income_tax
+        real_portfolio_values[month] = current_principal * deflator
+        real_dividend_income[month] = dividend_income[month] * deflator
+        if cumulative_contributions[month] > 0:
+            annual_dividend = (shares * price if whole_shares else current_principal) * current_yield
+            if is_taxed:
+                annual_dividend *= (1 - dividend_tax_rate)
+            yield_on_cost[month] = (annual_dividend / cumulative_contributions[month]) * 100
+            real_yield_on_cost[month] = (annual_dividend * deflator / real_cumulative_contributions[month]) * 100
+        else:
+            yield_on_cost[month] = 0
+            real_yield_on_cost[month] = 0
+
+    return {
+        'portfolio_values': portfolio_values,
+        'dividend_income': dividend_income,
+        'yield_on_cost': yield_on_cost,
+        'cumulative_contributions': cumulative_contributions,
+        'cumulative_dividends': cumulative_dividends,
+        'real_portfolio_values': real_portfolio_values,
+        'real_dividend_income': real_dividend_income,
+        'real_yield_on_cost': real_yield_on_cost,
+        'real_cumulative_contributions': real_cumulative_contributions,
+        'withdrawals': withdrawals,
+        'cumulative_withdrawals': cumulative_withdrawals,
+        'dividend_taxes': dividend_taxes,
+        'withdrawal_taxes': withdrawal_taxes,
+        'share_prices': share_prices,
+        'shares_held': shares_held,
+        'uninvested_cash': uninvested_cash,
+    }
+
+
+def _buy_whole_shares(cash, price):
+    """Compra o maior número inteiro de cotas com o caixa; devolve (cotas, caixa restante)"""
+    bought = np.floor(cash / price)
+    return bought, np.maximum(cash - bought * price, 0.0)
+
+
+def _sell_whole_shares(amount, cash, shares, price):
+    """Vende o mínimo de cotas inteiras para cobrir amount além do caixa; devolve (cotas, caixa restante)"""
+    sold = np.minimum(np.ceil(np.maximum(amount - cash, 0.0) / price), shares)
+    return sold, np.maximum(cash + sold * price - amount, 0.0)
+
+
+def _batch_inputs(params_list):
+    """Converte uma lista de parâmetros em vetores (um elemento por cenário)"""
+    def column(getter, dtype=float):
+        return np.array([getter(p) for p in params_list], dtype=dtype)
+
+    tax = column(lambda p: p.dividend_tax)
+    return {
+        'starting_principal': column(lambda p: p.starting_principal),
+        'annual_dividend_yield': column(lambda p: p.annual_dividend_yield / 100),
+        'tax': tax,
+        'dividend_increase': column(lambda p: p.expected_annual_dividend_increase / 100),
+        'payment_frequency': column(lambda p: p.payment_frequency, int),
+        'monthly_contribution': column(lambda p: p.monthly_contribution),
+        'reinvest': column(lambda p: p.dividend_reinvestment, bool),
+        'appreciation': column(lambda p: p.expected_annual_share_price_appreciation / 100),
+        'monthly_appreciation': column(lambda p: (1 + p.expected_annual_share_price_appreciation / 100) ** (1/12) - 1),
+        'inflation': column(lambda p: p.annual_inflation_rate / 100),
+        'contribution_growth': column(lambda p: p.annual_inflation_rate / 100 if p.index_contributions else 0),
+        'months': column(lambda p: p.months, int),
+        'accumulation_months': column(lambda p: p.accumulation_months, int),
+        'withdrawal_mode': column(lambda p: p.withdrawal_mode_idx, int),
+        'monthly_withdrawal': column(lambda p: p.withdrawal_amount / 12),
+        'withdrawal_rate': column(lambda p: p.withdrawal_rate / 100),
+        'capital_gains_tax': column(lambda p: p.capital_gains_tax),
+        'withdrawal_income_tax': column(lambda p: p.withdrawal_income_tax),
+        'whole_shares': column(lambda p: p.whole_shares, bool),
+        'share_price': column(lambda p: p.share_price),
+    }
+
+
+def simulate_batch(params_list, price_level=None, dividend_level=None):
+    """
+    Motor vetorizado: simula vários cenários de uma vez, sem loop mensal em Python.
+
+    O principal segue a recorrência linear P[m] = (a[m] * P[m-1] + c[m]) * b[m], com
+    b[m] = (1 + dividendo reinvestido) * valorização, a[m] = 1 - retirada percentual
+    e c[m] = contribuição (negativa para retiradas fixas). A solução é
+    P[m] = G[m] * (P[0] + sum(c[j] / (a[j] * G[j-1]))), G = produto acumulado de a * b,
+    válida até o primeiro mês em que a retirada fixa supera o saldo (esgotamento);
+    a partir daí o portfólio fica zerado.
+    Cenários com cotas inteiras (o arredondamento quebra a forma fechada) passam
+    por _whole_share_paths, um passo por mês vetorizado entre os cenários.
+    Devolve arrays 2D (cenários x meses + 1) no horizonte do cenário mais longo;
+    as colunas além do horizonte de cada cenário apenas continuam a simulação.
+
+    price_level e dividend_level (opcionais, cenários x meses + 1, 1 = sem choque)
+    multiplicam o nível do preço da cota e do dividendo por cota em cada mês
+    (cenários de estresse em stress.py, câmbio em fx.py). O dividendo do mês m incide sobre as
+    cotas antes da variação de preço do mês, então a taxa paga é multiplicada por
+    dividend_level[m] / price_level[m - 1]; a recorrência continua linear. Só
+    valem para cotas fracionárias.
+    """
+    inputs = _batch_inputs(params_list)
+    n_scenarios = len(params_list)
+    months = int(inputs['months'].max()) if n_scenarios else 0
+    month = np.arange(1, months + 1)
+
+    frequency = inputs['payment_frequency'][:, None]
+    is_payment_month = month % (12 // frequency) == 0
+
+    # Yield vigente durante o mês m e após o reajuste anual do mês m
+    growth = 1 + inputs['dividend_increase'][:, None]
+    base_yield = inputs['annual_dividend_yield'][:, None]
+    current_yield = base_yield * growth ** ((month - 1) // 12)
+    yield_after_bump = base_yield * growth ** (month // 12)
+
+    tax = inputs['tax'][:, None]
+    payout_rate = np.where(is_payment_month, current_yield / frequency * (1 - tax), 0.0)
+
+    # Choques de estresse: escala do dividendo pago (por cota, sobre o preço vigente) e variação do preço
+    shocked = price_level is not None or dividend_level is not None
+    if shocked:
+        if inputs['whole_shares'].any():
+            raise ValueError("price and dividend levels (stress shocks, currency conversion) require fractional shares")
+        same_level = dividend_level is price_level
+        levels_shape = (n_scenarios, months + 1)
+        price_level = np.broadcast_to(1.0 if price_level is None else price_level, levels_shape)
+        price_move = price_level[:, 1:] / price_level[:, :-1]
+        if same_level:
+            # Câmbio: preço e dividendo com o mesmo nível, o yield sobre o preço vigente não muda
+            dividend_scale = price_move
+        else:
+            dividend_level = np.broadcast_to(1.0 if dividend_level is None else dividend_level, levels_shape)
+            dividend_scale = dividend_level[:, 1:] / price_level[:, :-1]
+            yield_after_bump = yield_after_bump * dividend_level[:, 1:] / price_level[:, 1:]
+        current_yield = current_yield * dividend_scale
+        payout_rate = payout_rate * dividend_scale
+
+    # Fase de retiradas e o tipo de retirada de cada cenário
+    withdrawal_phase = month > inputs['accumulation_months'][:, None]
+    mode = inputs['withdrawal_mode'][:, None]
+    fixed_phase = withdrawal_phase & (mode == WITHDRAWAL_FIXED)
+    percent_rate = np.where(withdrawal_phase & (mode == WITHDRAWAL_PERCENT),
+                            inputs['withdrawal_rate'][:, None] / 12, 0.0)
+    dividends_phase = withdrawal_phase & (mode == WITHDRAWAL_DIVIDENDS)
+
+    monthly_appreciation = inputs['monthly_appreciation']
+    reinvested = np.where(inputs['reinvest'][:, None] & ~dividends_phase, payout_rate, 0.0)
+    factor = (1 + reinvested) * (1 + monthly_appreciation)[:, None]
+    if shocked:
+        factor = factor * price_move
+
+    # Vetor de contribuições por mês e deflator (um único vetor para todas as séries reais)
+    contribution_growth = _powers(1 + inputs['contribution_growth'], (month - 1) // 12)
+    contribution = np.where(withdrawal_phase, 0.0, inputs['monthly_contribution'][:, None] * contribution_growth)
+    # Cronogramas: o vetor mensal compilado (em cache por cronograma) substitui a contribuição constante
+    for row, params in enumerate(params_list):
+        if params.has_contribution_schedule:
+            vector = contribution_vector(params)
+            contribution[row, :len(vector)] = vector
+    years_withdrawing = (month - inputs['accumulation_months'][:, None] - 1) // 12
+    fixed_withdrawal = np.where(
+        fixed_phase,
+        inputs['monthly_withdrawal'][:, None] * _powers(1 + inputs['contribution_growth'], years_withdrawing),
+        0.0
+    )
+    deflator = (1 + inputs['inflation'])[:, None] ** (-month / 12)
+    principal = inputs['starting_principal'][:, None]
+
+    keep = 1 - percent_rate
+    flow = contribution - fixed_withdrawal
+
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        cumulative_factor = np.cumprod(keep * factor, axis=1)
+        previous_factor = np.concatenate([np.ones((n_scenarios, 1)), cumulative_factor[:, :-1]], axis=1)
+        discounted = np.cumsum(flow / (previous_factor * keep), axis=1)
+        balance = principal + discounted
+        # Principal nulo continua nulo mesmo quando o fator acumulado estoura para inf
+        values = np.where(balance == 0, 0.0, cumulative_factor * balance)
+
+        # Esgotamento: a partir do primeiro mês em que a retirada fixa supera o saldo
+        previous_values = np.concatenate([principal, values[:, :-1]], axis=1)
+        short = fixed_phase & (keep * previous_values + flow < 0)
+        depleted = np.logical_or.accumulate(short, axis=1)
+        first_depleted = depleted & ~np.concatenate([np.zeros((n_scenarios, 1), dtype=bool),
+                                                     depleted[:, :-1]], axis=1)
+        values = np.where(depleted, 0.0, values)
+        previous_values = np.where(depleted & ~first_depleted, 0.0, previous_values)
+
+        # Dividendo do mês calculado sobre o principal após a contribuição / retirada
+        dividend_income = np.where(is_payment_month & ~depleted,
+                                   (keep * previous_values + flow) * payout_rate, 0.0)
+        withdrawals = (np.where(first_depleted, previous_values, np.where(depleted, 0.0, fixed_withdrawal))
+                       + np.where(percent_rate > 0, previous_values * percent_rate, 0.0)
+                       + np.where(dividends_phase, dividend_income, 0.0))
+        dividend_taxes = np.where(is_payment_month & ~depleted,
+                                  (keep * previous_values + flow) * (current_yield / frequency) * tax, 0.0)
+        purchases = contribution + np.where(reinvested > 0, dividend_income, 0.0)
+        sales = np.where(dividends_phase, 0.0, withdrawals)
+
+        # Preço da cota: produto sequencial, como no oráculo
+        price = np.cumprod(np.concatenate([inputs['share_price'][:, None], np.broadcast_to(
+            (1 + monthly_appreciation)[:, None], (n_scenarios, months))], axis=1), axis=1)
+        if shocked:
+            price = price * price_level
+        invested = values
+        shares_held = np.concatenate([principal, values], axis=1) / price
+        uninvested_cash = np.zeros_like(price)
+        initial_shares = inputs['starting_principal'] / inputs['share_price']
+        initial_cost = inputs['starting_principal'].copy()
+
+        whole = np.flatnonzero(inputs['whole_shares'])
+        if whole.size:
+            paths = _whole_share_paths(
+                price[whole], inputs['starting_principal'][whole], contribution[whole],
+                fixed_withdrawal[whole], fixed_phase[whole], percent_rate[whole], dividends_phase[whole],
+                is_payment_month[whole], inputs['reinvest'][whole], base_yield[whole, 0], growth[whole, 0],
+                frequency[whole, 0], tax[whole, 0]
+            )
+            values, invested = values.copy(), invested.copy()
+            for name, target in [('values', values), ('invested', invested), ('dividend_income', dividend_income),
+                                 ('withdrawals', withdrawals), ('dividend_taxes', dividend_taxes),
+                                 ('purchases', purchases), ('sales', sales),
+                                 ('shares_held', shares_held), ('uninvested_cash', uninvested_cash)]:
+                target[whole] = paths[name]
+            initial_shares[whole] = shares_held[whole, 0]
+            initial_cost[whole] = shares_held[whole, 0] * inputs['share_price'][whole]
+
+        portfolio_values = np.concatenate([principal, values], axis=1)
+        dividend_income = np.concatenate([np.zeros((n_scenarios, 1)), dividend_income], axis=1)
+        withdrawals = np.concatenate([np.zeros((n_scenarios, 1)), withdrawals], axis=1)
+        cumulative_withdrawals = np.cumsum(withdrawals, axis=1)
+
+        # Impostos: sobre o dividendo bruto, sobre o ganho das vendas e sobre retiradas
+        dividend_taxes = np.concatenate([np.zeros((n_scenarios, 1)), dividend_taxes], axis=1)
+        income_tax = inputs['withdrawal_income_tax'][:, None]
+        withdrawal_taxes = np.where(income_tax > 0, withdrawals * income_tax, 0.0)
+        for row in np.flatnonzero((inputs['capital_gains_tax'] > 0) & sales.any(axis=1)):
+            withdrawal_taxes[row, 1:] = _capital_gains_tax(
+                initial_shares[row], initial_cost[row], purchases[row], sales[row],
+                price[row, :-1], inputs['capital_gains_tax'][row]
+            )
+
+        cumulative_dividends = np.cumsum(dividend_income, axis=1)
+        cumulative_contributions = np.cumsum(
+            np.concatenate([principal, contribution], axis=1), axis=1
+        )
+
+        annual_dividend = invested * yield_after_bump * (1 - tax)
+        yield_on_cost = np.zeros_like(portfolio_values)
+        np.divide(annual_dividend * 100, cumulative_contributions[:, 1:], out=yield_on_cost[:, 1:],
+                  where=cumulative_contributions[:, 1:] > 0)
+        yield_on_cost[:, 0] = base_yield[:, 0] * 100
+
+        # Séries reais a partir do deflator, sem uma segunda simulação
+        real_portfolio_values = portfolio_values.copy()
+        real_portfolio_values[:, 1:] *= deflator
+        real_dividend_income = dividend_income.copy()
+        real_dividend_income[:, 1:] *= deflator
+        real_cumulative_contributions = np.cumsum(
+            np.concatenate([principal, contribution * deflator], axis=1), axis=1
+        )
+        real_yield_on_cost = np.zeros_like(portfolio_values)
+        np.divide(annual_dividend * deflator * 100, real_cumulative_contributions[:, 1:],
+                  out=real_yield_on_cost[:, 1:], where=cumulative_contributions[:, 1:] > 0)
+        real_yield_on_cost[:, 0] = yield_on_cost[:, 0]
+
+    return {
+        'portfolio_values': portfolio_values,
+        'dividend_income': dividend_income,
+        'yield_on_cost': yield_on_cost,
+        'cumulative_contributions': cumulative_contributions,
+        'cumulative_dividends': cumulative_dividends,
+        'real_portfolio_values': real_portfolio_values,
+        'real_dividend_income': real_dividend_income,
+        'real_yield_on_cost': real_yield_on_cost,
+        'real_cumulative_contributions': real_cumulative_contributions,
+        'withdrawals': withdrawals,
+        'cumulative_withdrawals': cumulative_withdrawals,
+        'dividend_taxes': dividend_taxes,
+        'withdrawal_taxes': withdrawal_taxes,
+        'share_prices': price,
+        'shares_held': shares_held,
+        'uninvested_cash': uninvested_cash,
+    }
+
+
+def _powers(bases, exponents):
+    """
+    bases[:, None] ** exponents (expoentes inteiros) com o pow do Python, como no
+    oráculo: o np.power vetorizado pode diferir no último bit, o que mudaria o
+    arredondamento das compras de cotas inteiras.
+    """
+    exponents = np.broadcast_to(exponents, (len(bases), np.shape(exponents)[-1]))
+    if not exponents.size or not (bases != 1).any():
+        return np.ones(exponents.shape)
+    low, high = int(exponents.min()), int(exponents.max())
+    table = np.array([[base ** k for k in range(low, high + 1)] for base in bases.tolist()])
+    return np.take_along_axis(table, exponents - low, axis=1)
+
+
+def _whole_share_paths(price, starting_principal, contribution, fixed_withdrawal, fixed_phase, percent_rate,
+                       dividends_phase, is_payment_month, reinvest, base_yield, growth, frequency, tax):
+    """
+    Carteira em cotas inteiras com caixa não investido, um passo por mês.
+
+    O arredondamento das compras e vendas impede a forma fechada, então o estado
+    (cotas, caixa) avança mês a mês, mas cada passo opera sobre todos os cenários
+    de uma vez, com as mesmas operações e na mesma ordem do oráculo. Os arrays
+    de entrada são (cenários x meses); price inclui o preço inicial. Tudo o que
+    não depende do estado (máscaras, yield do período) é calculado antes do loop,
+    e etapas sem efeito em nenhum cenário no mês (retirada, dividendo) são puladas.
+    """
+    n_scenarios, months = contribution.shape
+    # Yield reajustado ano a ano por multiplicação sucessiva, como no oráculo
+    yearly_yield = np.empty((months // 12 + 1, n_scenarios))
+    yearly_yield[0] = base_yield
+    for year in range(1, len(yearly_yield)):
+        yearly_yield[year] = yearly_yield[year - 1] * growth
+    period_yield = yearly_yield[np.arange(months) // 12] / frequency.astype(float)
+
+    # Arrays por mês contíguos na memória (meses x cenários)
+    price, contribution, fixed_withdrawal, percent_rate = (
+        np.ascontiguousarray(x.T) for x in (price, contribution, fixed_withdrawal, percent_rate))
+    fixed_phase, is_payment_month = np.ascontiguousarray(fixed_phase.T), np.ascontiguousarray(is_payment_month.T)
+    reinvest_now = is_payment_month & reinvest & ~dividends_phase.T
+    paid_out = is_payment_month & dividends_phase.T
+    withdrawing = (fixed_phase.any(axis=1) | (percent_rate > 0).any(axis=1)).tolist()
+    paying = is_payment_month.any(axis=1).tolist()
+    all_paying = is_payment_month.all(axis=1).tolist()
+    all_reinvesting = reinvest_now.all(axis=1).tolist()
+    any_paid_out = paid_out.any(axis=1).tolist()
+    keep_after_tax = 1 - tax
+
+    values, invested_values, dividend_income, withdrawals, dividend_taxes, purchases, sales = (
+        np.zeros((months, n_scenarios)) for _ in range(7))
+    shares_held = np.zeros((months + 1, n_scenarios))
+    uninvested_cash = np.zeros((months + 1, n_scenarios))
+
+    shares, cash = _buy_whole_shares(starting_principal, price[0])
+    shares_held[0], uninvested_cash[0] = shares, cash
+    value = starting_principal
+    for m in range(months):
+        p = price[m]
+        if withdrawing[m]:
+            # Retirada: caixa primeiro, depois venda de cotas inteiras
+            withdrawal = (np.where(fixed_phase[m], np.fmin(fixed_withdrawal[m], value), 0.0)
+                          + np.where(percent_rate[m] > 0, value * percent_rate[m], 0.0))
+            sold, cash = _sell_whole_shares(withdrawal, cash, shares, p)
+            shares = shares - sold
+            withdrawals[m] = withdrawal
+            sales[m] = sold * p
+
+        # Aporte compra cotas inteiras; a sobra fica em caixa
+        bought, cash = _buy_whole_shares(cash + contribution[m], p)
+        shares = shares + bought
+        purchases[m] = bought * p
+
+        if paying[m]:
+            # Dividendo só sobre as cotas (o caixa não rende)
+            gross = shares * p * period_yield[m]
+            if not all_paying[m]:
+                gross = np.where(is_payment_month[m], gross, 0.0)
+            net = gross * keep_after_tax
+            bought, reinvest_cash = _buy_whole_shares(cash + net, p)
+            if all_reinvesting[m]:
+                shares, cash = shares + bought, reinvest_cash
+                purchases[m] += bought * p
+            else:
+                reinvesting = reinvest_now[m]
+                shares = np.where(reinvesting, shares + bought, shares)
+                cash = np.where(reinvesting, reinvest_cash, cash)
+                purchases[m] += np.where(reinvesting, bought * p, 0.0)
+            if any_paid_out[m]:
+                withdrawals[m] += np.where(paid_out[m], net, 0.0)
+            dividend_income[m] = net
+            dividend_taxes[m] = gross * tax
+
+        invested = shares * price[m + 1]
+        value = invested + cash
+        values[m] = value
+        invested_values[m] = invested
+        shares_held[m + 1] = shares
+        uninvested_cash[m + 1] = cash
+
+    return {
+        'values': values.T, 'invested': invested_values.T, 'dividend_income': dividend_income.T,
+        'withdrawals': withdrawals.T, 'dividend_taxes': dividend_taxes.T, 'purchases': purchases.T,
+        'sales': sales.T, 'shares_held': shares_held.T, 'uninvested_cash': uninvested_cash.T,
+    }
+
+
+def _capital_gains_tax(initial_shares, initial_cost, purchases, sales, price, rate):
+    """
+    Imposto mensal sobre ganhos de capital com custo FIFO, sem objetos por lote.
+
+    As compras formam uma curva acumulada (cotas, custo) linear por partes, um
+    segmento por lote; o custo FIFO das cotas vendidas até o mês m é a
+    interpolação dessa curva no total de cotas vendidas. Prejuízos compensam
+    ganhos futuros: o imposto incide sobre os novos máximos do ganho acumulado.
+    """
+    sales = np.where(sales > 0, sales, 0.0)  # Só vendas efetivas (descarta nan após overflow)
+    shares = np.concatenate([[0.0, initial_shares], purchases / price])
+    cost = np.concatenate([[0.0, initial_cost], purchases])
+    sold_basis = np.interp(np.cumsum(sales / price), np.cumsum(shares), np.cumsum(cost))
+    cost_basis = np.diff(sold_basis, prepend=0.0)
+    realized = np.cumsum(sales - cost_basis)
+    taxed = np.maximum.accumulate(np.maximum(realized, 0.0))
+    return np.diff(taxed, prepend=0.0) * rate
+
+
+def simulate_vectorized(params):
+    """Motor vetorizado para um único cenário"""
+    batch = simulate_batch([params])
+    months = params.months
+    return {key: values[0, :months + 1] for key, values in batch.items()}
+
+
+# Motores disponíveis; todos devem produzir os mesmos resultados que o oráculo
+ENGINES = {
+    'reference': simulate_reference,
+    'vectorized': simulate_vectorized,
+}
+DEFAULT_ENGINE = 'vectorized'
+
+
+def simulate(params, engine=DEFAULT_ENGINE):
+    """
+    Simula a projeção com o motor escolhido; devolve um dicionário de arrays.
+    Com params.event_calendar a projeção usa o motor diário de events.py.
+    """
+    if params.event_calendar:
+        from events import simulate_events  # events importa este módulo
+        return simulate_events(params)
+    return ENGINES[engine](params)
+
+
+def depletion_month(params, results):
+    """Mês em que retiradas fixas esgotam o portfólio (None se ele durar até o fim)"""
+    if not params.withdrawal_years or params.withdrawal_mode_idx != WITHDRAWAL_FIXED or not params.withdrawal_amount:
+        return None
+    start = params.accumulation_months + 1
+    empty = np.flatnonzero(np.asarray(results['portfolio_values'])[start:] <= 0)
+    return start + int(empty[0]) if empty.size else None
+
+
+def max_sustainable_withdrawal(params, candidates=64, precision=0.01, max_rounds=12):
+    """
+    Maior retirada anual fixa que não esgota o portfólio na fase de retiradas.
+
+    Bisseção em lote: cada rodada simula `candidates` valores igualmente espaçados
+    do intervalo atual numa única chamada de simulate_batch e fica com o par
+    vizinho (último sustentável, primeiro que esgota), até a precisão pedida.
+    Devolve (retirada anual, percentual do portfólio no início das retiradas).
+    """
+    if params.withdrawal_years <= 0:
+        raise ValueError("withdrawal_years must be greater than zero")
+    if params.event_calendar:
+        # A busca usa simulate_batch, e o motor diário não modela a fase de retiradas
+        raise ValueError("the event calendar does not model the withdrawal phase")
+    base = replace(params, withdrawal_mode_idx=WITHDRAWAL_FIXED)
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        start_value = simulate_batch([replace(base, withdrawal_years=0)])['portfolio_values'][0, -1]
+    if not np.isfinite(start_value):
+        raise ValueError("portfolio value overflows before the withdrawal phase")
+    if start_value <= 0:
+        return 0.0, 0.0
+
+    # Retirar mais que o saldo no primeiro mês sempre esgota o portfólio
+    low, high = 0.0, start_value * 12 + 12
+    for _ in range(max_rounds):
+        if high - low <= precision:
+            break
+        amounts = np.linspace(low, high, candidates)
+        with np.errstate(over='ignore', invalid='ignore'):
+            final = simulate_batch([replace(base, withdrawal_amount=float(a)) for a in amounts])['portfolio_values'][:, -1]
+        sustainable = np.flatnonzero(final > 0)
+        last = int(sustainable[-1]) if sustainable.size else 0
+        low, high = float(amounts[last]), float(amounts[min(last + 1, candidates - 1)])
+
+    amount = np.floor(low / precision) * precision
+    return float(amount), float(amount / start_value * 100)
+
+
+def results_frame(results):
+    """Monta o DataFrame usado pelos gráficos e pela tabela de resultados"""
+    portfolio_values = results['portfolio_values']
+    cumulative_contributions = results['cumulative_contributions']
+    cumulative_dividends = results['cumulative_dividends']
+
+    # Converter para meses e anos para plotagem
+    months_array = np.arange(len(portfolio_values))
+    years_array = months_array / 12
+
+    columns = {
+        'Years': years_array,
+        'Portfolio Value': portfolio_values,
+        'Cumulative Contributions': cumulative_contributions,
+        'Cumulative Dividends': cumulative_dividends,
+        'Appreciation': portfolio_values - cumulative_contributions - cumulative_dividends,
+        'Dividend Income': results['dividend_income'],
+        'Yield on Cost': results['yield_on_cost']
+    }
+    # Retiradas (ausentes em sessões gravadas por versões anteriores)
+    if 'withdrawals' in results:
+        columns['Withdrawals'] = results['withdrawals']
+        columns['Cumulative Withdrawals'] = results['cumulative_withdrawals']
+        columns['Appreciation'] = columns['Appreciation'] + results['cumulative_withdrawals']
+    # Impostos pagos sobre dividendos e retiradas
+    if 'dividend_taxes' in results:
+        taxes = results['dividend_taxes'] + results['withdrawal_taxes']
+        columns['Taxes Paid'] = taxes
+        columns['Cumulative Taxes'] = np.cumsum(taxes)
+        columns['Net Withdrawals'] = results['withdrawals'] - results['withdrawal_taxes']
+    # Cotas e caixa não investido (ausentes em sessões gravadas por versões anteriores)
+    if 'shares_held' in results:
+        columns['Share Price'] = results['share_prices']
+        columns['Shares Held'] = results['shares_held']
+        columns['Uninvested Cash'] = results['uninvested_cash']
+    # Séries em valores reais (ausentes em sessões gravadas por versões anteriores)
+    for column, key in REAL_COLUMNS.items():
+        if key in results:
+            columns[column] = results[key]
+    return pd.DataFrame(columns)
+
+
+# Colunas do DataFrame em valores reais -> chave nos resultados da simulação
+REAL_COLUMNS = {
+    'Real Portfolio Value': 'real_portfolio_values',
+    'Real Cumulative Contributions': 'real_cumulative_contributions',
+    'Real Dividend Income': 'real_dividend_income',
+    'Real Yield on Cost': 'real_yield_on_cost',
+}
+
+
+def has_real_terms(df):
+    """Indica se a projeção tem inflação (séries reais diferentes das nominais)"""
+    return 'Real Portfolio Value' in df and bool((df['Real Portfolio Value'] != df['Portfolio Value']).any())
+
+
+def results_table(df):
+    """
+    Linhas da tabela de resultados: anos completos e o último período, com a
+    renda de dividendos dos 12 meses anteriores (anual e média mensal).
+    """
+    # Selecionar apenas os anos completos e o final para reduzir o tamanho da tabela
+    years_to_show = list(range(0, len(df), 12))
+    if len(df) - 1 not in years_to_show:
+        years_to_show.append(len(df) - 1)
+
+    # Montar todas as colunas de uma vez (inserir colunas num DataFrame é caro)
+    columns = {column: df[column].to_numpy()[years_to_show] for column in df.columns}
+    columns['Years'] = np.round(columns['Years'], 1)
+
+    # Calcular valores anuais e mensais de dividendos para cada período selecionado
+    columns['Annual Dividend Income'] = _trailing_annual_income(df['Dividend Income'], years_to_show)
+    columns['Monthly Dividend Income'] = columns['Annual Dividend Income'] / 12
+    if 'Real Dividend Income' in df:
+        columns['Real Annual Dividend Income'] = _trailing_annual_income(df['Real Dividend Income'], years_to_show)
+    if 'Withdrawals' in df:
+        columns['Annual Withdrawals'] = _trailing_annual_income(df['Withdrawals'], years_to_show)
+    if 'Net Withdrawals' in df:
+        columns['Annual Net Withdrawals'] = _trailing_annual_income(df['Net Withdrawals'], years_to_show)
+    return pd.DataFrame(columns, index=df.index[years_to_show])
+
+
+def has_withdrawals(df):
+    """Indica se a projeção teve retiradas"""
+    return 'Cumulative Withdrawals' in df and bool(df['Cumulative Withdrawals'].iloc[-1] > 0)
+
+
+def _trailing_annual_income(dividend_income, rows):
+    """Soma da renda de dividendos dos 12 meses até cada linha (NaN conta como zero)"""
+    values = np.asarray(dividend_income, dtype=np.float64)
+    rows = np.asarray(rows)
+    annual_income = np.empty(len(rows))
+    # Para o primeiro ano, a soma dos primeiros 12 meses ou menos
+    short = rows < 12
+    for position in np.flatnonzero(short):
+        annual_income[position] = np.nansum(values[:rows[position] + 1])
+    # Para os anos seguintes, a soma dos 12 meses anteriores (uma janela por linha)
+    if not short.all():
+        windows = np.lib.stride_tricks.sliding_window_view(values, 12)[rows[~short] - 11]
+        annual_income[~short] = np.nansum(windows, axis=1)
+    return annual_income
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Verificação diferencial dos motores de projeção contra o oráculo de referência.
+
+Cada motor rápido registrado em engine.ENGINES (e o motor em lote) é comparado,
+cenário a cenário, com engine.simulate_reference em parâmetros gerados pelo
+Hypothesis cobrindo todo o intervalo dos spinboxes da interface. As consultas
+pontuais em forma fechada de queries.py são comparadas nos meses sorteados.
+O calendário diário (events.py) paga dividendos em outras datas, então dele
+só se comparam os aportes, para todos os tipos de contribuição.
+
+Uso:
+    python equivalence.py                  # todos os motores, 500 exemplos
+    python equivalence.py --engine vectorized --examples 2000
+"""
+import argparse
+import sys
+from dataclasses import replace
+
+import numpy as np
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+import engine
+import events
+import queries
+from engine import ProjectionParams
+
+# Valores acima deste limite são tratados como overflow (o mês exato em que
+# cada motor chega a inf pode variar por arredondamento)
+OVERFLOW = 1e300
+COLUMNS = ['portfolio_values', 'dividend_income', 'yield_on_cost',
+           'cumulative_contributions', 'cumulative_dividends',
+           'real_portfolio_values', 'real_dividend_income', 'real_yield_on_cost',
+           'real_cumulative_contributions', 'withdrawals', 'cumulative_withdrawals',
+           'dividend_taxes', 'withdrawal_taxes', 'share_prices', 'shares_held', 'uninvested_cash']
+# Colunas derivadas de valores maiores têm a tolerância relativa (e o overflow)
+# medidos pela coluna de origem: o imposto sobre ganhos sai do ganho acumulado
+# das vendas e as cotas são o valor do portfólio dividido pelo preço
+SCALES = {'withdrawal_taxes': 'cumulative_withdrawals', 'shares_held': 'portfolio_values'}
+# Colunas do calendário diário que independem das datas dos dividendos
+EVENT_COLUMNS = ['cumulative_contributions', 'real_cumulative_contributions']
+
+
+def money(max_value):
+    return st.integers(0, int(max_value * 100)).map(lambda cents: cents / 100)
+
+
+def percent(min_value, max_value):
+    return st.integers(int(min_value * 100), int(max_value * 100)).map(lambda v: v / 100)
+
+
+def params_strategy():
+    """Parâmetros no mesmo domínio (e precisão de 2 casas) dos widgets de entrada"""
+    return st.builds(
+        ProjectionParams,
+        starting_principal=money(10000000),
+        annual_dividend_yield=percent(0, 100),
+        is_taxed=st.booleans(),
+        dividend_tax_rate=percent(0, 100),
+        expected_annual_dividend_increase=percent(0, 100),
+        payment_frequency_idx=st.integers(0, len(engine.PAYMENT_FREQUENCIES) - 1),
+        contribution_type_idx=st.integers(0, len(engine.CONTRIBUTION_TYPES) - 1),
+        periodic_contribution=money(1000000),
+        contribution_raise=st.one_of(st.just(0.0), percent(0, 100)),
+        paused_years=st.one_of(st.just(''), st.lists(st.integers(1, 50), max_size=5).map(
+            lambda years: ', '.join(map(str, years)))),
+        lump_sums=st.one_of(st.just(''), st.lists(st.tuples(st.integers(1, 50), money(1000000)), max_size=3).map(
+            lambda lumps: '; '.join(f'{year}: {amount}' for year, amount in lumps))),
+        years_invested=st.integers(1, 50),
+        dividend_reinvestment=st.booleans(),
+        expected_annual_share_price_appreciation=percent(-20, 100),
+        annual_inflation_rate=percent(0, 50),
+        index_contributions=st.booleans(),
+        withdrawal_years=st.integers(0, 50),
+        withdrawal_mode_idx=st.integers(0, 2),
+        withdrawal_amount=money(10000000),
+        withdrawal_rate=percent(0, 100),
+        account_type_idx=st.integers(0, 2),
+        foreign_withholding_rate=percent(0, 100),
+        capital_gains_tax_rate=percent(0, 100),
+        whole_shares=st.booleans(),
+        share_price=st.integers(1, 100000000).map(lambda cents: cents / 100),
+    )
+
+
+def compare_results(expected, actual, rtol=1e-9, atol=1e-6, columns=COLUMNS):
+    """Lista as divergências entre dois resultados (vazia quando equivalentes)"""
+    mismatches = []
+    for column in columns:
+        a = np.asarray(expected[column], dtype=float)
+        b = np.asarray(actual[column], dtype=float)
+        if a.shape != b.shape:
+            mismatches.append(f"{column}: shape {b.shape} != {a.shape}")
+            continue
+        with np.errstate(invalid='ignore', over='ignore'):
+            overflow = (~np.isfinite(a) | (np.abs(a) > OVERFLOW)) & \
+                       (~np.isfinite(b) | (np.abs(b) > OVERFLOW))
+            magnitude = np.maximum(np.abs(a), np.abs(b))
+            if column in SCALES:
+                scale = np.abs(np.asarray(expected[SCALES[column]], dtype=float))
+                magnitude = np.fmax(magnitude, scale)
+                # Depois que a coluna de origem estoura, o imposto deixa de ser definido
+                overflow |= np.logical_or.accumulate(~np.isfinite(scale) | (scale > OVERFLOW))
+            close = np.abs(a - b) <= atol + rtol * magnitude
+        bad = np.flatnonzero(~(close | overflow))
+        if bad.size:
+            month = int(bad[0])
+            mismatches.append(
+                f"{column}[month {month}]: expected {a[month]!r}, got {b[month]!r} "
+                f"({bad.size} months differ)"
+            )
+    return mismatches
+
+
+def check_engine(simulate_fn, params, **tolerances):
+    """Falha com AssertionError se o motor divergir do oráculo para params"""
+    with np.errstate(all='ignore'):
+        expected = engine.simulate_reference(params)
+        actual = simulate_fn(params)
+    mismatches = compare_results(expected, actual, **tolerances)
+    assert not mismatches, f"{params}\n" + "\n".join(mismatches)
+
+
+def check_batch(params_list, **tolerances):
+    """Compara o motor em lote (horizontes mistos) com o oráculo, cenário a cenário"""
+    with np.errstate(all='ignore'):
+        batch = engine.simulate_batch(params_list)
+        expected = [engine.simulate_reference(params) for params in params_list]
+    for row, params in enumerate(params_list):
+        sliced = {key: values[row, :params.months + 1] for key, values in batch.items()}
+        mismatches = compare_results(expected[row], sliced, **tolerances)
+        assert not mismatches, f"batch row {row}: {params}\n" + "\n".join(mismatches)
+
+
+def check_query(params, months, **tolerances):
+    """Compara as consultas pontuais de queries.py com o oráculo nos meses pedidos"""
+    with np.errstate(all='ignore'):
+        expected = engine.simulate_reference(params)
+        points, _ = queries.query_months(params, months)
+    expected = {key: expected[key][months] for key in queries.QUERY_FIELDS.values()}
+    actual = {key: points[name] for name, key in queries.QUERY_FIELDS.items()}
+    mismatches = compare_results(expected, actual, columns=list(expected), **tolerances)
+    assert not mismatches, f"query {months}: {params}\n" + "\n".join(mismatches)
+
+
+def check_events(params, **tolerances):
+    """Compara os aportes do calendário diário com os do motor em lote"""
+    # O calendário não modela retiradas nem cotas inteiras
+    params = replace(params, withdrawal_years=0, whole_shares=False, event_calendar=True)
+    with np.errstate(all='ignore'):
+        batch = engine.simulate_batch([params])
+        actual = events.simulate_events(params)
+    expected = {key: batch[key][0] for key in EVENT_COLUMNS}
+    mismatches = compare_results(expected, actual, columns=EVENT_COLUMNS, **tolerances)
+    assert not mismatches, f"events: {params}\n" + "\n".join(mismatches)
+
+
+def run_differential(engines=None, max_examples=500, include_batch=True, include_query=True,
+                     include_events=True):
+    """Executa a verificação diferencial; devolve a lista de motores verificados"""
+    names = engines or [name for name in engine.ENGINES if name != 'reference']
+    config = settings(max_examples=max_examples, deadline=None, database=None,
+                      suppress_health_check=[HealthCheck.too_slow])
+
+    for name in names:
+        simulate_fn = engine.ENGINES[name]
+
+        @config
+        @given(params_strategy())
+        def differential(params):
+            check_engine(simulate_fn, params)
+
+        differential()
+
+    if include_batch:
+        @config
+        @given(st.lists(params_strategy(), min_size=1, max_size=8))
+        def differential_batch(params_list):
+            check_batch(params_list)
+
+        differential_batch()
+        names = list(names) + ['batch']
+
+    if include_query:
+        @config
+        @given(params_strategy(), st.data())
+        def differential_query(params, data):
+            months = data.draw(st.lists(st.integers(0, params.months), min_size=1, max_size=12))
+            check_query(params, months)
+
+        differential_query()
+        names = list(names) + ['query']
+
+    if include_events:
+        @config
+        @given(params_strategy())
+        def differential_events(params):
+            check_events(params)
+
+        differential_events()
+        names = list(names) + ['events (contributions)']
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Differential check of projection engines")
+    parser.add_argument('--engine', action='append', choices=sorted(engine.ENGINES),
+                        help="engine to check (default: all fast engines)")
+    parser.add_argument('--examples', type=int, default=500)
+    parser.add_argument('--no-batch', action='store_true', help="skip the batched engine check")
+    parser.add_argument('--no-query', action='store_true', help="skip the closed-form point query check")
+    parser.add_argument('--no-events', action='store_true', help="skip the event calendar contribution check")
+    args = parser.parse_args(argv)
+
+    checked = run_differential(args.engine, args.examples, not args.no_batch, not args.no_query,
+                               not args.no_events)
+    print(f"OK: {', '.join(checked)} match the reference engine ({args.examples} examples each)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+Motor de eventos com resolução diária (aportes, datas ex-dividendo e de pagamento).
+
+A grade mensal de engine.py paga dividendos em month % (12 // frequência) == 0;
+aqui cada ativo tem o seu calendário: data ex (quem tem a cota nesse dia recebe),
+data de pagamento alguns dias depois (quando o dividendo é reinvestido) e
+dividendos extraordinários avulsos. Os resultados são agregados por mês com as
+mesmas chaves de engine.simulate, para os gráficos e a tabela.
+
+Os eventos não são objetos: cada fluxo (aportes, datas ex, pagamentos, fins de
+mês) é gerado de uma vez como arrays numpy e os fluxos são intercalados por uma
+única ordenação (dia, tipo). Preços e dividendos por cota não dependem do estado
+e são calculados antes; o loop percorre apenas os blocos de eventos do mesmo dia
+e tipo, cada bloco processado com operações sobre todos os ativos envolvidos.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from schedules import compile_schedule
+
+# Tipos de evento, na ordem em que são processados dentro do mesmo dia
+CONTRIBUTION, EX_DIVIDEND, PAYMENT, MONTH_END = range(4)
+DAYS_PER_YEAR = 365.25
+# Início padrão do calendário: fixo (e não o mês atual) para que os mesmos parâmetros
+# deem sempre as mesmas datas; os caches por parâmetros (histórico, consultas e o
+# serviço) e as sessões restauradas dependem disso
+CALENDAR_EPOCH = '2025-01-01'
+
+
+@dataclass(frozen=True)
+class Holding:
+    """Um ativo da carteira (percentuais em %, como em ProjectionParams)"""
+    weight: float = 1.0  # fração dos aportes e do principal inicial
+    share_price: float = 50.0
+    annual_dividend_yield: float = 4.0
+    expected_annual_dividend_increase: float = 3.0
+    expected_annual_share_price_appreciation: float = 3.0
+    payments_per_year: int = 4
+    first_ex_month: int = 2  # mês (0 = mês inicial) da primeira data ex
+    ex_dividend_day: int = 15
+    payment_lag_days: int = 14
+    currency: str = ''  # moeda da cotação ('' = a moeda da projeção; ver fx.py)
+
+
+@dataclass(frozen=True)
+class SpecialDividend:
+    """Dividendo extraordinário avulso, em % do preço da cota na data ex"""
+    ex_date: str
+    percent_of_price: float
+    holding: int = -1  # -1 = todos os ativos
+    payment_lag_days: int = 14
+
+
+def holding_from_params(params):
+    """Ativo único equivalente aos parâmetros da interface"""
+    frequency = params.payment_frequency
+    return Holding(
+        share_price=params.share_price,
+        annual_dividend_yield=params.annual_dividend_yield,
+        expected_annual_dividend_increase=params.expected_annual_dividend_increase,
+        expected_annual_share_price_appreciation=params.expected_annual_share_price_appreciation,
+        payments_per_year=frequency,
+        # Mesmo mês de pagamento da grade mensal (o último de cada período)
+        first_ex_month=12 // frequency - 1,
+        ex_dividend_day=params.ex_dividend_day,
+        payment_lag_days=params.payment_lag_days,
+    )
+
+
+def _holding_arrays(holdings):
+    def column(name, dtype=float):
+        return np.array([getattr(h, name) for h in holdings], dtype=dtype)
+
+    frequency = column('payments_per_year', int)
+    if np.any(12 % frequency != 0):
+        raise ValueError(f"payments_per_year must divide 12, got {sorted(set(frequency.tolist()))}")
+    weight = column('weight')
+    if weight.sum() <= 0:
+        raise ValueError("holding weights must add up to more than zero")
+    return {
+        'weight': weight / weight.sum(),
+        'price': column('share_price'),
+        'yield': column('annual_dividend_yield') / 100,
+        'dividend_increase': column('expected_annual_dividend_increase') / 100,
+        # Valorização diária contínua equivalente à anual
+        'log_growth': np.log1p(column('expected_annual_share_price_appreciation') / 100) / DAYS_PER_YEAR,
+        'frequency': frequency,
+        'first_ex_month': column('first_ex_month', int),
+        'ex_day': column('ex_dividend_day', int),
+        'lag': column('payment_lag_days', int),
+    }
+
+
+def simulate_events(params, holdings=None, special_dividends=(), start=None):
+    """
+    Projeção com resolução diária; devolve os arrays mensais de engine.simulate.
+
+    holdings: lista de Holding (padrão: um ativo derivado de params);
+    special_dividends: lista de SpecialDividend; start: data inicial (padrão:
+    CALENDAR_EPOCH). Aportes entram no primeiro dia de cada mês
+    (depósito anual único: uma vez por ano) e são divididos entre os ativos pelos pesos.
+    Dividendos pagos depois do fim do horizonte não entram no resultado.
+    """
+    if params.withdrawal_years:
+        raise ValueError("the event calendar does not model the withdrawal phase")
+    if params.whole_shares:
+        raise ValueError("the event calendar uses fractional shares")
+
+    holdings = list(holdings) if holdings is not None else [holding_from_params(params)]
+    if any(holding.currency not in ('', params.currency) for holding in holdings):
+        raise ValueError("the event calendar does not convert currencies; use the monthly engines (fx.py)")
+    h = _holding_arrays(holdings)
+    n_holdings = len(holdings)
+    months = params.months
+    tax = params.dividend_tax
+    reinvest = params.dividend_reinvestment
+    inflation = params.annual_inflation_rate / 100
+    contribution_growth = inflation if params.index_contributions else 0
+
+    # Calendário: início de cada mês como dias desde a data inicial
+    start_month = np.datetime64(start if start is not None else CALENDAR_EPOCH, 'M')
+    month_starts = start_month + np.arange(months + 1)
+    start_day = month_starts[0].astype('datetime64[D]')
+    first_days = (month_starts.astype('datetime64[D]') - start_day).astype(np.int64)
+    month_lengths = np.diff(first_days)
+    end_day = first_days[-1]
+
+    def price_at(days, holding):
+        return h['price'][holding] * np.exp(days * h['log_growth'][holding])
+
+    streams = []  # (dia, tipo, ativo, índice do pagamento, valor)
+
+    # Aportes no primeiro dia do mês, como nos motores mensais: a contribuição anual é
+    # repartida em 12 parcelas (monthly_contribution); o depósito anual único e os demais
+    # casos vêm do cronograma compilado
+    month_index = np.arange(months)
+    if params.has_contribution_schedule:
+        amounts = compile_schedule(params.contribution_schedule)[month_index]
+    else:
+        amounts = params.monthly_contribution * (1 + contribution_growth) ** (month_index // 12)
+    month_index, amounts = month_index[amounts > 0], amounts[amounts > 0]
+    contribution_days = first_days[month_index]
+    streams.append((contribution_days, CONTRIBUTION, np.full(len(month_index), -1), np.full(len(month_index), -1),
+                    amounts))
+
+    # Datas ex regulares de todos os ativos de uma vez: (ativo, mês)
+    period = 12 // h['frequency']
+    max_events = months // int(period.min()) + 1
+    ex_month = h['first_ex_month'][:, None] + period[:, None] * np.arange(max_events)
+    holding_index = np.broadcast_to(np.arange(n_holdings)[:, None], ex_month.shape)
+    valid = ex_month < months
+    ex_month, holding_index = ex_month[valid], holding_index[valid]
+    ex_day = first_days[ex_month] + np.minimum(h['ex_day'][holding_index], month_lengths[ex_month]) - 1
+    # Dividendo por cota: preço na data ex × yield do ano / pagamentos por ano
+    current_yield = h['yield'][holding_index] * (1 + h['dividend_increase'][holding_index]) ** (ex_month // 12)
+    per_share = price_at(ex_day, holding_index) * current_yield / h['frequency'][holding_index]
+    pay_day = ex_day + h['lag'][holding_index]
+
+    # Dividendos extraordinários
+    for special in special_dividends:
+        day = (np.datetime64(special.ex_date, 'D') - start_day).astype(np.int64)
+        if not 0 <= day < end_day:
+            continue
+        targets = np.arange(n_holdings) if special.holding < 0 else np.array([special.holding])
+        ex_day = np.append(ex_day, np.full(len(targets), day))
+        holding_index = np.append(holding_index, targets)
+        per_share = np.append(per_share, price_at(day, targets) * special.percent_of_price / 100)
+        pay_day = np.append(pay_day, np.full(len(targets), day + special.payment_lag_days))
+
+    # Só dividendos pagos dentro do horizonte; cada par (ex, pagamento) tem um índice
+    paid = pay_day < end_day
+    ex_day, pay_day, holding_index, per_share = ex_day[paid], pay_day[paid], holding_index[paid], per_share[paid]
+    payment_id = np.arange(len(ex_day))
+    streams.append((ex_day, EX_DIVIDEND, holding_index, payment_id, per_share))
+    streams.append((pay_day, PAYMENT, holding_index, payment_id, price_at(pay_day, holding_index)))
+
+    # Fim de cada mês (valor = índice do mês nos resultados)
+    streams.append((first_days[1:] - 1, MONTH_END, np.full(months, -1), np.full(months, -1),
+                    np.arange(1, months + 1, dtype=float)))
+
+    # Intercalação dos fluxos: uma ordenação estável por (dia, tipo)
+    day = np.concatenate([s[0] for s in streams])
+    kind = np.concatenate([np.full(len(s[0]), s[1], dtype=np.int8) for s in streams])
+    holding = np.concatenate([s[2] for s in streams])
+    pid = np.concatenate([s[3] for s in streams])
+    value = np.concatenate([s[4] for s in streams])
+    order = np.lexsort((kind, day))
+    day, kind, holding, pid, value = day[order], kind[order], holding[order], pid[order], value[order]
+
+    # Blocos de eventos com o mesmo dia e tipo
+    boundaries = np.flatnonzero((np.diff(day) != 0) | (np.diff(kind) != 0)) + 1
+    starts = np.concatenate([[0], boundaries]).tolist()
+    ends = np.concatenate([boundaries, [len(day)]]).tolist()
+    block_kind = kind[starts].tolist()
+
+    shares = h['weight'] * params.starting_principal / h['price']
+    owed = np.zeros(len(payment_id))  # dividendo bruto devido por pagamento (fixado na data ex)
+    shares_at_month_end = np.zeros((months + 1, n_holdings))
+    shares_at_month_end[0] = shares
+    net_rate = 1 - tax
+
+    for begin, end, block in zip(starts, ends, block_kind):
+        if block == PAYMENT:
+            if reinvest:
+                np.add.at(shares, holding[begin:end], owed[pid[begin:end]] * net_rate / value[begin:end])
+        elif block == EX_DIVIDEND:
+            owed[pid[begin:end]] = shares[holding[begin:end]] * value[begin:end]
+        elif block == CONTRIBUTION:
+            today = day[begin]
+            shares = shares + value[begin:end].sum() * h['weight'] / (h['price'] * np.exp(today * h['log_growth']))
+        else:
+            shares_at_month_end[int(value[begin])] = shares
+
+    # Agregação mensal (mês 1 = primeiro mês da projeção)
+    def by_month(days, weights):
+        month = np.searchsorted(first_days, days, side='right')
+        # Sem eventos o bincount devolve inteiros, mesmo com pesos float
+        return np.bincount(month, weights=weights, minlength=months + 1)[:months + 1].astype(np.float64)
+
+    gross = owed
+    dividend_income = by_month(pay_day, gross * net_rate)
+    dividend_taxes = by_month(pay_day, gross * tax)
+    contributions = by_month(contribution_days, amounts)
+    contributions[0] = params.starting_principal
+
+    month_end_days = np.concatenate([[0], first_days[1:] - 1])
+    prices = h['price'] * np.exp(month_end_days[:, None] * h['log_growth'])
+    invested = shares_at_month_end * prices
+    portfolio_values = invested.sum(axis=1)
+    portfolio_values[0] = params.starting_principal
+    cumulative_contributions = np.cumsum(contributions)
+    cumulative_dividends = np.cumsum(dividend_income)
+
+    # Yield on cost com o yield vigente após o reajuste anual (como na grade mensal)
+    k = np.arange(months + 1)
+    yields = h['yield'] * (1 + h['dividend_increase']) ** (k[:, None] // 12)
+    annual_dividend = (invested * yields).sum(axis=1) * net_rate
+    yield_on_cost = np.zeros(months + 1)
+    np.divide(annual_dividend * 100, cumulative_contributions, out=yield_on_cost, where=cumulative_contributions > 0)
+    yield_on_cost[0] = (h['weight'] * h['yield']).sum() * 100
+
+    # Valores reais a partir do deflator mensal
+    deflator = (1 + inflation) ** (-k / 12)
+    real_cumulative_contributions = np.cumsum(contributions * deflator)
+    real_yield_on_cost = np.zeros(months + 1)
+    np.divide(annual_dividend * deflator * 100, real_cumulative_contributions, out=real_yield_on_cost,
+              where=cumulative_contributions > 0)
+    real_yield_on_cost[0] = yield_on_cost[0]
+
+    zeros = np.zeros(months + 1)
+    return {
+        'portfolio_values': portfolio_values,
+        'dividend_income': dividend_income,
+        'yield_on_cost': yield_on_cost,
+        'cumulative_contributions': cumulative_contributions,
+        'cumulative_dividends': cumulative_dividends,
+        'real_portfolio_values': portfolio_values * deflator,
+        'real_dividend_income': dividend_income * deflator,
+        'real_yield_on_cost': real_yield_on_cost,
+        'real_cumulative_contributions': real_cumulative_contributions,
+        'withdrawals': zeros,
+        'cumulative_withdrawals': zeros.copy(),
+        'dividend_taxes': dividend_taxes,
+        'withdrawal_taxes': zeros.copy(),
+    }
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from profiling import PROFILER
+
+
+class ExportError(Exception):
+    """Falha ao gravar um arquivo exportado em segundo plano"""
+
+
+class ChartExportQueue:
+    """
+    Fila de gravação em segundo plano (write-behind) para os arquivos exportados.
+
+    O conteúdo é enfileirado por chave ('portfolio', 'dividend', ...) e gravado por
+    uma thread própria com renomeação atômica. Pode ser já serializado (str/bytes)
+    ou uma função sem argumentos que o produz, chamada na própria thread de gravação. Uma nova versão da
+    mesma chave substitui a pendente (só a última é gravada) e submit() bloqueia
+    quando há max_pending chaves aguardando gravação.
+    """
+
+    def __init__(self, max_pending=8):
+        self.max_pending = max_pending
+        self._pending = OrderedDict()  # chave -> (caminho, conteúdo, versão)
+        self._submitted = {}  # chave -> última versão enfileirada
+        self._written = {}  # chave -> última versão gravada
+        self._errors = {}  # chave -> (versão, exceção)
+        self._paths = {}
+        self._version = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='chart-export', daemon=True)
+        self._thread.start()
+
+    def submit(self, key, path, content, timeout=None):
+        """Enfileira content (str, bytes ou função que os devolve) para ser gravado em path; devolve a versão"""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        with self._cond:
+            if self._closed:
+                raise ExportError("export queue is closed")
+            # Backpressure: esperar espaço, a menos que a chave já esteja na fila
+            if key not in self._pending:
+                if not self._cond.wait_for(lambda: len(self._pending) < self.max_pending, timeout):
+                    raise ExportError(f"export queue full, could not enqueue '{key}'")
+            self._version += 1
+            self._pending[key] = (path, content, self._version)
+            self._submitted[key] = self._version
+            self._paths[key] = path
+            self._cond.notify_all()
+            return self._version
+
+    def wait(self, key, timeout=None):
+        """
+        Espera apenas a gravação da chave key (versão mais recente enfileirada).
+        Devolve o caminho do arquivo; levanta ExportError se a gravação falhou.
+        """
+        with self._cond:
+            target = self._submitted.get(key)
+            if target is None:
+                return self._paths.get(key)
+
+            def done():
+                error = self._errors.get(key)
+                return self._written.get(key, 0) >= target or (error is not None and error[0] >= target)
+
+            if not self._cond.wait_for(done, timeout):
+                raise ExportError(f"timed out waiting for '{key}' to be written")
+            error = self._errors.get(key)
+            if self._written.get(key, 0) < target and error is not None:
+                raise ExportError(f"could not write {self._paths[key]}: {error[1]}")
+            return self._paths[key]
+
+    def flush(self, timeout=None):
+        """Espera todas as gravações pendentes"""
+        with self._cond:
+            keys = list(self._submitted)
+        for key in keys:
+            try:
+                self.wait(key, timeout)
+            except ExportError:
+                pass
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def pending(self):
+        with self._cond:
+            return list(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                key, (path, content, version) = self._pending.popitem(last=False)
+                # Liberou espaço na fila
+                self._cond.notify_all()
+
+            error = None
+            try:
+                if callable(content):
+                    with PROFILER.span('export.render', key=key):
+                        content = content()
+                    if isinstance(content, str):
+                        content = content.encode('utf-8')
+                with PROFILER.span('export.write', key=key, size=len(content)):
+                    atomic_write(path, content)
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                if error is None:
+                    self._written[key] = max(self._written.get(key, 0), version)
+                else:
+                    self._errors[key] = (version, error)
+                self._cond.notify_all()
+
+
+def atomic_write(path, content):
+    """Grava em um arquivo temporário na mesma pasta e renomeia por cima do destino"""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp cria o arquivo com permissão 0600
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,201 @@
+"""
+Conversão cambial de carteiras com ativos em várias moedas.
+
+Para um ativo cotado numa moeda local, o preço da cota e o dividendo por cota
+na moeda base são os valores locais multiplicados pela cotação do mês (moeda
+base por unidade da moeda local). Os aportes e as retiradas já estão na moeda
+base, então a conversão é exatamente um par de níveis multiplicativos de preço
+e de dividendo (cotação do mês / cotação do mês inicial) aplicados por
+simulate_batch sobre a grade mensal, os mesmos vetores dos testes de estresse.
+
+As cotações vêm de arquivos locais, um por moeda (EUR.csv, GBP.csv, ...), com
+linhas "data,cotação" em unidades da moeda pivô (padrão USD) por unidade da
+moeda do arquivo. Cada série é reduzida à última cotação de cada mês; meses
+antes da primeira cotação usam a primeira e meses depois da última repetem a
+última (arquivos com cotações futuras servem de cenário de câmbio). As matrizes
+alinhadas à grade (moedas x meses + 1) ficam em cache por (moedas, início,
+meses) e são reaproveitadas por todos os cenários de uma varredura.
+
+Uso:
+    python fx.py clients.json --rates fx_rates --start 2026-01 --out sweep.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from engine import ProjectionParams, currency_symbol, simulate_batch
+
+FX_PIVOT = 'USD'
+FX_CACHE_SIZE = 64
+
+
+def month_of(start=None):
+    """Mês inicial da grade ('YYYY-MM', data ou None para o mês atual)"""
+    return str(np.datetime64(start if start is not None else date.today(), 'M'))
+
+
+class FxRates:
+    """Cotações mensais de cada moeda em unidades da moeda pivô"""
+
+    def __init__(self, series, pivot=FX_PIVOT):
+        """series: moeda -> (meses datetime64[M] em ordem, cotações)"""
+        self.pivot = pivot
+        self.series = dict(series)
+        self.matrix = lru_cache(maxsize=FX_CACHE_SIZE)(self._matrix)
+
+    @classmethod
+    def load(cls, folder, pivot=FX_PIVOT):
+        """Lê os arquivos <MOEDA>.csv de folder (linhas "data,cotação"; cabeçalho opcional)"""
+        series = {}
+        for filename in sorted(os.listdir(folder)):
+            code, extension = os.path.splitext(filename)
+            if extension.lower() != '.csv':
+                continue
+            days, rates = [], []
+            with open(os.path.join(folder, filename), newline='') as f:
+                for line, row in enumerate(csv.reader(f), 1):
+                    if not row or not row[0].strip():
+                        continue
+                    try:
+                        day, rate = np.datetime64(row[0].strip()[:10], 'D'), float(row[1])
+                    except (ValueError, IndexError):
+                        if line == 1:
+                            continue  # cabeçalho
+                        raise ValueError(f"{filename}, line {line}: expected 'date,rate', got {row}") from None
+                    if not rate > 0:
+                        raise ValueError(f"{filename}, line {line}: rates must be positive, got {rate}")
+                    days.append(day)
+                    rates.append(rate)
+            if not days:
+                raise ValueError(f"{filename} has no rates")
+            series[code.upper()] = monthly_rates(np.array(days), np.array(rates))
+        return cls(series, pivot)
+
+    @property
+    def currencies(self):
+        return sorted({self.pivot, *self.series})
+
+    def path(self, currency, start, months):
+        """Cotação da moeda (em moeda pivô) em cada mês 0..months a partir de start ('YYYY-MM')"""
+        if currency == self.pivot:
+            return np.ones(months + 1)
+        if currency not in self.series:
+            raise ValueError(f"no FX rates for {currency} (available: {', '.join(self.currencies)})")
+        rate_months, rates = self.series[currency]
+        grid = np.datetime64(start, 'M') + np.arange(months + 1)
+        index = np.searchsorted(rate_months, grid, side='right') - 1
+        return rates[np.maximum(index, 0)]
+
+    def _matrix(self, pairs, start, months):
+        """
+        Níveis (somente leitura, len(pairs) x months + 1) de cada par
+        (moeda local, moeda base): cotação do mês / cotação do mês inicial.
+        """
+        levels = np.empty((len(pairs), months + 1))
+        for row, (currency, base) in enumerate(pairs):
+            rate = self.path(currency, start, months) / self.path(base, start, months)
+            levels[row] = rate / rate[0]
+        levels.flags.writeable = False
+        return levels
+
+    def rate(self, currency, base, start=None):
+        """Cotação de currency em base no mês start (moeda base por unidade de currency)"""
+        start = month_of(start)
+        return float(self.path(currency, start, 0)[0] / self.path(base, start, 0)[0])
+
+
+def monthly_rates(days, rates):
+    """Última cotação de cada mês (meses em ordem)"""
+    order = np.argsort(days, kind='stable')
+    months = days[order].astype('datetime64[M]')
+    last = np.flatnonzero(np.append(months[1:] != months[:-1], True))
+    return months[last], rates[order][last]
+
+
+def fx_levels(rates, params_list, currencies, start=None):
+    """
+    Níveis de câmbio (cenários x meses + 1) para simulate_batch, ou None quando
+    todos os ativos estão na moeda do próprio cenário. currencies: a moeda
+    local de cada cenário ('' = a moeda do cenário).
+    """
+    if len(currencies) != len(params_list):
+        raise ValueError("one currency per scenario is required")
+    pairs = [(currency or params.currency, params.currency) for params, currency in zip(params_list, currencies)]
+    if all(currency == base for currency, base in pairs):
+        return None
+    unique = sorted(set(pairs))
+    row = {pair: index for index, pair in enumerate(unique)}
+    months = max(params.months for params in params_list)
+    matrix = rates.matrix(tuple(unique), month_of(start), months)
+    return matrix[[row[pair] for pair in pairs]]
+
+
+def simulate_fx_batch(params_list, currencies, rates, start=None, price_level=None, dividend_level=None):
+    """
+    simulate_batch com cada cenário investido num ativo cotado em currencies[i]
+    e resultados na moeda do cenário (params.currency). share_price é o preço
+    da cota na moeda do cenário no mês inicial. price_level e dividend_level
+    (choques de estresse, opcionais) são combinados com os níveis de câmbio.
+    """
+    levels = fx_levels(rates, params_list, currencies, start)
+    if levels is not None:
+        price_level = levels if price_level is None else levels * price_level
+        dividend_level = levels if dividend_level is None else levels * dividend_level
+    return simulate_batch(params_list, price_level, dividend_level)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Project multi-currency holdings in a base currency")
+    parser.add_argument('clients', help='JSON file with a list of parameter objects, each with an optional '
+                                        '"holding_currency" (default: the scenario currency)')
+    parser.add_argument('--rates', required=True, help="folder with one <CURRENCY>.csv file of date,rate rows")
+    parser.add_argument('--pivot', default=FX_PIVOT, help="currency the rate files are quoted in")
+    parser.add_argument('--start', help="first month of the projection (YYYY-MM, default: current month)")
+    parser.add_argument('--base', help="report every scenario in this currency (default: each scenario's own)")
+    parser.add_argument('--out', help="CSV file with the final value and income of every scenario")
+    args = parser.parse_args(argv)
+
+    with open(args.clients) as f:
+        entries = json.load(f)
+    params_list = [ProjectionParams.from_dict({**data, **({'currency': args.base} if args.base else {})}).validate()
+                   for data in entries]
+    currencies = [str(data.get('holding_currency', '')).upper() for data in entries]
+    try:
+        rates = FxRates.load(args.rates, args.pivot)
+        start = time.perf_counter()
+        with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+            batch = simulate_fx_batch(params_list, currencies, rates, args.start)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+
+    horizons = np.array([params.months for params in params_list])
+    rows = np.arange(len(params_list))
+    income = np.cumsum(batch['dividend_income'], axis=1)
+    df = pd.DataFrame({
+        'holding_currency': [currency or params.currency for params, currency in zip(params_list, currencies)],
+        'currency': [params.currency for params in params_list],
+        'final_value': batch['portfolio_values'][rows, horizons],
+        'final_annual_income': income[rows, horizons] - income[rows, np.maximum(horizons - 12, 0)],
+    })
+    if args.out:
+        df.to_csv(args.out, index_label='scenario')
+    for index, row in df.head(20).iterrows():
+        symbol = currency_symbol(row['currency'])
+        print(f"{index:>5} {row['holding_currency']} -> {row['currency']}: final value {symbol}{row['final_value']:,.2f}, "
+              f"annual income {symbol}{row['final_annual_income']:,.2f}")
+    print(f"{len(df)} projection(s) in {elapsed:.2f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Histórico das execuções da janela: cada Calculate guarda os parâmetros
+(ProjectionParams é imutável) e uma referência aos arrays dos resultados,
+para navegar pelas execuções anteriores sem recalcular.
+
+Os arrays ficam num pool por conteúdo: séries idênticas (as mesmas
+contribuições acumuladas em execuções que só mudam o yield, séries zeradas,
+valores reais iguais aos nominais sem inflação, parâmetros repetidos) são
+guardadas uma única vez e marcadas como somente leitura. A memória é limitada
+por max_bytes: os arrays das execuções usadas há mais tempo saem do pool, os
+parâmetros ficam e os resultados são recalculados quando a execução é aberta.
+"""
+import hashlib
+from collections import OrderedDict
+
+from engine import simulate
+
+HISTORY_MAX_ENTRIES = 500
+HISTORY_MAX_BYTES = 64 * 1024 * 1024
+
+
+def array_key(values):
+    """Chave de conteúdo de um array (tipo, forma e hash dos bytes)"""
+    return values.dtype.str, values.shape, hashlib.blake2b(values.tobytes(), digest_size=16).digest()
+
+
+class ResultsHistory:
+    """Lista de execuções (parâmetros) com os resultados em cache LRU limitado por bytes"""
+
+    def __init__(self, max_entries=HISTORY_MAX_ENTRIES, max_bytes=HISTORY_MAX_BYTES, simulate_fn=simulate):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.simulate_fn = simulate_fn
+        self.entries = []
+        # Parâmetros -> {série: chave no pool}, do menos para o mais recente
+        self._cached = OrderedDict()
+        # Chave -> [array, referências]
+        self._pool = {}
+        self.cached_bytes = 0
+        self.recomputed = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def record(self, params, results):
+        """
+        Acrescenta uma execução (a mesma de antes não é repetida) e devolve o
+        seu índice e os resultados como ficaram no pool.
+        """
+        if not self.entries or self.entries[-1] != params:
+            self.entries.append(params)
+            if len(self.entries) > self.max_entries:
+                dropped = self.entries.pop(0)
+                if dropped not in self.entries:
+                    self._release(dropped)
+        return len(self.entries) - 1, self._store(params, results)
+
+    def results(self, index):
+        """Resultados da execução index (recalculados se os arrays saíram do cache)"""
+        params = self.entries[index]
+        if params in self._cached:
+            self._cached.move_to_end(params)
+            return self._materialize(params)
+        self.recomputed += 1
+        return self._store(params, self.simulate_fn(params))
+
+    def is_cached(self, index):
+        return self.entries[index] in self._cached
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'cached_entries': len(self._cached),
+            'unique_arrays': len(self._pool),
+            'cached_bytes': self.cached_bytes,
+            'recomputed': self.recomputed,
+        }
+
+    def _store(self, params, results):
+        if params in self._cached:
+            self._cached.move_to_end(params)
+            return self._materialize(params)
+        keys = {}
+        for name, values in results.items():
+            key = array_key(values)
+            slot = self._pool.get(key)
+            if slot is None:
+                values.flags.writeable = False
+                slot = self._pool[key] = [values, 0]
+                self.cached_bytes += values.nbytes
+            slot[1] += 1
+            keys[name] = key
+        self._cached[params] = keys
+        self._evict()
+        return self._materialize(params)
+
+    def _materialize(self, params):
+        return {name: self._pool[key][0] for name, key in self._cached[params].items()}
+
+    def _release(self, params):
+        keys = self._cached.pop(params, None)
+        for key in (keys or {}).values():
+            slot = self._pool[key]
+            slot[1] -= 1
+            if slot[1] == 0:
+                self.cached_bytes -= slot[0].nbytes
+                del self._pool[key]
+
+    def _evict(self):
+        # A execução recém-guardada (a última) fica sempre, mesmo que sozinha passe do limite
+        while self.cached_bytes > self.max_bytes and len(self._cached) > 1:
+            self._release(next(iter(self._cached)))
@@ -0,0 +1,195 @@
+"""
+Alocação entre ativos candidatos que maximiza a renda de dividendos de um ano
+(ou o valor do portfólio), com peso máximo por ativo e yield inicial mínimo.
+
+Cada ativo recebe a fração w do principal, dos aportes e das retiradas e
+evolui pelo modelo mensal com o próprio yield, crescimento do dividendo e
+valorização. O modelo é homogêneo (com cotas fracionárias, escalar as entradas
+escala toda a trajetória), então o resultado da carteira é w @ curva, onde a
+curva de cada ativo vem de uma única chamada de simulate_batch. A busca é uma
+bisseção em lote no multiplicador da restrição de yield: cada rodada monta
+`candidates` vetores de pesos e os avalia com um produto de matrizes.
+Ativos cotados em outra moeda (Holding.currency) são convertidos para a moeda
+da projeção pelas cotações de fx.FxRates.
+
+Uso:
+    python optimizer.py holdings.json --year 30 --max-weight 10 --min-yield 3 --fx-rates fx_rates
+"""
+import argparse
+import json
+import sys
+from dataclasses import dataclass, fields, replace
+
+import numpy as np
+
+from engine import ProjectionParams, PAYMENT_FREQUENCIES, currency_symbol
+from events import Holding
+from fx import FxRates, simulate_fx_batch
+
+OBJECTIVES = ('income', 'value')
+
+
+@dataclass
+class Allocation:
+    """Resultado da otimização (pesos na ordem dos ativos, somando 1)"""
+    weights: np.ndarray
+    annual_income: float  # renda de dividendos dos 12 meses até o fim do ano pedido
+    portfolio_value: float  # valor do portfólio no fim do ano pedido
+    starting_yield: float  # yield inicial ponderado, em %
+
+
+def holding_params(params, holding):
+    """Parâmetros da projeção de um ativo isolado (cotas fracionárias, calendário mensal)"""
+    return replace(
+        params,
+        annual_dividend_yield=holding.annual_dividend_yield,
+        expected_annual_dividend_increase=holding.expected_annual_dividend_increase,
+        expected_annual_share_price_appreciation=holding.expected_annual_share_price_appreciation,
+        payment_frequency_idx=PAYMENT_FREQUENCIES.index(holding.payments_per_year),
+        share_price=holding.share_price,
+        whole_shares=False,
+        event_calendar=False,
+    )
+
+
+def holding_curves(params, holdings, year, rates=None, fx_start=None):
+    """
+    Renda anual (12 meses até o fim de year) e valor no fim de year de cada
+    ativo recebendo sozinho todo o principal e os aportes de params, na moeda
+    de params (rates: cotações para os ativos em outras moedas).
+    """
+    month = year * 12
+    currencies = [holding.currency for holding in holdings]
+    if rates is None and any(currency not in ('', params.currency) for currency in currencies):
+        raise ValueError(f"FX rates are required for holdings not quoted in {params.currency}")
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        batch = simulate_fx_batch([holding_params(params, holding) for holding in holdings], currencies, rates,
+                                  fx_start)
+    income = batch['dividend_income'][:, max(month - 11, 1):month + 1].sum(axis=1)
+    return income, batch['portfolio_values'][:, month]
+
+
+def greedy_weights(scores, caps):
+    """
+    Para cada linha de scores, preenche os ativos do maior para o menor score
+    até o peso máximo de cada um, até somar 1 (vértice do simplex limitado).
+    """
+    order = np.argsort(-scores, axis=1, kind='stable')
+    ordered_caps = caps[order]
+    filled_before = np.cumsum(ordered_caps, axis=1) - ordered_caps
+    weights = np.empty_like(scores)
+    np.put_along_axis(weights, order, np.clip(1 - filled_before, 0, ordered_caps), axis=1)
+    return weights
+
+
+def optimize_allocation(params, holdings, year=None, objective='income', max_weight=100.0, min_yield=0.0,
+                        candidates=64, max_rounds=12, rates=None, fx_start=None):
+    """
+    Pesos que maximizam a renda anual de dividendos (objective='income') ou o
+    valor do portfólio ('value') no fim de year (padrão: fim dos aportes),
+    com peso máximo por ativo (em %, um valor ou um por ativo) e yield inicial
+    ponderado de pelo menos min_yield (%). rates e fx_start (mês inicial)
+    convertem os ativos cotados em outras moedas para a moeda de params.
+
+    O problema é linear nos pesos: sem a restrição de yield o ótimo é o
+    preenchimento guloso pelo objetivo. Com ela, o ótimo é guloso pelo score
+    (1 - t) * objetivo + t * yield (normalizados) no menor t viável, misturado
+    com o vértice anterior para que o yield fique exatamente no mínimo.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {', '.join(OBJECTIVES)}")
+    if not holdings:
+        raise ValueError("at least one holding is required")
+    year = params.years_invested if year is None else int(year)
+    if not 1 <= year <= params.months // 12:
+        raise ValueError(f"year must be between 1 and {params.months // 12}, got {year}")
+    caps = np.broadcast_to(np.asarray(max_weight, dtype=float) / 100, (len(holdings),)).copy()
+    if np.any(caps < 0) or caps.sum() < 1 - 1e-12:
+        raise ValueError("max weights must be non-negative and add up to at least 100%")
+
+    income, value = holding_curves(params, holdings, year, rates, fx_start)
+    target = income if objective == 'income' else value
+    if not np.all(np.isfinite(target)):
+        raise ValueError("a holding's projection overflows before the chosen year")
+    yields = np.array([holding.annual_dividend_yield for holding in holdings], dtype=float)
+
+    def normalized(values):
+        spread = values.max() - values.min()
+        return (values - values.min()) / spread if spread > 0 else np.zeros_like(values)
+
+    def evaluate(t):
+        scores = (1 - t)[:, None] * normalized(target) + t[:, None] * normalized(yields)
+        weights = greedy_weights(scores, caps)
+        return weights, weights @ yields
+
+    # t = 1 ordena só pelo yield: o maior yield inicial possível
+    weights, achieved = evaluate(np.array([0.0, 1.0]))
+    if achieved[1] < min_yield - 1e-9:
+        raise ValueError(f"no allocation reaches a starting yield of {min_yield}% "
+                         f"(maximum {achieved[1]:.2f}%)")
+
+    if achieved[0] >= min_yield:
+        best = weights[0]
+    else:
+        # Bisseção em lote: último t inviável e primeiro t viável
+        low, high = 0.0, 1.0
+        low_weights, high_weights = weights
+        for _ in range(max_rounds):
+            grid = np.linspace(low, high, candidates)
+            weights, achieved = evaluate(grid)
+            first = int(np.argmax(achieved >= min_yield - 1e-12))
+            low, high = float(grid[first - 1]), float(grid[first])
+            low_weights, high_weights = weights[first - 1], weights[first]
+        low_yield, high_yield = low_weights @ yields, high_weights @ yields
+        share = 1.0 if high_yield - low_yield <= 0 else min(1.0, (min_yield - low_yield) / (high_yield - low_yield))
+        best = low_weights + share * (high_weights - low_weights)
+
+    return Allocation(weights=best, annual_income=float(best @ income), portfolio_value=float(best @ value),
+                      starting_yield=float(best @ yields))
+
+
+def load_holdings(entries):
+    """Ativos (e nomes) a partir de dicionários com os campos de events.Holding e um "name" opcional"""
+    names = {field.name for field in fields(Holding)}
+    holdings = [Holding(**{key: value for key, value in entry.items() if key in names}) for entry in entries]
+    labels = [str(entry.get('name', f'holding{index}')) for index, entry in enumerate(entries)]
+    return holdings, labels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Income-maximizing allocation over candidate holdings")
+    parser.add_argument('holdings', help='JSON file: a list of holdings, or {"params": {...}, "holdings": [...]}')
+    parser.add_argument('--year', type=int, help="year whose dividend income (or value) is maximized")
+    parser.add_argument('--objective', choices=OBJECTIVES, default='income')
+    parser.add_argument('--max-weight', type=float, default=100.0, help="maximum weight per holding (%%)")
+    parser.add_argument('--min-yield', type=float, default=0.0, help="minimum weighted starting yield (%%)")
+    parser.add_argument('--fx-rates', help="folder with <CURRENCY>.csv rate files for holdings in other currencies")
+    parser.add_argument('--fx-start', help="first month of the projection for the FX rates (YYYY-MM)")
+    args = parser.parse_args(argv)
+
+    with open(args.holdings) as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {'holdings': data}
+    params = ProjectionParams.from_dict(data.get('params', {})).validate()
+    holdings, labels = load_holdings(data['holdings'])
+
+    try:
+        rates = FxRates.load(args.fx_rates) if args.fx_rates else None
+        allocation = optimize_allocation(params, holdings, args.year, args.objective, args.max_weight, args.min_yield,
+                                         rates=rates, fx_start=args.fx_start)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for label, weight in sorted(zip(labels, allocation.weights), key=lambda item: -item[1]):
+        if weight > 1e-9:
+            print(f"{label:<30} {weight * 100:8.2f}%")
+    symbol = currency_symbol(params.currency)
+    print(f"Annual dividend income: {symbol}{allocation.annual_income:,.2f}")
+    print(f"Portfolio value:        {symbol}{allocation.portfolio_value:,.2f}")
+    print(f"Starting yield:         {allocation.starting_yield:.2f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
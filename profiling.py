@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+
+class _NullSpan:
+    """Span vazio usado quando o profiler está desligado (custo praticamente zero)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        profiler = self.profiler
+        stack = profiler._stack()
+        self.depth = len(stack)
+        self.mem_start = 0
+        self.peak = 0
+        if profiler.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # Guardar o pico do span pai antes de reiniciar o contador
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self.mem_start = current
+            self.peak = current
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        profiler = self.profiler
+        stack = profiler._stack()
+        stack.pop()
+        mem_delta = 0
+        mem_peak = 0
+        if profiler.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            mem_delta = current - self.mem_start
+            mem_peak = self.peak - self.mem_start
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+        profiler._record({
+            'name': self.name,
+            'start_ns': self.start - profiler.origin_ns,
+            'duration_ns': end - self.start,
+            'mem_delta': mem_delta,
+            'mem_peak': mem_peak,
+            'depth': self.depth,
+            'thread': threading.get_ident(),
+            'args': self.args,
+        })
+        return False
+
+
+class Profiler:
+    """
+    Instrumentação por etapas do pipeline de cálculo.
+
+    Cada etapa é medida com um span (context manager) que registra o tempo
+    monotônico e, opcionalmente, a variação de memória via tracemalloc.
+    Quando desabilitado, span() devolve um objeto nulo compartilhado.
+    """
+
+    def __init__(self, enabled=False, trace_memory=True, max_spans=10000):
+        self.enabled = False
+        self.trace_memory = trace_memory
+        self.max_spans = max_spans
+        self.origin_ns = time.perf_counter_ns()
+        self._spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracemalloc = False
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def traced(self, name):
+        """Decorator que envolve a função inteira em um span"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*a, **kw):
+                if not self.enabled:
+                    return func(*a, **kw)
+                with _Span(self, name, {}):
+                    return func(*a, **kw)
+            return wrapper
+        return decorator
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span):
+        with self._lock:
+            self._spans.append(span)
+            # Manter apenas os spans mais recentes
+            if len(self._spans) > self.max_spans:
+                del self._spans[:len(self._spans) - self.max_spans]
+
+    def clear(self):
+        with self._lock:
+            self._spans = []
+        self.origin_ns = time.perf_counter_ns()
+
+    @property
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def summary(self):
+        """Agrega os spans por nome, na ordem em que foram iniciados"""
+        stats = {}
+        for span in sorted(self.spans, key=lambda s: s['start_ns']):
+            entry = stats.get(span['name'])
+            if entry is None:
+                entry = stats[span['name']] = {
+                    'name': span['name'],
+                    'depth': span['depth'],
+                    'calls': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'mem_delta_kb': 0.0,
+                    'mem_peak_kb': 0.0,
+                }
+            duration_ms = span['duration_ns'] / 1e6
+            entry['calls'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['mem_delta_kb'] += span['mem_delta'] / 1024
+            entry['mem_peak_kb'] = max(entry['mem_peak_kb'], span['mem_peak'] / 1024)
+        for entry in stats.values():
+            entry['mean_ms'] = entry['total_ms'] / entry['calls']
+        return list(stats.values())
+
+    def to_json(self):
+        return json.dumps({'spans': self.spans, 'summary': self.summary()}, indent=2, default=str)
+
+    def to_chrome_trace(self):
+        """Formato Trace Event (chrome://tracing / Perfetto)"""
+        pid = os.getpid()
+        events = []
+        for span in self.spans:
+            args = dict(span['args'])
+            args['mem_delta'] = span['mem_delta']
+            args['mem_peak'] = span['mem_peak']
+            events.append({
+                'name': span['name'],
+                'ph': 'X',
+                'ts': span['start_ns'] / 1000,
+                'dur': span['duration_ns'] / 1000,
+                'pid': pid,
+                'tid': span['thread'],
+                'args': args,
+            })
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, default=str)
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+        return path
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_chrome_trace())
+        return path
+
+
+# Profiler global da aplicação (ativado com DIVIDEND_PROFILE=1 ou pelo painel de diagnóstico)
+PROFILER = Profiler(enabled=os.environ.get('DIVIDEND_PROFILE') == '1')
@@ -0,0 +1,210 @@
+"""
+Consultas pontuais da projeção ("quanto vale o portfólio no mês 417?") sem
+simular nem materializar os arrays mês a mês.
+
+Dentro de um ano o modelo é afim no valor do portfólio: a contribuição (ou
+retirada fixa), o yield, a alíquota e o percentual de retirada são constantes,
+e os pagamentos seguem sempre o mesmo calendário. Cada mês é o mapa
+X' = A * X + B, com os dividendos acumulados D' = D + alpha * X + beta.
+A composição dos meses de um bloco de pagamento e dos blocos de um ano tem
+forma fechada (somas geométricas com no máximo 12 termos), então o estado no
+início de cada ano sai de uma passada O(anos), guardada por conjunto de
+parâmetros, e cada mês pedido de no máximo 12 passos a partir dele.
+
+Cotas inteiras, calendário diário, cronogramas de contribuição e retiradas
+fixas que esgotam o portfólio ficam fora da forma fechada; nesses casos a
+consulta usa a simulação (guardada num cache).
+Os valores coincidem com os do oráculo até o arredondamento (ver equivalence.py).
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from engine import WITHDRAWAL_FIXED, WITHDRAWAL_PERCENT, WITHDRAWAL_DIVIDENDS, simulate
+
+# Campo da consulta -> série correspondente nos resultados da simulação
+QUERY_FIELDS = {
+    'portfolio_value': 'portfolio_values',
+    'cumulative_contributions': 'cumulative_contributions',
+    'cumulative_dividends': 'cumulative_dividends',
+    'dividend_income': 'dividend_income',
+    'yield_on_cost': 'yield_on_cost',
+    'real_portfolio_value': 'real_portfolio_values',
+}
+
+
+def closed_form_supported(params):
+    """
+    Indica se o modelo de params é afim mês a mês com a mesma contribuição
+    em todo o ano (sem cotas inteiras, calendário diário nem cronograma de contribuições)
+    """
+    return not params.whole_shares and not params.event_calendar and not params.has_contribution_schedule
+
+
+@lru_cache(maxsize=64)
+def _simulated(params):
+    """Resultados simulados para as consultas fora da forma fechada"""
+    with np.errstate(all='ignore'):
+        return simulate(params)
+
+
+def _year_terms(params, years):
+    """
+    Coeficientes de cada ano k < years: contribuição mensal, fração mantida após
+    a retirada percentual, fluxo mensal (contribuição ou retirada fixa), yield
+    pago por pagamento (líquido) e fator de reinvestimento.
+    """
+    k = np.arange(years)
+    withdrawal = k >= params.years_invested
+    mode = params.withdrawal_mode_idx
+    growth = 1 + (params.annual_inflation_rate / 100 if params.index_contributions else 0)
+    base_yield = params.annual_dividend_yield / 100
+    increase = 1 + params.expected_annual_dividend_increase / 100
+
+    keep = np.where(withdrawal & (mode == WITHDRAWAL_PERCENT), 1 - params.withdrawal_rate / 100 / 12, 1.0)
+    contribution = params.monthly_contribution * growth ** k
+    flow = np.where(withdrawal, 0.0, contribution)
+    if mode == WITHDRAWAL_FIXED:
+        withdrawn = params.withdrawal_amount / 12 * growth ** np.maximum(k - params.years_invested, 0)
+        flow = np.where(withdrawal, -withdrawn, flow)
+    payout = base_yield * increase ** k / params.payment_frequency * (1 - params.dividend_tax)
+    reinvest = params.dividend_reinvestment & ~(withdrawal & (mode == WITHDRAWAL_DIVIDENDS))
+    return contribution, keep, flow, payout, 1 + np.where(reinvest, payout, 0.0)
+
+
+def _year_maps(params, keep, flow, payout, reinvest_factor):
+    """
+    Mapa afim de cada ano: (A, B, alpha, beta) com X' = A * X + B e
+    D' = D + alpha * X + beta, compondo os meses sem pagamento, o mês de
+    pagamento e os blocos de pagamento do ano.
+    """
+    frequency = params.payment_frequency
+    period = 12 // frequency
+    appreciation = 1 + ((1 + params.expected_annual_share_price_appreciation / 100) ** (1/12) - 1)
+    kept = keep * appreciation
+
+    # Meses sem pagamento do bloco: X' = kept * X + flow * appreciation
+    plain_a = np.ones_like(kept)
+    plain_sum = np.zeros_like(kept)
+    for _ in range(period - 1):
+        plain_sum += plain_a
+        plain_a = plain_a * kept
+    plain_b = flow * appreciation * plain_sum
+
+    # Mês de pagamento: o dividendo incide sobre o saldo após a contribuição / retirada
+    pay_a = kept * reinvest_factor
+    pay_b = flow * appreciation * reinvest_factor
+    block_a = pay_a * plain_a
+    block_b = pay_a * plain_b + pay_b
+    block_alpha = payout * keep * plain_a
+    block_beta = payout * (keep * plain_b + flow)
+
+    # Blocos do ano: somas de block_a ** i e (frequência - 1 - i) * block_a ** i
+    power = np.ones_like(kept)
+    total = np.zeros_like(kept)
+    weighted = np.zeros_like(kept)
+    for i in range(frequency):
+        total += power
+        weighted += (frequency - 1 - i) * power
+        power = power * block_a
+    return power, block_b * total, block_alpha * total, frequency * block_beta + block_alpha * block_b * weighted
+
+
+@lru_cache(maxsize=1024)
+def _year_states(params):
+    """
+    Coeficientes de cada ano do horizonte e o estado (valor, dividendos
+    acumulados) no início de cada ano, calculados uma vez por conjunto de
+    parâmetros; as consultas seguintes só dão os passos dentro do ano.
+    """
+    years = (params.months + 11) // 12
+    with np.errstate(all='ignore'):
+        contribution, keep, flow, payout, reinvest_factor = _year_terms(params, years)
+        maps = _year_maps(params, keep, flow, payout, reinvest_factor)
+    value, dividends = params.starting_principal, 0.0
+    starts = []
+    for a, b, alpha, beta in zip(*(term.tolist() for term in maps)):
+        starts.append((value, dividends))
+        value, dividends = a * value + b, dividends + alpha * value + beta
+    contributed = np.concatenate([[0.0], np.cumsum(contribution)]).tolist()
+    terms = list(zip(keep.tolist(), flow.tolist(), payout.tolist(), reinvest_factor.tolist()))
+    return starts, terms, contribution.tolist(), contributed
+
+
+def query_months(params, months):
+    """
+    Valor do portfólio, contribuições e dividendos acumulados, renda de
+    dividendos do mês, yield on cost e valor real em cada mês de months
+    (0 a params.months), sem simular o horizonte inteiro.
+    Devolve (dicionário campo -> lista de valores, 'closed_form' ou 'simulated').
+    """
+    months = [int(month) for month in months]
+    for month in months:
+        if not 0 <= month <= params.months:
+            raise ValueError(f"month must be between 0 and {params.months}, got {month}")
+    if not closed_form_supported(params):
+        return _simulated_points(params, months), 'simulated'
+
+    starts, terms, contribution, contributed = _year_states(params)
+    appreciation = 1 + ((1 + params.expected_annual_share_price_appreciation / 100) ** (1/12) - 1)
+    period = 12 // params.payment_frequency
+    inflation = params.annual_inflation_rate / 100
+    base_yield = params.annual_dividend_yield / 100
+    increase = 1 + params.expected_annual_dividend_increase / 100
+    net = 1 - params.dividend_tax
+    fixed = params.withdrawal_mode_idx == WITHDRAWAL_FIXED and params.withdrawal_amount > 0
+
+    points = {name: [] for name in QUERY_FIELDS}
+    for month in months:
+        income = 0.0
+        if month == 0:
+            value, dividends = params.starting_principal, 0.0
+        else:
+            # No máximo 12 passos mensais a partir do início do ano (o mês m está no ano (m - 1) // 12)
+            year = (month - 1) // 12
+            value, dividends = starts[year]
+            keep, flow, payout, reinvest_factor = terms[year]
+            for step in range(year * 12 + 1, month + 1):
+                base = keep * value + flow
+                if step % period == 0:
+                    income = base * payout
+                    dividends += income
+                    value = base * reinvest_factor * appreciation
+                else:
+                    income = 0.0
+                    value = base * appreciation
+            # Saldo negativo só acontece depois que a retirada fixa esgota o portfólio
+            if fixed and month > params.accumulation_months and value < 0:
+                return _simulated_points(params, months), 'simulated'
+
+        full_years, remainder = divmod(min(month, params.accumulation_months), 12)
+        contributions = params.starting_principal + 12 * contributed[full_years]
+        if remainder:
+            contributions += remainder * contribution[full_years]
+        if month == 0:
+            yield_on_cost = base_yield * 100
+        elif contributions > 0:
+            yield_on_cost = value * base_yield * increase ** (month // 12) * net / contributions * 100
+        else:
+            yield_on_cost = 0.0
+
+        points['portfolio_value'].append(value)
+        points['cumulative_contributions'].append(contributions)
+        points['cumulative_dividends'].append(dividends)
+        points['dividend_income'].append(income)
+        points['yield_on_cost'].append(yield_on_cost)
+        points['real_portfolio_value'].append(value * (1 + inflation) ** (-month / 12))
+    return points, 'closed_form'
+
+
+def _simulated_points(params, months):
+    results = _simulated(params)
+    return {name: [float(results[key][month]) for month in months] for name, key in QUERY_FIELDS.items()}
+
+
+def query(params, month):
+    """Consulta de um único mês; devolve um dicionário campo -> valor (mais 'method')"""
+    points, method = query_months(params, [month])
+    values = {name: column[0] for name, column in points.items()}
+    values['method'] = method
+    return values
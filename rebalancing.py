@@ -0,0 +1,306 @@
+"""
+Carteiras com vários ativos e políticas de rebalanceamento.
+
+Cada ativo (events.Holding, com o peso-alvo em weight) segue o modelo mensal
+de engine.py: o aporte do mês entra, o dividendo incide sobre o valor após o
+aporte e é reinvestido no próprio ativo, e o preço valoriza. Entre dois
+rebalanceamentos cada ativo segue a recorrência linear v[m] = (v[m-1] + f[m]) * a[m],
+então a deriva dos pesos tem forma fechada sobre a grade ativos x meses:
+v[m] = G[m] * (v[s] / G[s] + F[m] - F[s]), com G o produto acumulado de a e F a
+soma acumulada de f / G do mês anterior, calculados uma vez. Só os meses de
+rebalanceamento passam por um passo em Python.
+
+Políticas:
+- none: os pesos derivam livremente;
+- calendar: volta aos pesos-alvo a cada `every` meses (12 = anual, 3 = trimestral);
+- threshold: volta aos pesos-alvo no fim do primeiro mês em que algum peso se
+  afasta do alvo mais que min(band pontos percentuais, relative_band % do alvo)
+  (a regra 5/25 com os valores padrão);
+- cashflow: sem vendas; aportes e dividendos do mês vão para os ativos abaixo
+  do peso-alvo, proporcionalmente ao que falta a cada um (passo mensal).
+
+Cada rebalanceamento registra o giro (valor vendido) e o imposto sobre o ganho
+realizado, pelo custo médio de cada ativo e pela alíquota de ganho de capital
+de params; o imposto sai do próprio portfólio. A fase de retiradas e as cotas
+inteiras não são modeladas.
+
+Uso:
+    python rebalancing.py holdings.json --policy threshold --band 5 --relative-band 25
+    python rebalancing.py holdings.json --compare
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from engine import ProjectionParams, contribution_vector, currency_symbol
+from fx import FxRates, fx_levels
+from optimizer import load_holdings
+
+POLICIES = ('none', 'calendar', 'threshold', 'cashflow')
+THRESHOLD_WINDOW = 12  # meses projetados por vez na busca do próximo rompimento da banda
+
+
+@dataclass(frozen=True)
+class RebalancePolicy:
+    kind: str = 'none'  # uma de POLICIES
+    every: int = 12  # meses entre rebalanceamentos (calendar)
+    band: float = 5.0  # desvio máximo do peso-alvo em pontos percentuais (threshold)
+    relative_band: float = 25.0  # desvio máximo em % do peso-alvo (threshold)
+
+    def validate(self):
+        if self.kind not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}, got '{self.kind}'")
+        if self.kind == 'calendar' and self.every < 1:
+            raise ValueError(f"rebalancing interval must be at least 1 month, got {self.every}")
+        if self.kind == 'threshold' and not (self.band > 0 and self.relative_band > 0):
+            raise ValueError("threshold bands must be positive")
+        return self
+
+
+def monthly_contributions(params):
+    """Contribuição de cada mês 1..months (zero na fase de retiradas), como em simulate_batch"""
+    contribution = np.zeros(params.months)
+    vector = contribution_vector(params)
+    if vector is not None:
+        contribution[:len(vector)] = vector
+    else:
+        growth = params.annual_inflation_rate / 100 if params.index_contributions else 0.0
+        month = np.arange(params.accumulation_months)
+        contribution[:params.accumulation_months] = params.monthly_contribution * (1 + growth) ** (month // 12)
+    return contribution
+
+
+def _holding_grid(params, holdings, rates, fx_start):
+    """Pesos-alvo e taxas mensais de cada ativo (ativos x meses)"""
+    weight = np.array([holding.weight for holding in holdings], dtype=float)
+    if np.any(weight < 0) or weight.sum() <= 0:
+        raise ValueError("target weights must be non-negative and add up to more than zero")
+    frequency = np.array([holding.payments_per_year for holding in holdings])
+    if np.any(12 % frequency != 0):
+        raise ValueError(f"payments_per_year must divide 12, got {sorted(set(frequency.tolist()))}")
+    currencies = [holding.currency for holding in holdings]
+    if rates is None and any(currency not in ('', params.currency) for currency in currencies):
+        raise ValueError(f"FX rates are required for holdings not quoted in {params.currency}")
+
+    month = np.arange(1, params.months + 1)
+    base_yield = np.array([holding.annual_dividend_yield for holding in holdings])[:, None] / 100
+    growth = 1 + np.array([holding.expected_annual_dividend_increase for holding in holdings])[:, None] / 100
+    appreciation = np.array([holding.expected_annual_share_price_appreciation for holding in holdings]) / 100
+    # Dividendo bruto do mês sobre o valor após o aporte, como em simulate_batch
+    gross_rate = np.where(month % (12 // frequency[:, None]) == 0,
+                          base_yield * growth ** ((month - 1) // 12) / frequency[:, None], 0.0)
+    price_move = np.broadcast_to(((1 + appreciation) ** (1 / 12))[:, None], gross_rate.shape)
+    levels = fx_levels(rates, [params] * len(holdings), currencies, fx_start) if rates is not None else None
+    if levels is not None:
+        # Ativos em outra moeda: preço e dividendo acompanham a cotação (ver fx.py)
+        fx_move = levels[:, 1:] / levels[:, :-1]
+        gross_rate = gross_rate * fx_move
+        price_move = price_move * fx_move
+    return weight / weight.sum(), gross_rate, price_move
+
+
+def simulate_rebalanced(params, holdings, policy=RebalancePolicy(), rates=None, fx_start=None):
+    """
+    Projeção mensal da carteira com a política de rebalanceamento. Devolve
+    arrays de months + 1 ('portfolio_values', 'dividend_income',
+    'dividend_taxes', 'cumulative_contributions', 'turnover' e
+    'rebalance_taxes' por mês), 'holding_values' (ativos x meses + 1) e
+    'rebalance_months'. Todos os valores na moeda de params (rates: cotações
+    para ativos em outras moedas).
+    """
+    policy.validate()
+    if params.withdrawal_years:
+        raise ValueError("rebalancing runs do not model the withdrawal phase")
+    if params.whole_shares:
+        raise ValueError("rebalancing runs use fractional shares")
+    if not holdings:
+        raise ValueError("at least one holding is required")
+
+    target, gross_rate, price_move = _holding_grid(params, holdings, rates, fx_start)
+    months = params.months
+    tax = params.dividend_tax
+    net_rate = gross_rate * (1 - tax)
+    reinvest_rate = net_rate if params.dividend_reinvestment else np.zeros_like(net_rate)
+    contribution = monthly_contributions(params)
+
+    values = np.empty((len(holdings), months + 1))
+    values[:, 0] = target * params.starting_principal
+    turnover = np.zeros(months + 1)
+    rebalance_taxes = np.zeros(months + 1)
+    if policy.kind == 'cashflow':
+        rebalanced = _cashflow_path(values, target, contribution, net_rate, price_move, params.dividend_reinvestment)
+    else:
+        rebalanced = _event_path(values, target, contribution, reinvest_rate, price_move, policy,
+                                 params.capital_gains_tax, turnover, rebalance_taxes)
+
+    # Dividendos de cada mês sobre o valor após o aporte (o aporte do mês segue a regra da política)
+    flows = rebalanced['flows']
+    invested = values[:, :-1] + flows
+    dividend_income = np.concatenate([[0.0], (invested * net_rate).sum(axis=0)])
+    dividend_taxes = np.concatenate([[0.0], (invested * gross_rate * tax).sum(axis=0)])
+    return {
+        'portfolio_values': values.sum(axis=0),
+        'holding_values': values,
+        'dividend_income': dividend_income,
+        'dividend_taxes': dividend_taxes,
+        'cumulative_contributions': np.cumsum(np.concatenate([[params.starting_principal], contribution])),
+        'turnover': turnover,
+        'rebalance_taxes': rebalance_taxes,
+        'rebalance_months': np.array(rebalanced['events'], dtype=int),
+    }
+
+
+def _event_path(values, target, contribution, reinvest_rate, price_move, policy, gains_tax, turnover, taxes):
+    """
+    Caminho com aportes pelos pesos-alvo e rebalanceamentos só nos meses de
+    evento (calendar / threshold); entre eventos, a forma fechada da deriva.
+    """
+    n_holdings, columns = values.shape
+    months = columns - 1
+    flows = target[:, None] * contribution[None, :]
+    factor = (1 + reinvest_rate) * price_move
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        growth = np.concatenate([np.ones((n_holdings, 1)), np.cumprod(factor, axis=1)], axis=1)
+        discounted = np.concatenate([np.zeros((n_holdings, 1)), np.cumsum(flows / growth[:, :-1], axis=1)], axis=1)
+    tolerance = np.minimum(policy.band / 100, policy.relative_band / 100 * target)
+    basis = values[:, 0].copy()
+    events = []
+
+    def drift(start, end):
+        # Valores dos meses start+1..end a partir do estado (após o evento) do mês start
+        offset = values[:, start] / growth[:, start] - discounted[:, start]
+        return growth[:, start + 1:end + 1] * (offset[:, None] + discounted[:, start + 1:end + 1])
+
+    start = 0
+    while start < months:
+        if policy.kind == 'calendar':
+            event = min((start // policy.every + 1) * policy.every, months)
+            values[:, start + 1:event + 1] = drift(start, event)
+            event = event if event % policy.every == 0 else None
+            end = months if event is None else event
+        elif policy.kind == 'threshold':
+            event, window, end = None, THRESHOLD_WINDOW, start
+            while event is None and end < months:
+                first, end = end, min(end + window, months)
+                segment = drift(start, end)[:, first - start:]
+                values[:, first + 1:end + 1] = segment
+                total = segment.sum(axis=0)
+                breach = (np.abs(segment / np.where(total > 0, total, 1.0) - target[:, None])
+                          > tolerance[:, None]).any(axis=0)
+                if breach.any():
+                    event = first + 1 + int(np.argmax(breach))
+                    end = event
+                window *= 2
+        else:
+            values[:, start + 1:] = drift(start, months)
+            event, end = None, months
+
+        # Custo médio: compras (aportes e dividendos reinvestidos) até o evento
+        previous = values[:, start:end]
+        basis += (flows[:, start:end] * (1 + reinvest_rate[:, start:end])
+                  + previous * reinvest_rate[:, start:end]).sum(axis=1)
+        if event is not None:
+            current = values[:, event]
+            total = current.sum()
+            sales = np.maximum(current - target * total, 0.0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sold_basis = np.where(current > 0, basis * sales / current, 0.0)
+            tax = max(float((sales - sold_basis).sum()), 0.0) * gains_tax
+            rebalanced = target * (total - tax)
+            basis += np.maximum(rebalanced - (current - sales), 0.0) - sold_basis
+            values[:, event] = rebalanced
+            turnover[event] = sales.sum()
+            taxes[event] = tax
+            events.append(event)
+        start = end
+    return {'flows': flows, 'events': events}
+
+
+def _cashflow_path(values, target, contribution, net_rate, price_move, reinvest):
+    """Aportes e dividendos do mês vão para os ativos abaixo do peso-alvo (sem vendas)"""
+    months = values.shape[1] - 1
+    flows = np.empty((len(target), months))
+    current = values[:, 0].copy()
+    for m in range(months):
+        placed = _fill_deficits(current, contribution[m], target)
+        current = current + placed
+        flows[:, m] = placed
+        if reinvest:
+            current = current + _fill_deficits(current, float(current @ net_rate[:, m]), target)
+        current = current * price_move[:, m]
+        values[:, m + 1] = current
+    return {'flows': flows, 'events': []}
+
+
+def _fill_deficits(current, cash, target):
+    """Divide cash entre os ativos proporcionalmente ao que falta a cada um para o peso-alvo"""
+    if cash <= 0:
+        return np.zeros_like(current)
+    deficit = np.maximum(target * (current.sum() + cash) - current, 0.0)
+    missing = deficit.sum()
+    # Os déficits somam pelo menos cash, então nenhum ativo passa do alvo
+    return deficit * (cash / missing) if missing > 0 else target * cash
+
+
+def rebalancing_summary(result):
+    """Valor final, renda dos últimos 12 meses, giro, imposto e número de rebalanceamentos"""
+    return {
+        'final_value': float(result['portfolio_values'][-1]),
+        'final_annual_income': float(result['dividend_income'][-12:].sum()),
+        'turnover': float(result['turnover'].sum()),
+        'rebalance_taxes': float(result['rebalance_taxes'].sum()),
+        'rebalances': len(result['rebalance_months']),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-asset projection with a rebalancing policy")
+    parser.add_argument('holdings', help='JSON file: {"params": {...}, "holdings": [...]}; weights are the targets')
+    parser.add_argument('--policy', choices=POLICIES, default='threshold')
+    parser.add_argument('--every', type=int, default=12, help="months between calendar rebalances")
+    parser.add_argument('--band', type=float, default=5.0, help="threshold band in percentage points")
+    parser.add_argument('--relative-band', type=float, default=25.0, help="threshold band in %% of the target")
+    parser.add_argument('--compare', action='store_true', help="run every policy (annual and quarterly calendar)")
+    parser.add_argument('--fx-rates', help="folder with <CURRENCY>.csv rate files for holdings in other currencies")
+    parser.add_argument('--fx-start', help="first month of the projection for the FX rates (YYYY-MM)")
+    args = parser.parse_args(argv)
+
+    with open(args.holdings) as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {'holdings': data}
+    params = ProjectionParams.from_dict(data.get('params', {})).validate()
+    holdings, _ = load_holdings(data['holdings'])
+    if args.compare:
+        policies = [('No rebalancing', RebalancePolicy()),
+                    ('Annual', RebalancePolicy('calendar', every=12)),
+                    ('Quarterly', RebalancePolicy('calendar', every=3)),
+                    (f'Bands {args.band:g}/{args.relative_band:g}',
+                     RebalancePolicy('threshold', band=args.band, relative_band=args.relative_band)),
+                    ('Contributions and dividends', RebalancePolicy('cashflow'))]
+    else:
+        policies = [(args.policy, RebalancePolicy(args.policy, args.every, args.band, args.relative_band))]
+
+    symbol = currency_symbol(params.currency)
+    try:
+        rates = FxRates.load(args.fx_rates) if args.fx_rates else None
+        for name, policy in policies:
+            start = time.perf_counter()
+            summary = rebalancing_summary(simulate_rebalanced(params, holdings, policy, rates, args.fx_start))
+            elapsed = time.perf_counter() - start
+            print(f"{name:<30} value {symbol}{summary['final_value']:,.2f}  "
+                  f"income {symbol}{summary['final_annual_income']:,.2f}  "
+                  f"turnover {symbol}{summary['turnover']:,.2f}  tax {symbol}{summary['rebalance_taxes']:,.2f}  "
+                  f"{summary['rebalances']} rebalance(s)  {elapsed * 1000:.0f} ms")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""
+Relatórios HTML da tabela de resultados, independentes da interface.
+
+O esqueleto estático da página (CSS e marcação) é montado uma única vez na
+importação; cada relatório só formata as linhas da tabela e o resumo a partir
+de ProjectionParams e dos resultados da simulação, sem ler widgets.
+
+Uso em lote (um relatório por cliente, em paralelo):
+    python reports.py clients.json --out reports --workers 4
+
+clients.json é uma lista de objetos com os nomes de engine.ProjectionParams e
+um "name" opcional, como em static_export.py.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from html import escape
+
+import numpy as np
+
+from engine import (ProjectionParams, PAYMENT_FREQUENCY_NAMES, ACCOUNT_TYPES, CONTRIBUTION_TYPES, WITHDRAWAL_FIXED,
+                    WITHDRAWAL_PERCENT, simulate, simulate_batch, results_frame, results_table, has_real_terms, has_withdrawals,
+                    depletion_month, currency_symbol)
+
+PAGE_STYLE = """
+                body {
+                    font-family: Arial, sans-serif;
+                    margin: 20px;
+                    background-color: #f9f9f9;
+                }
+                h1 {
+                    color: #2c3e50;
+                    text-align: center;
+                }
+                table {
+                    width: 100%;
+                    border-collapse: collapse;
+                    margin: 20px 0;
+                    box-shadow: 0 0 20px rgba(0, 0, 0, 0.1);
+                    background-color: white;
+                }
+                th, td {
+                    padding: 12px 15px;
+                    text-align: right;
+                    border-bottom: 1px solid #ddd;
+                }
+                th {
+                    background-color: #3498db;
+                    color: white;
+                    font-weight: bold;
+                    text-align: center;
+                }
+                tr:nth-child(even) {
+                    background-color: #f2f2f2;
+                }
+                tr:hover {
+                    background-color: #e0f7fa;
+                }
+                .header-row {
+                    position: sticky;
+                    top: 0;
+                }
+                .summary {
+                    margin-top: 20px;
+                    padding: 15px;
+                    background-color: #e8f4f8;
+                    border-radius: 5px;
+                    border-left: 5px solid #3498db;
+                }
+"""
+
+# Partes fixas da página, montadas uma vez; o relatório só junta os trechos variáveis
+PAGE_HEAD = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Dividend Calculator Results</title>
+            <style>{PAGE_STYLE}            </style>
+        </head>
+        <body>
+            <h1>Dividend Portfolio Calculator Results</h1>
+
+            <div class="summary">
+                <h2>Summary</h2>
+"""
+PAGE_MIDDLE = """
+            </div>
+
+"""
+PAGE_TAIL = """
+
+            <div class="summary">
+                <p>This table shows results at yearly intervals. For more detailed data and interactive visualizations,
+                please use the chart views.</p>
+            </div>
+        </body>
+        </html>
+        """
+TABLE_HEAD = '<table border="1" class="dataframe">\n  <thead>\n    <tr style="text-align: right;">\n'
+TABLE_BODY = '    </tr>\n  </thead>\n  <tbody>\n'
+TABLE_TAIL = '  </tbody>\n</table>'
+ROW_START = '    <tr>\n      <td>'
+ROW_SEPARATOR = '</td>\n      <td>'
+ROW_END = '</td>\n    </tr>\n'
+
+# Nome exibido e formato de cada coluna da tabela, na ordem de exibição
+MONEY = '${:,.2f}'
+PERCENT = '{:.2f}%'
+TABLE_COLUMNS = [
+    ('Years', 'Year', '{:.1f}'),
+    ('Portfolio Value', 'Portfolio Value', MONEY),
+    ('Cumulative Contributions', 'Total Contributions', MONEY),
+    ('Cumulative Dividends', 'Total Dividends', MONEY),
+    ('Appreciation', 'Total Appreciation', MONEY),
+    ('Dividend Income', 'Dividend Income', MONEY),
+    ('Yield on Cost', 'Yield on Cost', PERCENT),
+    ('Share Price', 'Share Price', MONEY),
+    ('Shares Held', 'Shares Held', '{:,.0f}'),
+    ('Uninvested Cash', 'Uninvested Cash', MONEY),
+    ('Annual Dividend Income', 'Annual Dividend Income', MONEY),
+    ('Monthly Dividend Income', 'Monthly Dividend Income', MONEY),
+    ('Annual Withdrawals', 'Annual Withdrawals', MONEY),
+    ('Annual Net Withdrawals', 'Annual Withdrawals After Tax', MONEY),
+    ('Cumulative Withdrawals', 'Cumulative Withdrawals', MONEY),
+    ('Cumulative Taxes', 'Total Taxes Paid', MONEY),
+    ('Real Portfolio Value', "Portfolio Value (Today's $)", MONEY),
+    ('Real Annual Dividend Income', "Annual Dividend Income (Today's $)", MONEY),
+    ('Real Yield on Cost', 'Real Yield on Cost', PERCENT),
+]
+WITHDRAWAL_COLUMNS = ('Annual Withdrawals', 'Annual Net Withdrawals', 'Cumulative Withdrawals')
+SHARE_COLUMNS = ('Share Price', 'Shares Held', 'Uninvested Cash')
+REAL_TABLE_COLUMNS = ('Real Portfolio Value', 'Real Annual Dividend Income', 'Real Yield on Cost')
+HEADER_CELLS = {column: f'      <th>{escape(label, quote=False)}</th>\n' for column, label, _ in TABLE_COLUMNS}
+
+
+def table_columns(df, params=None):
+    """Colunas exibidas na tabela (withdrawals, impostos, cotas e valores reais só quando se aplicam)"""
+    hidden = set()
+    if not has_withdrawals(df):
+        hidden.update(WITHDRAWAL_COLUMNS)
+    if 'Cumulative Taxes' not in df or not df['Cumulative Taxes'].iloc[-1] > 0:
+        hidden.add('Cumulative Taxes')
+    if params is None or not params.whole_shares:
+        hidden.update(SHARE_COLUMNS)
+    if not has_real_terms(df):
+        hidden.update(REAL_TABLE_COLUMNS)
+    return [(column, fmt) for column, _, fmt in TABLE_COLUMNS if column not in hidden]
+
+
+def symbol(params):
+    """Prefixo dos valores na moeda da projeção (dólar quando não há parâmetros)"""
+    return currency_symbol(params.currency if params is not None else 'USD')
+
+
+def table_html(df, params=None):
+    """Tabela HTML das linhas anuais (mesma marcação de DataFrame.to_html, sem o custo dele)"""
+    table = results_table(df)
+    prefix = symbol(params)
+    money = MONEY.replace('$', prefix)
+    columns = [(column, money if fmt == MONEY else fmt) for column, fmt in table_columns(df, params)
+               if column in table]
+    cells = [[fmt.format(value) for value in table[column].to_numpy(dtype=np.float64).tolist()]
+             for column, fmt in columns]
+    parts = [TABLE_HEAD]
+    parts.extend(HEADER_CELLS[column].replace("Today's $", f"Today's {prefix.strip()}") for column, _ in columns)
+    parts.append(TABLE_BODY)
+    parts.extend(ROW_START + ROW_SEPARATOR.join(row) + ROW_END for row in zip(*cells))
+    parts.append(TABLE_TAIL)
+    return ''.join(parts)
+
+
+def whole_share_summary_html(params, df, fractional_value=None):
+    """Linha do resumo com o efeito das compras em cotas inteiras (cash drag)"""
+    if params is None or not params.whole_shares:
+        return ''
+    final_value = df['Portfolio Value'].iloc[-1]
+    if fractional_value is None:
+        fractional_value = simulate(replace(params, whole_shares=False))['portfolio_values'][-1]
+    difference = final_value - fractional_value
+    share = difference / fractional_value * 100 if fractional_value else 0.0
+    prefix = symbol(params)
+    return (f"<p><strong>Whole Shares Only:</strong> starting at {prefix}{params.share_price:,.2f} per share; "
+            f"final value {'+' if difference >= 0 else '-'}{prefix}{abs(difference):,.2f} ({share:+.2f}%) "
+            f"versus fractional shares</p>")
+
+
+def withdrawal_summary_html(params, results):
+    """Linhas do resumo da tabela sobre a fase de retiradas"""
+    if params is None or not params.withdrawal_years:
+        return ''
+    if params.withdrawal_mode_idx == WITHDRAWAL_FIXED:
+        strategy = f"{symbol(params)}{params.withdrawal_amount:,.2f} per year"
+    elif params.withdrawal_mode_idx == WITHDRAWAL_PERCENT:
+        strategy = f"{params.withdrawal_rate}% of the portfolio per year"
+    else:
+        strategy = "dividends only"
+    lines = f"<p><strong>Withdrawal Phase:</strong> {params.withdrawal_years} years, {strategy}</p>"
+    depleted = depletion_month(params, results)
+    if depleted is not None:
+        lines += f"<p><strong>Portfolio Depleted:</strong> year {depleted / 12:.1f}</p>"
+    return lines
+
+
+def contribution_summary_html(params):
+    """Linha das contribuições: valor mensal, ou o cronograma quando houver"""
+    prefix = symbol(params)
+    if not params.has_contribution_schedule:
+        return f"<p><strong>Monthly Contribution:</strong> {prefix}{params.monthly_contribution:,.2f}</p>"
+    schedule = params.contribution_schedule
+    parts = [f"{prefix}{params.periodic_contribution:,.2f} {CONTRIBUTION_TYPES[params.contribution_type_idx].lower()}"]
+    if params.contribution_raise:
+        parts.append(f"raised {params.contribution_raise}% a year")
+    if schedule.paused_years:
+        parts.append(f"paused in years {params.paused_years}")
+    parts.extend(f"{prefix}{amount:,.2f} lump sum in year {year}" for year, amount in schedule.lump_sums)
+    return f"<p><strong>Contributions:</strong> {escape(', '.join(parts), quote=False)}</p>"
+
+
+def summary_html(params, df, results, fractional_value=None):
+    """Bloco de resumo com as entradas da projeção"""
+    calendar = (f' (ex-dividend day {params.ex_dividend_day}, paid {params.payment_lag_days} days later)'
+                if params.event_calendar else '')
+    withholding = (f' (foreign withholding {params.foreign_withholding_rate}%)'
+                   if params.foreign_withholding_rate else '')
+    return f"""                <p><strong>Initial Investment:</strong> {symbol(params)}{params.starting_principal:,.2f}</p>
+                {contribution_summary_html(params)}
+                <p><strong>Years Invested:</strong> {params.years_invested}</p>
+                <p><strong>Initial Dividend Yield:</strong> {params.annual_dividend_yield}%</p>
+                <p><strong>Expected Annual Dividend Increase:</strong> {params.expected_annual_dividend_increase}%</p>
+                <p><strong>Expected Annual Share Price Appreciation:</strong> {params.expected_annual_share_price_appreciation}%</p>
+                <p><strong>Dividend Reinvestment:</strong> {'Yes' if params.dividend_reinvestment else 'No'}</p>
+                <p><strong>Dividend Payment Frequency:</strong> {PAYMENT_FREQUENCY_NAMES[params.payment_frequency_idx]}{calendar}</p>
+                <p><strong>Account Type:</strong> {ACCOUNT_TYPES[params.account_type_idx]}{withholding}</p>
+                {whole_share_summary_html(params, df, fractional_value)}
+                {withdrawal_summary_html(params, results)}
+                <p><strong>Annual Inflation Rate:</strong> {params.annual_inflation_rate}%{' (contributions indexed)' if params.index_contributions else ''}</p>"""
+
+
+def results_table_html(params, results, df=None, fractional_value=None):
+    """
+    Página HTML completa (resumo + tabela anual) de uma projeção.
+    df é o DataFrame de results_frame(results), quando já estiver montado.
+    """
+    if df is None:
+        df = results_frame(results)
+    return ''.join((PAGE_HEAD, summary_html(params, df, results, fractional_value), PAGE_MIDDLE,
+                    table_html(df, params), PAGE_TAIL))
+
+
+def safe_name(name):
+    """Nome de arquivo seguro para o nome de um cliente"""
+    return re.sub(r'[^\w.-]+', '_', str(name)).strip('._') or 'client'
+
+
+def _simulate_chunk(params_list):
+    """
+    Resultados de vários clientes com uma chamada ao motor em lote (mais o
+    valor final com cotas fracionárias dos clientes com cotas inteiras).
+    Clientes com calendário diário ficam com None (motor de eventos, um a um).
+    """
+    batched = [index for index, params in enumerate(params_list) if not params.event_calendar]
+    twins = [index for index in batched if params_list[index].whole_shares]
+    results = [None] * len(params_list)
+    fractional = [None] * len(params_list)
+    if not batched:
+        return results, fractional
+    batch = simulate_batch([params_list[index] for index in batched] +
+                           [replace(params_list[index], whole_shares=False) for index in twins])
+
+    for row, index in enumerate(batched):
+        months = params_list[index].months
+        results[index] = {key: values[row, :months + 1] for key, values in batch.items()}
+    for row, index in enumerate(twins, start=len(batched)):
+        fractional[index] = batch['portfolio_values'][row, params_list[index].months]
+    return results, fractional
+
+
+def _generate_chunk(job):
+    """Tarefa de um worker: grava os relatórios de um bloco de clientes"""
+    clients, folder = job
+    outcome = [None] * len(clients)
+    params_list, positions = [], []
+    for position, (name, data) in enumerate(clients):
+        try:
+            params_list.append(ProjectionParams.from_dict(data).validate())
+            positions.append(position)
+        except (ValueError, TypeError) as e:
+            outcome[position] = (name, None, f"{type(e).__name__}: {e}")
+
+    results, fractional = _simulate_chunk(params_list)
+    for position, params, result, fractional_value in zip(positions, params_list, results, fractional):
+        name = clients[position][0]
+        path = os.path.join(folder, f"{safe_name(name)}.html")
+        try:
+            if result is None:
+                result = simulate(params)
+            content = results_table_html(params, result, fractional_value=fractional_value)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            outcome[position] = (name, path, None)
+        except Exception as e:
+            outcome[position] = (name, None, f"{type(e).__name__}: {e}")
+    return outcome
+
+
+def generate_reports(clients, folder, workers=None, chunksize=64):
+    """
+    Grava um relatório HTML por cliente em folder, em blocos distribuídos
+    entre processos (workers=1 roda no processo atual).
+    clients: lista de dicionários com "name" e os parâmetros da projeção.
+    Devolve uma lista de (nome, arquivo ou None, erro ou None), na ordem dos clientes.
+    """
+    os.makedirs(folder, exist_ok=True)
+    named = [(client.get('name', f'client{index}'), client) for index, client in enumerate(clients)]
+    jobs = [(named[start:start + chunksize], folder) for start in range(0, len(named), chunksize)]
+    if workers == 1:
+        chunks = map(_generate_chunk, jobs)
+        return [entry for chunk in chunks for entry in chunk]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [entry for chunk in executor.map(_generate_chunk, jobs) for entry in chunk]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk HTML results table reports")
+    parser.add_argument('clients', help="JSON file with a list of client parameter objects")
+    parser.add_argument('--out', default='reports', help="output folder")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunksize', type=int, default=64, help="clients simulated together per task")
+    args = parser.parse_args(argv)
+
+    with open(args.clients) as f:
+        clients = json.load(f)
+    start = time.perf_counter()
+    results = generate_reports(clients, args.out, args.workers, args.chunksize)
+    elapsed = time.perf_counter() - start
+
+    failed = [(name, error) for name, _, error in results if error]
+    for name, error in failed:
+        print(f"{name}: {error}", file=sys.stderr)
+    print(f"Generated {len(results) - len(failed)} report(s) in {args.out} in {elapsed:.1f} s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
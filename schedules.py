@@ -0,0 +1,90 @@
+"""
+Cronogramas de contribuição: aumento anual percentual, anos sem aportes,
+aportes extraordinários e depósito anual único (o valor anual inteiro no
+primeiro mês de cada ano, em vez de dividido por 12).
+
+Um cronograma é compilado num vetor denso com a contribuição de cada mês da
+fase de acumulação, guardado em cache pelo hash do cronograma. Os motores
+usam o vetor no lugar do cálculo da contribuição constante, então uma
+varredura com cronogramas custa o mesmo que com a contribuição constante.
+
+Texto aceito nos campos dos parâmetros:
+    anos pausados:   "3, 7-9"              (anos a partir de 1)
+    aportes únicos:  "5: 20000; 10: 50000" (ano: valor, no primeiro mês do ano)
+"""
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+MAX_YEAR = 100
+
+
+@dataclass(frozen=True)
+class ContributionSchedule:
+    amount: float  # valor de cada depósito regular (mensal ou anual)
+    every: int  # meses entre os depósitos regulares (1 ou 12)
+    growth: float  # reajuste anual pela inflação (fração)
+    raise_rate: float  # aumento anual adicional (fração)
+    paused_years: tuple  # anos (a partir de 1) sem depósitos regulares
+    lump_sums: tuple  # (ano, valor) depositados no primeiro mês do ano
+    months: int  # meses da fase de acumulação
+
+
+@lru_cache(maxsize=256)
+def parse_years(text):
+    """Anos de um texto como "3, 7-9" (a partir de 1), em ordem e sem repetição"""
+    years = set()
+    for part in str(text).replace(';', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            first, last = (int(value) for value in part.split('-', 1)) if '-' in part else (int(part),) * 2
+            if not 1 <= first <= last <= MAX_YEAR:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"invalid year range '{part}' (expected e.g. 3, 7-9, years 1 to {MAX_YEAR})") from None
+        years.update(range(first, last + 1))
+    return tuple(sorted(years))
+
+
+@lru_cache(maxsize=256)
+def parse_lump_sums(text):
+    """Pares (ano, valor) de um texto como "5: 20000; 10: 50000" (valores do mesmo ano somados)"""
+    amounts = {}
+    for part in str(text).split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            year, amount = part.split(':', 1)
+            year, amount = int(year), float(amount.replace(',', ''))
+        except ValueError:
+            raise ValueError(f"invalid lump sum '{part}' (expected year: amount)") from None
+        if not 1 <= year <= MAX_YEAR or not 0 <= amount < math.inf:
+            raise ValueError(f"invalid lump sum '{part}': years go from 1 to {MAX_YEAR} and amounts can't be negative")
+        amounts[year] = amounts.get(year, 0.0) + amount
+    return tuple(sorted(amounts.items()))
+
+
+@lru_cache(maxsize=1024)
+def compile_schedule(schedule):
+    """
+    Vetor (somente leitura) com a contribuição de cada mês 1..months do
+    cronograma: depósito regular reajustado a cada 12 meses, zerado nos anos
+    pausados, mais os aportes únicos.
+    """
+    month = np.arange(schedule.months)
+    year = month // 12
+    factor = np.array([((1 + schedule.growth) ** k) * ((1 + schedule.raise_rate) ** k)
+                       for k in range(int(year[-1]) + 1 if schedule.months else 0)])
+    vector = np.where(month % schedule.every == 0, schedule.amount, 0.0) * factor[year]
+    paused = np.asarray(schedule.paused_years, dtype=int) - 1
+    vector[np.isin(year, paused)] = 0.0
+    for lump_year, amount in schedule.lump_sums:
+        if lump_year <= schedule.months // 12:
+            vector[(lump_year - 1) * 12] += amount
+    vector.flags.writeable = False
+    return vector
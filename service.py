@@ -0,0 +1,304 @@
+"""
+Serviço HTTP/JSON de projeções (modo headless, sem PyQt5).
+
+Endpoints:
+    GET  /health                 estado do serviço
+    GET  /stats                  estatísticas do cache e do pool
+    GET  /project?years_invested=20&...   resultados mês a mês
+    POST /project                corpo JSON com os parâmetros
+    GET  /table?...  | POST /table        tabela anual de resultados
+    GET  /withdrawal?... | POST /withdrawal   maior retirada anual sustentável
+    GET  /query?month=417&... | POST /query   valores em meses avulsos (forma fechada)
+
+Os parâmetros usam os mesmos nomes e unidades de engine.ProjectionParams;
+parâmetros ausentes assumem os valores padrão da interface. /query aceita
+"month" (um mês) ou "months" (lista, ou separados por vírgula na URL) e é
+respondida na própria thread da requisição, sem passar pelo pool.
+
+As respostas são JSON estrito: valores que estouram o float (projeções
+extremas dentro das faixas permitidas) saem como null, nunca Infinity ou NaN.
+
+Uso:
+    python service.py --port 8765 --workers 4
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy as np
+
+from engine import ProjectionParams, simulate, results_frame, results_table, max_sustainable_withdrawal
+from queries import query_months
+
+ENDPOINTS = ('project', 'table', 'withdrawal', 'query')
+
+
+def compute(endpoint, params):
+    """Executa a projeção e devolve a resposta já serializada (roda nos workers)"""
+    if endpoint == 'withdrawal':
+        amount, rate = max_sustainable_withdrawal(params)
+        payload = {'params': params.to_dict(), 'annual_withdrawal': amount, 'withdrawal_rate': rate}
+        return dump_json(payload)
+
+    df = results_frame(simulate(params))
+    if endpoint == 'table':
+        data = results_table(df)
+    else:
+        data = df
+    payload = {
+        'params': params.to_dict(),
+        'columns': list(data.columns),
+        'data': {column: data[column].to_numpy(dtype=np.float64).tolist() for column in data.columns},
+    }
+    return dump_json(payload)
+
+
+def dump_json(payload):
+    """Serializa como JSON estrito; valores não finitos viram null"""
+    try:
+        text = json.dumps(payload, separators=(',', ':'), allow_nan=False)
+    except ValueError:
+        # Caminho raro (estouro): só então percorre o payload trocando inf/nan por None
+        text = json.dumps(finite_values(payload), separators=(',', ':'), allow_nan=False)
+    return text.encode('utf-8')
+
+
+def finite_values(value):
+    """Cópia de value com floats infinitos ou NaN trocados por None"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: finite_values(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [finite_values(item) for item in value]
+    return value
+
+
+class ResultCache:
+    """Cache LRU limitado de respostas serializadas"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ProjectionService:
+    """
+    Núcleo do serviço, independente do socket HTTP.
+
+    Requisições idênticas em andamento são agrupadas (uma única execução no
+    pool atende todas) e as respostas ficam num cache LRU limitado.
+    """
+
+    def __init__(self, workers=None, cache_size=1024, use_processes=True):
+        if use_processes:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cache = ResultCache(cache_size)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+        self.computed = 0
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def get(self, endpoint, params):
+        """Resposta serializada para (endpoint, params), usando cache e agrupamento"""
+        key = (endpoint, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self.executor.submit(compute, endpoint, params)
+                self._inflight[key] = future
+                self.computed += 1
+            else:
+                self.coalesced += 1
+
+        try:
+            body = future.result()
+        finally:
+            if owner:
+                with self._lock:
+                    self._inflight.pop(key, None)
+        if owner:
+            self.cache.put(key, body)
+        return body
+
+    def stats(self):
+        return {
+            'cache_entries': len(self.cache),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'computed': self.computed,
+            'coalesced': self.coalesced,
+            'inflight': len(self._inflight),
+        }
+
+    def handle(self, method, path, body=b''):
+        """Trata uma requisição; devolve (status, corpo em bytes)"""
+        url = urlsplit(path)
+        endpoint = url.path.strip('/')
+
+        if endpoint == 'health':
+            return 200, b'{"status":"ok"}'
+        if endpoint == 'stats':
+            return 200, json.dumps(self.stats()).encode('utf-8')
+        if endpoint not in ENDPOINTS:
+            return 404, error_body(f"unknown endpoint: /{endpoint}")
+        if method not in ('GET', 'POST'):
+            return 405, error_body(f"method not allowed: {method}")
+
+        try:
+            if method == 'POST' and body:
+                data = json.loads(body)
+                if not isinstance(data, dict):
+                    raise ValueError("request body must be a JSON object")
+            else:
+                data = dict(parse_qsl(url.query))
+            params = ProjectionParams.from_dict(data).validate()
+            if endpoint == 'withdrawal' and params.withdrawal_years <= 0:
+                raise ValueError("withdrawal_years must be greater than zero")
+            if endpoint == 'query':
+                return 200, query_body(params, parse_months(data))
+        except (ValueError, TypeError) as e:
+            return 400, error_body(str(e))
+        except Exception as e:
+            return 500, error_body(f"internal error: {type(e).__name__}: {e}")
+
+        try:
+            return 200, self.get(endpoint, params)
+        except ValueError as e:
+            return 400, error_body(str(e))
+        except Exception as e:
+            # Pool quebrado (BrokenProcessPool) ou erro inesperado no worker: o cliente ainda recebe JSON
+            return 500, error_body(f"internal error: {type(e).__name__}: {e}")
+
+
+def parse_months(data):
+    """Meses pedidos em /query: "month" ou "months" (lista ou texto separado por vírgulas)"""
+    months = data.get('months', data.get('month'))
+    if months is None:
+        raise ValueError("month or months is required")
+    if isinstance(months, str):
+        months = months.split(',')
+    elif not isinstance(months, list):
+        months = [months]
+    return [parse_month(month) for month in months]
+
+
+def parse_month(month):
+    """Um mês inteiro (número inteiro no JSON ou dígitos na URL); frações são recusadas, não truncadas"""
+    if isinstance(month, str) and month.strip().lstrip('-').isdigit():
+        return int(month)
+    if isinstance(month, int) and not isinstance(month, bool):
+        return month
+    if isinstance(month, float) and month.is_integer():
+        return int(month)
+    raise ValueError(f"months must be whole numbers, got {month!r}")
+
+
+def query_body(params, months):
+    """Resposta de /query (calculada na thread da requisição)"""
+    points, method = query_months(params, months)
+    payload = {'params': params.to_dict(), 'method': method, 'months': months, 'data': points}
+    return dump_json(payload)
+
+
+def error_body(message):
+    return json.dumps({'error': message}).encode('utf-8')
+
+
+class ProjectionRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Manter conexões abertas (keep-alive)
+    disable_nagle_algorithm = True  # Cabeçalho e corpo saem em writes separados
+    service = None
+    verbose = False
+
+    def do_GET(self):
+        self.respond(*self.service.handle('GET', self.path))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        self.respond(*self.service.handle('POST', self.path, body))
+
+    def respond(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(service, host='127.0.0.1', port=8765, verbose=False):
+    handler = type('Handler', (ProjectionRequestHandler,), {'service': service, 'verbose': verbose})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dividend projection HTTP/JSON service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--cache-size', type=int, default=4096, help="max cached responses")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+
+    service = ProjectionService(workers=args.workers, cache_size=args.cache_size)
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"Serving projections on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
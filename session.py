@@ -0,0 +1,129 @@
+"""
+Persistência da sessão (entradas, cenários e últimos resultados).
+
+A sessão é um arquivo .npz: os arrays de resultados são gravados em binário
+(float64, sem conversão para texto) e os parâmetros vão num bloco JSON.
+Ao restaurar, o arquivo é lido inteiro para a memória e cada array só é
+decodificado quando usado, então a janela é preenchida sem recalcular nada.
+"""
+import io
+import json
+from collections.abc import Mapping
+from dataclasses import replace
+
+import numpy as np
+
+from engine import ProjectionParams
+
+SESSION_FILENAME = 'session.npz'
+SESSION_VERSION = 1
+
+
+class SessionError(Exception):
+    """Arquivo de sessão ilegível ou de versão incompatível"""
+
+
+class LazyArrays(Mapping):
+    """Resultados de uma projeção decodificados sob demanda a partir do .npz"""
+
+    def __init__(self, archive, prefix, keys):
+        self._archive = archive
+        self._prefix = prefix
+        self._keys = list(keys)
+        self._cache = {}
+
+    def __getitem__(self, key):
+        if key not in self._cache:
+            if key not in self._keys:
+                raise KeyError(key)
+            self._cache[key] = self._archive[self._prefix + key]
+        return self._cache[key]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class Session:
+    """Estado restaurado: parâmetros dos widgets, última projeção e cenários"""
+
+    def __init__(self, params, last_params=None, results=None, scenarios=None):
+        self.params = params
+        self.last_params = last_params
+        self.results = results
+        self.scenarios = scenarios or []  # lista de (nome, parâmetros, resultados)
+
+
+def dump_session(params, last_params=None, results=None, scenarios=()):
+    """Serializa a sessão; devolve os bytes do arquivo .npz"""
+    arrays = {}
+    meta = {
+        'version': SESSION_VERSION,
+        'params': params.to_dict(),
+        'last_params': last_params.to_dict() if last_params is not None else None,
+        'results': list(results) if results is not None else None,
+        'scenarios': [],
+    }
+    if results is not None:
+        for key in results:
+            arrays[f'last__{key}'] = np.asarray(results[key], dtype=np.float64)
+    for index, (name, scenario_params, scenario_results) in enumerate(scenarios):
+        meta['scenarios'].append({
+            'name': name,
+            'params': scenario_params.to_dict(),
+            'results': list(scenario_results),
+        })
+        for key in scenario_results:
+            arrays[f'scenario{index}__{key}'] = np.asarray(scenario_results[key], dtype=np.float64)
+
+    arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def load_session(path):
+    """
+    Lê a sessão gravada em path. Devolve None se o arquivo não existir e
+    levanta SessionError se ele estiver corrompido.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        raise SessionError(f"could not read {path}: {e}") from e
+
+    # O arquivo não fica aberto (ele é substituído a cada gravação)
+    try:
+        archive = np.load(io.BytesIO(data), allow_pickle=False)
+        meta = json.loads(archive['meta'].tobytes().decode('utf-8'))
+        if meta.get('version') != SESSION_VERSION:
+            raise SessionError(f"unsupported session version: {meta.get('version')}")
+
+        # As entradas guardam o texto do cronograma como digitado (é verificado só ao calcular)
+        params = ProjectionParams.from_dict(meta['params'])
+        replace(params, paused_years='', lump_sums='').validate()
+        last_params = results = None
+        if meta.get('last_params') is not None and meta.get('results'):
+            last_params = ProjectionParams.from_dict(meta['last_params']).validate()
+            results = LazyArrays(archive, 'last__', meta['results'])
+            missing = [key for key in results if 'last__' + key not in archive.files]
+            if missing:
+                raise SessionError(f"missing result arrays: {', '.join(missing)}")
+
+        scenarios = []
+        for index, entry in enumerate(meta.get('scenarios', [])):
+            scenarios.append((
+                entry['name'],
+                ProjectionParams.from_dict(entry['params']).validate(),
+                LazyArrays(archive, f'scenario{index}__', entry['results']),
+            ))
+    except SessionError:
+        raise
+    except Exception as e:
+        raise SessionError(f"corrupt session file {path}: {e}") from e
+    return Session(params, last_params, results, scenarios)
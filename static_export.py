@@ -0,0 +1,357 @@
+"""
+Exportação estática (PNG, SVG e PDF) dos gráficos e da tabela de resultados.
+
+Os gráficos são desenhados diretamente dos arrays da projeção com o QPainter do
+Qt (plataforma offscreen, sem navegador), então o mesmo código gera imagens,
+SVG e um PDF de várias páginas por cliente. O layout de cada tamanho de página
+(fontes, canetas, área de plotagem, buffer de imagem) é montado uma vez por
+processo e reaproveitado em todos os clientes.
+
+Uso (um pacote de relatório por cliente, em paralelo):
+    python static_export.py clients.json --out reports --format pdf png --workers 8
+
+clients.json é uma lista de objetos com "name" e os parâmetros de
+engine.ProjectionParams (parâmetros ausentes assumem os valores padrão).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from PyQt5.QtCore import Qt, QMarginsF, QPointF, QRect, QRectF, QSize, QSizeF
+from PyQt5.QtGui import (QColor, QFont, QGuiApplication, QImage, QPageSize, QPainter,
+                         QPdfWriter, QPen, QPolygonF)
+from PyQt5.QtSvg import QSvgGenerator
+
+from engine import ProjectionParams, simulate, results_frame, results_table, has_withdrawals
+from reports import safe_name, symbol
+from chart_payload import annualized_dividends
+
+FORMATS = ('png', 'svg', 'pdf')
+CHART_SIZE = (1000, 600)
+TABLE_WIDTH = 1000
+TABLE_ROW_HEIGHT = 22
+# Mesmas cores dos gráficos interativos
+SERIES_COLORS = ['#3498db', '#2ecc71', '#e74c3c', '#9b59b6']
+HEADER_COLOR = '#3498db'
+TEXT_COLOR = '#2c3e50'
+
+_qt_app = None
+
+
+def ensure_qt():
+    """Cria a QGuiApplication do processo (offscreen quando não há uma janela)"""
+    global _qt_app
+    if QGuiApplication.instance() is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        _qt_app = QGuiApplication([])
+    return QGuiApplication.instance()
+
+
+class PageTemplate:
+    """Layout fixo de uma página (fontes, canetas, margens e buffer da imagem)"""
+
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.title_font = QFont()
+        self.title_font.setPixelSize(20)
+        self.title_font.setBold(True)
+        self.label_font = QFont()
+        self.label_font.setPixelSize(12)
+        self.bold_font = QFont(self.label_font)
+        self.bold_font.setBold(True)
+        self.plot = QRectF(90, 60, width - 120, height - 110)
+
+        self.text_pen = QPen(QColor(TEXT_COLOR))
+        self.header_pen = QPen(QColor('white'))
+        self.grid_pen = QPen(QColor('#dddddd'), 1)
+        self.axis_pen = QPen(QColor('#888888'), 1)
+        self.series_pens = []
+        for color in SERIES_COLORS:
+            pen = QPen(QColor(color), 2.5)
+            pen.setCapStyle(Qt.RoundCap)
+            pen.setJoinStyle(Qt.RoundJoin)
+            self.series_pens.append(pen)
+        self.header_brush = QColor(HEADER_COLOR)
+        self.stripe_brush = QColor('#f2f2f2')
+        self.image = QImage(width, height, QImage.Format_RGB32)
+
+
+@lru_cache(maxsize=None)
+def page_template(width, height):
+    ensure_qt()
+    return PageTemplate(width, height)
+
+
+def nice_ticks(low, high, count=5):
+    """Marcas do eixo em passos 1/2/5 × 10^n cobrindo [low, high]"""
+    if not np.isfinite(low) or not np.isfinite(high):
+        return np.array([0.0])
+    if high <= low:
+        high = low + 1
+    raw = (high - low) / count
+    magnitude = 10 ** np.floor(np.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw)
+    return np.arange(np.floor(low / step) * step, high + step * 0.5, step)
+
+
+def short_money(value, prefix='$'):
+    for limit, suffix in ((1e12, 'T'), (1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if abs(value) >= limit:
+            return f"{prefix}{value / limit:,.{0 if value % limit == 0 else 1}f}{suffix}"
+    return f"{prefix}{value:,.0f}"
+
+
+def draw_line_chart(painter, template, title, x, series, y_format=short_money):
+    """Desenha um gráfico de linhas; series = [(nome, valores)]"""
+    plot = template.plot
+    painter.fillRect(QRectF(0, 0, template.width, template.height), Qt.white)
+    painter.setRenderHint(painter.Antialiasing)
+
+    painter.setFont(template.title_font)
+    painter.setPen(template.text_pen)
+    painter.drawText(QRectF(0, 10, template.width, 36), Qt.AlignCenter, title)
+
+    finite = [values[np.isfinite(values)] for _, values in series]
+    y_low = min([0.0] + [float(v.min()) for v in finite if v.size])
+    y_high = max([1.0] + [float(v.max()) for v in finite if v.size])
+    y_ticks = nice_ticks(y_low, y_high)
+    y_low, y_high = float(y_ticks[0]), float(max(y_ticks[-1], y_high))
+    x_low, x_high = float(x[0]), float(max(x[-1], x[0] + 1))
+
+    def sx(values):
+        return plot.left() + (values - x_low) / (x_high - x_low) * plot.width()
+
+    def sy(values):
+        return plot.bottom() - (values - y_low) / (y_high - y_low) * plot.height()
+
+    # Grade e rótulos dos eixos
+    painter.setFont(template.label_font)
+    for tick in y_ticks:
+        y = float(sy(tick))
+        painter.setPen(template.grid_pen)
+        painter.drawLine(QPointF(plot.left(), y), QPointF(plot.right(), y))
+        painter.setPen(template.text_pen)
+        painter.drawText(QRectF(0, y - 8, plot.left() - 8, 16), Qt.AlignRight | Qt.AlignVCenter, y_format(tick))
+    for tick in nice_ticks(x_low, x_high, 10):
+        if tick > x_high:
+            continue
+        x_pos = float(sx(tick))
+        painter.setPen(template.axis_pen)
+        painter.drawLine(QPointF(x_pos, plot.bottom()), QPointF(x_pos, plot.bottom() + 4))
+        painter.setPen(template.text_pen)
+        painter.drawText(QRectF(x_pos - 30, plot.bottom() + 6, 60, 16), Qt.AlignCenter, f"{tick:g}")
+    painter.drawText(QRectF(plot.left(), plot.bottom() + 24, plot.width(), 16), Qt.AlignCenter, "Years")
+    painter.setPen(template.axis_pen)
+    painter.drawLine(plot.bottomLeft(), plot.bottomRight())
+    painter.drawLine(plot.bottomLeft(), plot.topLeft())
+
+    # Séries: no máximo dois pontos por pixel de largura
+    step = max(1, len(x) // int(plot.width() * 2))
+    px = sx(np.asarray(x[::step], dtype=float))
+    for index, (name, values) in enumerate(series):
+        py = sy(np.nan_to_num(np.asarray(values[::step], dtype=float), posinf=y_high, neginf=y_low))
+        painter.setPen(template.series_pens[index % len(template.series_pens)])
+        painter.drawPolyline(QPolygonF([QPointF(a, b) for a, b in zip(px.tolist(), py.tolist())]))
+
+    # Legenda no canto superior esquerdo
+    painter.setFont(template.label_font)
+    for index, (name, _) in enumerate(series):
+        y = plot.top() + 12 + index * 18
+        painter.setPen(template.series_pens[index % len(template.series_pens)])
+        painter.drawLine(QPointF(plot.left() + 12, y), QPointF(plot.left() + 36, y))
+        painter.setPen(template.text_pen)
+        painter.drawText(QPointF(plot.left() + 42, y + 4), name)
+
+
+def table_rows(df, prefix='$'):
+    """Colunas e linhas formatadas da tabela estática (mesmos períodos da tabela HTML)"""
+    table = results_table(df)
+    money = (prefix + '{:,.2f}').format
+    columns = [('Year', 'Years', '{:.1f}'.format),
+               ('Portfolio Value', 'Portfolio Value', money),
+               ('Total Contributions', 'Cumulative Contributions', money),
+               ('Total Dividends', 'Cumulative Dividends', money),
+               ('Annual Dividend Income', 'Annual Dividend Income', money),
+               ('Yield on Cost', 'Yield on Cost', '{:.2f}%'.format)]
+    if has_withdrawals(df):
+        columns.append(('Total Withdrawals', 'Cumulative Withdrawals', money))
+    header = [title for title, _, _ in columns]
+    rows = [[fmt(value) for value in table[key].tolist()] for _, key, fmt in columns]
+    return header, [list(row) for row in zip(*rows)]
+
+
+def draw_table(painter, template, title, subtitle, header, rows):
+    """Desenha a tabela de resultados (cabeçalho azul e linhas zebradas)"""
+    painter.fillRect(QRectF(0, 0, template.width, template.height), Qt.white)
+    painter.setFont(template.title_font)
+    painter.setPen(template.text_pen)
+    painter.drawText(QRectF(0, 10, template.width, 30), Qt.AlignCenter, title)
+    painter.setFont(template.label_font)
+    painter.drawText(QRectF(0, 40, template.width, 20), Qt.AlignCenter, subtitle)
+
+    left, top = 20, 70
+    width = (template.width - 2 * left) / len(header)
+    painter.fillRect(QRectF(left, top, template.width - 2 * left, TABLE_ROW_HEIGHT), template.header_brush)
+    painter.setFont(template.bold_font)
+    painter.setPen(template.header_pen)
+    for column, text in enumerate(header):
+        painter.drawText(QRectF(left + column * width, top, width, TABLE_ROW_HEIGHT), Qt.AlignCenter, text)
+
+    painter.setFont(template.label_font)
+    painter.setPen(template.text_pen)
+    for index, row in enumerate(rows):
+        y = top + (index + 1) * TABLE_ROW_HEIGHT
+        if index % 2:
+            painter.fillRect(QRectF(left, y, template.width - 2 * left, TABLE_ROW_HEIGHT), template.stripe_brush)
+        for column, text in enumerate(row):
+            painter.drawText(QRectF(left + column * width, y, width - 8, TABLE_ROW_HEIGHT),
+                             Qt.AlignRight | Qt.AlignVCenter, text)
+
+
+def report_pages(df, params=None):
+    """Páginas do relatório: [(nome, (largura, altura), função de desenho(painter, template))]"""
+    x = df['Years'].to_numpy()
+    prefix = symbol(params)
+
+    def money(value):
+        return short_money(value, prefix)
+
+    pages = [
+        ('portfolio', CHART_SIZE, lambda p, t: draw_line_chart(p, t, "Portfolio Balance Growth", x, [
+            ('Total Portfolio Value', df['Portfolio Value'].to_numpy()),
+            ('Cumulative Contributions', df['Cumulative Contributions'].to_numpy()),
+            ('Cumulative Dividends', df['Cumulative Dividends'].to_numpy()),
+        ], y_format=money)),
+        ('dividend', CHART_SIZE, lambda p, t: draw_line_chart(p, t, "Annual Dividend Income", x, [
+            ('Annual Dividend Income', annualized_dividends(df['Dividend Income'].to_numpy())),
+        ], y_format=money)),
+        ('yoc', CHART_SIZE, lambda p, t: draw_line_chart(p, t, "Yield on Cost", x, [
+            ('Yield on Cost', df['Yield on Cost'].to_numpy()),
+        ], y_format=lambda v: f"{v:g}%")),
+    ]
+    header, rows = table_rows(df, prefix)
+    subtitle = ''
+    if params is not None:
+        subtitle = (f"Initial {prefix}{params.starting_principal:,.2f} · contribution {prefix}{params.periodic_contribution:,.2f} "
+                    f"· {params.years_invested} years · yield {params.annual_dividend_yield}% "
+                    f"· {params.payment_frequency_name} payments")
+    height = 70 + (len(rows) + 1) * TABLE_ROW_HEIGHT + 20
+    pages.append(('table', (TABLE_WIDTH, height), lambda p, t: draw_table(
+        p, t, "Dividend Portfolio Calculator Results", subtitle, header, rows)))
+    return pages
+
+
+def render_report(df, folder, name='report', formats=('pdf',), params=None):
+    """
+    Grava o pacote de relatório de uma projeção em folder: um PDF de várias
+    páginas ({name}.pdf) e/ou uma imagem por página ({name}_{página}.png/.svg).
+    Devolve a lista de arquivos gravados.
+    """
+    ensure_qt()
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"unknown format(s): {', '.join(sorted(unknown))}")
+    os.makedirs(folder, exist_ok=True)
+    pages = report_pages(df, params)
+    written = []
+
+    for fmt in formats:
+        if fmt == 'pdf':
+            path = os.path.join(folder, f"{name}.pdf")
+            writer = QPdfWriter(path)
+            writer.setResolution(96)
+            writer.setTitle(name)
+            painter = None
+            for index, (_, size, draw) in enumerate(pages):
+                # Página do tamanho do desenho (em pontos: 72 por polegada)
+                writer.setPageSize(QPageSize(QSizeF(size[0] * 0.75, size[1] * 0.75), QPageSize.Point))
+                writer.setPageMargins(QMarginsF(0, 0, 0, 0))
+                if painter is None:
+                    painter = QPainter(writer)
+                else:
+                    writer.newPage()
+                draw(painter, page_template(*size))
+            painter.end()
+            written.append(path)
+            continue
+
+        for page, size, draw in pages:
+            template = page_template(*size)
+            path = os.path.join(folder, f"{name}_{page}.{fmt}")
+            if fmt == 'png':
+                painter = QPainter(template.image)
+                draw(painter, template)
+                painter.end()
+                if not template.image.save(path, 'PNG'):
+                    raise OSError(f"could not write {path}")
+            else:
+                generator = QSvgGenerator()
+                generator.setFileName(path)
+                generator.setSize(QSize(*size))
+                generator.setViewBox(QRect(0, 0, *size))
+                generator.setTitle(f"{name} {page}")
+                painter = QPainter(generator)
+                draw(painter, template)
+                painter.end()
+            written.append(path)
+    return written
+
+
+def export_report(params, folder, name='report', formats=('pdf',)):
+    """Simula params e grava o pacote de relatório (ver render_report)"""
+    return render_report(results_frame(simulate(params)), folder, name, formats, params)
+
+
+def _export_client(job):
+    """Tarefa de um worker: devolve (nome, arquivos gravados, erro)"""
+    name, data, folder, formats = job
+    try:
+        params = ProjectionParams.from_dict(data).validate()
+        return name, export_report(params, folder, safe_name(name), formats), None
+    except Exception as e:
+        return name, [], f"{type(e).__name__}: {e}"
+
+
+def export_reports(clients, folder, formats=('pdf',), workers=None, chunksize=8):
+    """
+    Gera os relatórios de vários clientes em paralelo (um processo por núcleo).
+    clients: lista de dicionários com "name" e os parâmetros da projeção.
+    Devolve uma lista de (nome, arquivos, erro ou None), na ordem dos clientes.
+    """
+    jobs = [(client.get('name', f'client{index}'), client, folder, tuple(formats))
+            for index, client in enumerate(clients)]
+    if workers == 1:
+        return [_export_client(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=ensure_qt) as executor:
+        return list(executor.map(_export_client, jobs, chunksize=chunksize))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Static PNG/SVG/PDF report export")
+    parser.add_argument('clients', help="JSON file with a list of client parameter objects")
+    parser.add_argument('--out', default='reports', help="output folder")
+    parser.add_argument('--format', nargs='+', default=['pdf'], choices=FORMATS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    with open(args.clients) as f:
+        clients = json.load(f)
+    start = time.perf_counter()
+    results = export_reports(clients, args.out, args.format, args.workers)
+    elapsed = time.perf_counter() - start
+
+    failed = [(name, error) for name, _, error in results if error]
+    for name, error in failed:
+        print(f"{name}: {error}", file=sys.stderr)
+    files = sum(len(paths) for _, paths, _ in results)
+    print(f"Exported {len(results) - len(failed)} report(s), {files} file(s) to {args.out} in {elapsed:.1f} s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
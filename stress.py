@@ -0,0 +1,258 @@
+"""
+Testes de estresse: cortes de dividendo, quedas de preço com recuperação e
+congelamento do reajuste do dividendo, aplicados em cada ano de início
+possível de cada cenário base.
+
+Cada choque vira dois vetores multiplicativos sobre a grade mensal da
+projeção (nível do preço da cota e do dividendo por cota, 1 = sem choque).
+Todas as combinações (cenário x choque x ano de início) são linhas de uma
+única chamada a simulate_batch por bloco, sem loop mensal em Python.
+
+Uso:
+    python stress.py clients.json --shocks shocks.json --out stress.csv
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass, fields, replace
+
+import numpy as np
+import pandas as pd
+
+from engine import ProjectionParams, simulate_batch
+from reports import PAGE_STYLE, MONEY
+
+PERCENTILES = (5, 25, 50, 75, 95)
+STRESS_CHUNK = 256
+
+
+@dataclass(frozen=True)
+class Shock:
+    """Evento de estresse, a partir do primeiro mês do ano de início"""
+    name: str
+    price_drop: float = 0.0  # queda do preço da cota (%)
+    recovery_years: float = 0.0  # volta gradual à trajetória do modelo (0 = a queda é permanente)
+    dividend_cut: float = 0.0  # corte do dividendo por cota (%)
+    cut_years: float = 0.0  # duração do corte (0 = permanente)
+    freeze_years: int = 0  # anos sem o reajuste anual do dividendo
+
+    def levels(self, months, start_year, dividend_increase=0.0):
+        """
+        Níveis do preço e do dividendo por cota (arrays de months + 1) com o
+        choque no ano start_year (a partir de 0); dividend_increase é o
+        reajuste anual do dividendo do cenário, em %, para o congelamento.
+        """
+        month = np.arange(months + 1)
+        start = start_year * 12 + 1
+        elapsed = month - start
+
+        price = np.ones(months + 1)
+        if self.price_drop:
+            floor = 1 - self.price_drop / 100
+            recovery = self.recovery_years * 12
+            if recovery > 0:
+                # Recuperação geométrica: o desvio em log some linearmente em recovery meses
+                remaining = np.clip(1 - elapsed / recovery, 0, 1)
+                price = np.where(elapsed >= 0, floor ** remaining, 1.0)
+            else:
+                price = np.where(elapsed >= 0, floor, 1.0)
+
+        dividend = np.ones(months + 1)
+        if self.dividend_cut:
+            cut = elapsed >= 0
+            if self.cut_years > 0:
+                cut &= elapsed < self.cut_years * 12
+            dividend = np.where(cut, 1 - self.dividend_cut / 100, 1.0)
+        if self.freeze_years:
+            # Reajustes que deixaram de acontecer até o mês (o do ano k entra no mês 12k + 1)
+            skipped = np.clip((month - 1) // 12 - start_year, 0, self.freeze_years)
+            dividend = dividend * (1 + dividend_increase / 100) ** -skipped.astype(float)
+        return price, dividend
+
+
+DEFAULT_SHOCKS = (
+    Shock('Dividend cut 50%', dividend_cut=50),
+    Shock('Price drop 40%, 5y recovery', price_drop=40, recovery_years=5),
+    Shock('Dividend freeze 3y', freeze_years=3),
+    Shock('Price drop 30% and dividend cut 25% for 2y', price_drop=30, recovery_years=3, dividend_cut=25, cut_years=2),
+)
+
+
+def stress_rows(params_list, shocks, start_years=None):
+    """(índice do cenário, choque, ano de início) de cada combinação; por padrão todos os anos do horizonte"""
+    rows = []
+    for index, params in enumerate(params_list):
+        years = range(params.months // 12) if start_years is None else [y for y in start_years
+                                                                          if 0 <= y < params.months // 12]
+        rows.extend((index, shock, year) for shock in shocks for year in years)
+    return rows
+
+
+def _stress_chunk(params_list, rows):
+    """Simula um bloco de combinações e devolve as métricas de cada linha"""
+    months = max(params_list[index].months for index, _, _ in rows)
+    price_level = np.empty((len(rows), months + 1))
+    dividend_level = np.empty((len(rows), months + 1))
+    for i, (index, shock, year) in enumerate(rows):
+        price_level[i], dividend_level[i] = shock.levels(
+            months, year, params_list[index].expected_annual_dividend_increase)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        batch = simulate_batch([params_list[index] for index, _, _ in rows], price_level, dividend_level)
+    return _metrics(batch, [params_list[index].months for index, _, _ in rows])
+
+
+def _metrics(batch, horizons):
+    """Valor final, renda dos últimos 12 meses, valor mínimo e esgotamento de cada linha no próprio horizonte"""
+    horizons = np.asarray(horizons)
+    rows = np.arange(len(horizons))
+    values = batch['portfolio_values']
+    income = np.cumsum(batch['dividend_income'], axis=1)
+    inside = np.arange(values.shape[1])[None, :] <= horizons[:, None]
+    final_value = values[rows, horizons]
+    return {
+        'final_value': final_value,
+        'final_annual_income': income[rows, horizons] - income[rows, np.maximum(horizons - 12, 0)],
+        'min_value': np.where(inside, values, np.inf).min(axis=1),
+        'total_withdrawals': batch['cumulative_withdrawals'][rows, horizons],
+        'depleted': (final_value <= 0) & (batch['cumulative_withdrawals'][rows, horizons] > 0),
+    }
+
+
+def run_stress(params_list, shocks=DEFAULT_SHOCKS, start_years=None, chunk_size=STRESS_CHUNK):
+    """
+    Aplica cada choque em cada ano de início (start_years, padrão todos) de
+    cada cenário. Devolve um DataFrame com uma linha por combinação: cenário,
+    choque, ano de início, métricas e as mesmas métricas relativas à projeção
+    sem choque ('final_value_ratio', 'final_income_ratio').
+    Cotas inteiras e o calendário diário são simulados como cotas fracionárias.
+    """
+    params_list = [replace(params, whole_shares=False, event_calendar=False) for params in params_list]
+    if not params_list:
+        raise ValueError("at least one scenario is required")
+    rows = stress_rows(params_list, shocks, start_years)
+    if not rows:
+        raise ValueError("no start year falls inside the scenarios' horizons")
+
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        baseline = _metrics(simulate_batch(params_list), [params.months for params in params_list])
+    metrics = {}
+    for first in range(0, len(rows), chunk_size):
+        for name, values in _stress_chunk(params_list, rows[first:first + chunk_size]).items():
+            metrics.setdefault(name, []).append(values)
+
+    scenario = np.array([index for index, _, _ in rows])
+    df = pd.DataFrame({
+        'scenario': scenario,
+        'shock': [shock.name for _, shock, _ in rows],
+        'start_year': [year + 1 for _, _, year in rows],
+        **{name: np.concatenate(values) for name, values in metrics.items()},
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['final_value_ratio'] = df['final_value'] / baseline['final_value'][scenario]
+        df['final_income_ratio'] = df['final_annual_income'] / baseline['final_annual_income'][scenario]
+    return df
+
+
+def model_notes(params_list):
+    """Opções dos cenários que o teste de estresse simula de outro jeito (avisos do relatório)"""
+    notes = []
+    if any(params.whole_shares for params in params_list):
+        notes.append("Whole-share purchases are simulated with fractional shares, so values can differ "
+                     "slightly from the projection on screen.")
+    if any(params.event_calendar for params in params_list):
+        notes.append("The daily event calendar is replaced by the monthly model (dividends on the monthly "
+                     "payment grid), so values can differ slightly from the projection on screen.")
+    return notes
+
+
+def stress_summary(df, metric='final_value'):
+    """
+    Pior caso e distribuição de metric sobre os anos de início, por cenário e
+    choque: pior valor e o ano em que acontece, percentis e fração esgotada.
+    """
+    grouped = df.groupby(['scenario', 'shock'], sort=False)
+    worst_rows = df.loc[grouped[metric].idxmin()]
+    summary = pd.DataFrame({
+        'worst': worst_rows[metric].to_numpy(),
+        'worst_start_year': worst_rows['start_year'].to_numpy(),
+    }, index=pd.MultiIndex.from_frame(worst_rows[['scenario', 'shock']]))
+    for percentile in PERCENTILES:
+        summary[f'p{percentile}'] = grouped[metric].quantile(percentile / 100)
+    summary['depleted_share'] = grouped['depleted'].mean()
+    return summary
+
+
+def stress_html(df, notes=(), prefix='$'):
+    """
+    Página HTML com o pior caso e a distribuição do valor final e da renda final
+    de cada choque; notes (model_notes) listam as simplificações do modelo e
+    prefix é o símbolo da moeda dos valores.
+    """
+    money = MONEY.replace('$', prefix)
+    sections = []
+    for metric, title in (('final_value', 'Final Portfolio Value'), ('final_annual_income', 'Final Annual Dividend Income')):
+        summary = stress_summary(df, metric).droplevel('scenario')
+        summary.index.name = None
+        formatters = {column: money.format for column in summary.columns}
+        formatters.update(worst_start_year='{:d}'.format, depleted_share='{:.0%}'.format)
+        labels = {'worst': 'Worst', 'worst_start_year': 'Worst Start Year', 'depleted_share': 'Depleted'}
+        labels.update({f'p{percentile}': f'{percentile}th Percentile' for percentile in PERCENTILES})
+        table = summary.to_html(formatters=formatters).replace('<th></th>', '<th>Shock</th>', 1)
+        for column, label in labels.items():
+            table = table.replace(f'<th>{column}</th>', f'<th>{label}</th>')
+        sections.append(f"<h2>{title} across start years</h2>\n{table}")
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>Dividend Calculator Stress Test</title>
+    <style>{PAGE_STYLE}</style>
+</head>
+<body>
+    <h1>Stress Test</h1>
+    <div class="summary">Each shock is applied in every possible start year of the projection.
+    The worst start year is the year in which the shock that leads to the worst outcome begins.</div>
+    {''.join(f'<div class="summary">{note}</div>' for note in notes)}
+    {''.join(sections)}
+</body>
+</html>
+"""
+
+
+def load_shocks(entries):
+    """Choques a partir de dicionários com os campos de Shock"""
+    names = {field.name for field in fields(Shock)}
+    return [Shock(**{key: value for key, value in entry.items() if key in names}) for entry in entries]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress test projections against dividend cuts, crashes and freezes")
+    parser.add_argument('clients', help="JSON file with a list of parameter objects")
+    parser.add_argument('--shocks', help="JSON file with a list of shocks (default: built-in library)")
+    parser.add_argument('--metric', default='final_value',
+                        choices=('final_value', 'final_annual_income', 'min_value', 'total_withdrawals'))
+    parser.add_argument('--out', help="CSV file for every (scenario, shock, start year) outcome")
+    args = parser.parse_args(argv)
+
+    with open(args.clients) as f:
+        params_list = [ProjectionParams.from_dict(data).validate() for data in json.load(f)]
+    shocks = DEFAULT_SHOCKS
+    if args.shocks:
+        with open(args.shocks) as f:
+            shocks = load_shocks(json.load(f))
+
+    start = time.perf_counter()
+    df = run_stress(params_list, shocks)
+    elapsed = time.perf_counter() - start
+    if args.out:
+        df.to_csv(args.out, index=False)
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:,.2f}'.format):
+        print(stress_summary(df, args.metric))
+    for note in model_notes(params_list):
+        print(f"Note: {note}")
+    print(f"{len(df)} stressed projection(s) in {elapsed:.2f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())